@@ -4,16 +4,21 @@ from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.routers import auth, users, photos
+from src.routers import auth, users, photos, media, search, cache
 
 from src.dependencies.database import get_db
 from src.conf.config import config
+from src.middleware.upload_limit import UploadLimitMiddleware
+from src.services.revocation import token_revocation
 
 app = FastAPI()
 
 app.include_router(auth.router_auth, prefix="/api")
 app.include_router(users.router_users, prefix="/api")
 app.include_router(photos.router_photos, prefix="/api")
+app.include_router(media.router_media, prefix="/api")
+app.include_router(search.router_search, prefix="/api")
+app.include_router(cache.router_cache, prefix="/api")
 
 
 origins = ["*"]
@@ -24,7 +29,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+# before form parsing: FastAPI reads the whole body before the route runs
+app.add_middleware(UploadLimitMiddleware)
+
+
+@app.on_event("startup")
+async def startup():
+    await token_revocation.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await token_revocation.stop()
+
 
 templates = Jinja2Templates(directory=config.BASE_DIR / "src" / "templates")
 
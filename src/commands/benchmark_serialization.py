@@ -0,0 +1,99 @@
+"""
+Compare serialization of list responses: FastAPI response_model (validation,
+dump to python, json) and ResponseSerializer (orjson from trusted rows).
+
+Data is made in memory, database is not needed: feed pages of 20 photos
+and pages of 20 photos with nested comments.
+
+Usage:
+    python -m src.commands.benchmark_serialization
+    python -m src.commands.benchmark_serialization --photos 20 --comments 10 --number 500
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+from decimal import Decimal
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from src.schemas.unified import (ImagePageResponseFullSchema,
+                                 ImagePageResponseShortSchema)
+from src.services.serialization import get_serializer
+
+
+def make_photos(count: int, comments: int) -> list[dict]:
+    # rows as they are returned by PhotoService
+    now = datetime.now()
+    photos = []
+    for photo_id in range(1, count + 1):
+        photo = {
+            "id": photo_id,
+            "image_url": f"https://res.cloudinary.com/demo/image/upload/v1/photos/{photo_id}.jpg",
+            "description": f"Photo number {photo_id}",
+            "username": "photographer",
+            "tags": ["nature", "sea", "summer"],
+            "avg_rating": Decimal("4.25"),
+            "created_at": now,
+        }
+        if comments:
+            photo["rating_histogram"] = [0, 1, 2, 3, 4]
+            photo["comments"] = [
+                {
+                    "id": photo_id * 1000 + comment_id,
+                    "content": f"Comment {comment_id} to this photo",
+                    "updated_at": now,
+                    "username": "commenter",
+                }
+                for comment_id in range(comments)
+            ]
+        photos.append(photo)
+    return photos
+
+
+async def fastapi_response(field, photos: list[dict]) -> bytes:
+    content = await serialize_response(field=field, response_content=photos, is_coroutine=True)
+    return JSONResponse(content).body
+
+
+async def measure(schema: type, photos: list[dict], number: int) -> tuple[float, float]:
+    # mean time of one response in ms: FastAPI, ResponseSerializer
+    field = create_response_field(name="benchmark", type_=schema)
+    serializer = get_serializer(schema)
+
+    start = time.perf_counter()
+    for _ in range(number):
+        await fastapi_response(field, photos)
+    fastapi_time = (time.perf_counter() - start) / number * 1000
+
+    start = time.perf_counter()
+    for _ in range(number):
+        serializer.response(photos)
+    fast_time = (time.perf_counter() - start) / number * 1000
+    return fastapi_time, fast_time
+
+
+async def benchmark(photos: int, comments: int, number: int):
+    cases = (
+        (f"feed, {photos} photos", list[ImagePageResponseShortSchema], make_photos(photos, 0)),
+        (
+            f"{photos} photos with {comments} comments",
+            list[ImagePageResponseFullSchema],
+            make_photos(photos, comments),
+        ),
+    )
+    print(f"{'page':<32}{'response_model, ms':>20}{'serializer, ms':>16}{'speedup':>10}")
+    for name, schema, rows in cases:
+        fastapi_time, fast_time = await measure(schema, rows, number)
+        print(f"{name:<32}{fastapi_time:>20.3f}{fast_time:>16.3f}{fastapi_time / fast_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark serialization of photo pages")
+    parser.add_argument("--photos", type=int, default=20, help="Photos per page")
+    parser.add_argument("--comments", type=int, default=10, help="Comments per photo")
+    parser.add_argument("--number", type=int, default=500, help="Responses for every case")
+    args = parser.parse_args()
+    asyncio.run(benchmark(args.photos, args.comments, args.number))
@@ -0,0 +1,46 @@
+"""
+Run jobs from the queue (storage deletes, emails) until SIGINT or SIGTERM.
+Start as many workers as needed, on any nodes with access to the database.
+
+Usage:
+    python -m src.commands.job_worker
+    python -m src.commands.job_worker --retry-dead   # return dead jobs to the queue
+"""
+import argparse
+import asyncio
+import logging
+import signal
+
+from src.dependencies.database import sessionmanager
+from src.dependencies.storage import storage_backend
+from src.repositories.jobs import JobRepo
+from src.services.email import mail_templates, smtp_pool
+from src.services.job_handlers import job_handlers
+from src.services.jobs import JobWorker
+
+
+async def run_worker():
+    mail_templates.compile_all()
+    worker = JobWorker(job_handlers(storage_backend))
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        # current jobs are finished, not interrupted
+        loop.add_signal_handler(signal_number, worker.stop)
+    try:
+        await worker.run()
+    finally:
+        await smtp_pool.close()
+
+
+async def retry_dead_jobs():
+    async with sessionmanager.session() as session:
+        count = await JobRepo(session).retry_dead_jobs()
+    print(f"Dead jobs returned to the queue: {count}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--retry-dead", action="store_true", help="return dead jobs to the queue")
+    args = parser.parse_args()
+    asyncio.run(retry_dead_jobs() if args.retry_dead else run_worker())
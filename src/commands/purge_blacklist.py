@@ -0,0 +1,21 @@
+"""
+Delete expired rows from blacklist (revoked tokens).
+Web workers do it periodically, the command is for cron or manual cleanup.
+
+Usage:
+    python -m src.commands.purge_blacklist
+"""
+import asyncio
+
+from src.dependencies.database import sessionmanager
+from src.services.revocation import token_revocation
+
+
+async def purge_blacklist():
+    async with sessionmanager.session() as session:
+        count = await token_revocation.purge_blacklist(session)
+    print(f"Expired tokens removed from blacklist: {count}")
+
+
+if __name__ == "__main__":
+    asyncio.run(purge_blacklist())
@@ -0,0 +1,25 @@
+"""
+Backfill or repair rating aggregates of photos (rating_count, rating_sum, rating_histogram).
+
+Usage:
+    python -m src.commands.rebuild_rating_aggregates
+    python -m src.commands.rebuild_rating_aggregates --photo-id 42
+"""
+import argparse
+import asyncio
+
+from src.dependencies.database import sessionmanager
+from src.repositories.rating import RatingRepo
+
+
+async def rebuild_rating_aggregates(photo_id: int | None = None):
+    async with sessionmanager.session() as session:
+        count = await RatingRepo(session).rebuild_rating_aggregates(photo_id)
+    print(f"Rating aggregates rebuilt for {count} photo(s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild rating aggregates of photos")
+    parser.add_argument("--photo-id", type=int, default=None, help="Rebuild only this photo")
+    args = parser.parse_args()
+    asyncio.run(rebuild_rating_aggregates(args.photo_id))
@@ -26,16 +26,84 @@ class Settings(BaseSettings):
     MAIL_FROM: str = "user@gmail.com"
     MAIL_PORT: int = 6379
     MAIL_SERVER: str = "smtp.mail.com"
+    MAIL_FROM_NAME: str = "FastContacts"
+    MAIL_SSL_TLS: bool = True
+    MAIL_STARTTLS: bool = False
+    # persistent SMTP connections of job worker, mails are sent through them at the same time
+    MAIL_POOL_SIZE: int = 4
+    # seconds, older idle connection is opened again
+    MAIL_CONNECTION_MAX_IDLE: int = 60
 
     CLOUDINARY_NAME: str = "abc"
     CLOUDINARY_API_KEY: int = 000000000000000
     CLOUDINARY_API_SECRET: str = "secret"
 
+    # Where to store photos: "cloudinary" or "local" (files on disk, served by /api/media)
+    STORAGE_BACKEND: str = "cloudinary"
+    LOCAL_STORAGE_DIR: Path = Path(__file__).parent.parent.parent / "media"
+    LOCAL_MEDIA_URL: str = "/api/media"
+    # Local transformation engine: processes for Pillow (None - number of cores)
+    # and size of on-disk cache of transformed photos
+    TRANSFORM_WORKERS: int | None = None
+    TRANSFORM_CACHE_DIR: Path = Path(__file__).parent.parent.parent / "media_cache"
+    # size is bounded in every worker process: with N workers disk usage can reach N * max bytes
+    TRANSFORM_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+    # Public url of the API, encoded in qr codes (not taken from Host header of request)
+    BASE_URL: str = "http://localhost:8000"
+    # Generated qr codes: in memory of every worker and on disk (not used if not set)
+    QR_CACHE_MAX_ITEMS: int = 1024
+    QR_CACHE_DIR: Path | None = None
+
+    # Cache of photo pages: "memory" (in every worker process) or "redis" (shared)
+    CACHE_BACKEND: str = "memory"
+    REDIS_URL: str = "redis://localhost:6379/0"
+    PHOTO_CACHE_TTL: int = 60
+    PHOTO_CACHE_MAX_ITEMS: int = 10_000
+
+    # Cache of users for authentication, in every worker
+    USER_CACHE_TTL: int = 30
+    USER_CACHE_MAX_ITEMS: int = 10_000
+    # Verified payloads of access tokens, in every worker
+    TOKEN_CACHE_MAX_ITEMS: int = 10_000
+
+    # Work factor of bcrypt, hashes with other cost are rehashed on login
+    BCRYPT_ROUNDS: int = 12
+    # Threads which hash passwords, and how many hashings can run or wait
+    # before requests get 503
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+
+    # How often expired rows are deleted from blacklist, seconds
+    BLACKLIST_PURGE_INTERVAL: int = 3600
+
+    # Queue of jobs (python -m src.commands.job_worker)
+    # jobs taken by worker at once and run at the same time
+    JOB_BATCH_SIZE: int = 10
+    # seconds for one attempt, then job is taken by other worker
+    JOB_LEASE_TIME: int = 300
+    # seconds between checks of empty queue
+    JOB_POLL_INTERVAL: float = 1.0
+    JOB_MAX_ATTEMPTS: int = 8
+    # seconds before first retry, doubled for every next one
+    JOB_RETRY_DELAY: int = 10
+    JOB_MAX_RETRY_DELAY: int = 3600
+
     BASE_DIR: Path = Path(__file__).parent.parent.parent
 
     # Max size of file in bytes (10MB)
     MAX_FILE_SIZE_BYTES: int = 10 * 1024 * 1024
-    TYPES_IMAGES: list = ["image/png", "image/jpeg", "image/jpg"],
+    # How many uploads (Cloudinary requests, image checks) can run at the same time
+    UPLOAD_WORKERS: int = 4
+    # Batch upload: max files in one request, files validated and uploaded at the same time
+    MAX_BATCH_FILES: int = 50
+    UPLOAD_BATCH_CONCURRENCY: int = 8
+    # Max photos deleted by one request
+    MAX_BATCH_DELETE: int = 10_000
+    TYPES_IMAGES: list = ["image/png", "image/jpeg", "image/jpg"]
+    # Limits for image dimensions, to reject decompression bombs
+    # (small file which is huge after decoding)
+    MAX_IMAGE_PIXELS: int = 50_000_000
+    MAX_IMAGE_SIDE: int = 12_000
 
     model_config = ConfigDict(
         extra="ignore", env_file=".env", env_file_encoding="utf-8"
@@ -57,5 +125,29 @@ class Settings(BaseSettings):
 
         return value
 
+    @field_validator("BCRYPT_ROUNDS")
+    @classmethod
+    def validate_bcrypt_rounds(cls, value):
+        if not 4 <= value <= 31:
+            raise ValueError("Bcrypt rounds must be from 4 to 31")
+
+        return value
+
+    @field_validator("CACHE_BACKEND")
+    @classmethod
+    def validate_cache_backend(cls, value):
+        if value not in ["memory", "redis"]:
+            raise ValueError("Cache backend must be memory or redis")
+
+        return value
+
+    @field_validator("STORAGE_BACKEND")
+    @classmethod
+    def validate_storage_backend(cls, value):
+        if value not in ["cloudinary", "local"]:
+            raise ValueError("Storage backend must be cloudinary or local")
+
+        return value
+
 
 config = Settings()
@@ -13,6 +13,7 @@ PHOTO_NOT_FOUND = "Photo not found"
 COMMENT_NOT_FOUND = "Comment not found"
 NO_EDIT_RIGHTS = "Not enough rights"
 UNKNOWN_PARAMETER = "Unknown parameter"
+INVALID_CURSOR = "Invalid pagination cursor"
 
 VERIFICATION_ERROR = "Verification error"
 EMAIL_ALREADY_CONFIRMED = "Email already confirmed"
@@ -31,4 +32,10 @@ EMAIL_IS_ALREADY_BUSY = 'This email is already busy'
 USERNAME_IS_ALREADY_BUSY = 'This username is already busy'
 INVALID_FILE_NOT_IMAGE = 'File is not an image. Only images are allowed'
 TOO_BIG_FILE = "File size is too large. Maximum file size is 10MB"
+TOO_BIG_IMAGE = "Image dimensions are too large"
 MAX_LEN_TAG = "Tag is too long. Maximum length is 20 characters"
+FILE_NOT_FOUND = "File not found"
+INVALID_RANGE = "Requested range not satisfiable"
+SERVER_IS_BUSY = "Server is busy, try again later"
+TOO_MANY_FILES = "Too many files. Maximum {max_files} files allowed"
+UPLOAD_FAILED = "File is not uploaded to storage"
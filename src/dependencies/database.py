@@ -25,7 +25,7 @@ class DataBaseSessionManager:
     async def session(self):
         """
         The session function is a context manager that provides a transactional scope around a series of operations.
-        It will automatically rollback the session if an exception occurs, or commit the session otherwise.
+        It will automatically rollback the session if an exception occurs and raise it again.
 
         :param self: Represent the instance of the class
         :return: A context manager that can be used in a with statement
@@ -35,9 +35,9 @@ class DataBaseSessionManager:
         session = self._session_maker()
         try:
             yield session
-        except Exception as e:
-            print(e)
+        except Exception:
             await session.rollback()
+            raise
         finally:
             await session.close()
 
@@ -0,0 +1,14 @@
+from src.conf.config import config
+from src.services.storage import StorageBackend, get_storage_backend
+
+storage_backend = get_storage_backend(config.STORAGE_BACKEND)
+
+
+def get_storage() -> StorageBackend:
+    """
+    The get_storage function returns storage backend chosen in config (STORAGE_BACKEND).
+    One backend instance is shared by all requests.
+
+    :return: StorageBackend
+    """
+    return storage_backend
@@ -0,0 +1,68 @@
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.conf import messages
+from src.conf.config import config
+from src.services.photos import PhotoService
+
+
+class UploadLimitMiddleware:
+    """
+    Reject too big uploads with 413 before the whole body is read.
+
+    FastAPI reads and spools the whole multipart form before the route
+    and its dependencies run, so the check can't be done there.
+    Request with too big Content-Length is rejected at once, body without it
+    (chunked) is counted while it is read and reading stops when the limit is passed.
+    Size of every file is checked again when it is read (PhotoService.validate_photo).
+    """
+
+    def __init__(self, app: ASGIApp, prefix: str = "/api"):
+        self.app = app
+        self.prefix = prefix
+
+    def get_limit(self, path: str) -> int | None:
+        # max body size of upload route, None - not an upload
+        max_file_length = config.MAX_FILE_SIZE_BYTES + PhotoService.MULTIPART_OVERHEAD_BYTES
+        limits = {
+            f"{self.prefix}/photos": max_file_length,
+            f"{self.prefix}/photos/batch": config.MAX_BATCH_FILES * max_file_length,
+        }
+        return limits.get(path.rstrip("/"))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        limit = self.get_limit(scope["path"])
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse(
+                {"detail": messages.TOO_BIG_FILE},
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # raised in the middle of form parsing, FastAPI passes HTTPException through
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=messages.TOO_BIG_FILE,
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -1,3 +1,4 @@
+from src.models.jobs import JobModel, JobStatus
 from src.models.photos import (CommentModel, PhotoModel, RatingModel, TagModel,
                                TransformedImageLinkModel)
 from src.models.users import BlackListModel, TokenModel, UserModel
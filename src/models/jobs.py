@@ -0,0 +1,42 @@
+import enum
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Enum, Index, Integer, String, Text, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.models.base import Base
+
+
+class JobStatus(enum.Enum):
+    pending: str = "pending"
+    running: str = "running"
+    # attempts are over, job is kept for manual retry
+    dead: str = "dead"
+
+
+class JobModel(Base):
+    # queue of slow side effects (storage deletes, emails), done by
+    # src.commands.job_worker. Done jobs are deleted, see JobRepo
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # workers take due jobs: WHERE status = ... AND run_at <= now() ORDER BY run_at
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+    )
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    kind: Mapped[str] = mapped_column(String(50), nullable=False)
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    status: Mapped[JobStatus] = mapped_column(
+        Enum(JobStatus), default=JobStatus.pending, nullable=False
+    )
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False)
+    # not earlier than run_at, later for retries
+    run_at: Mapped[datetime] = mapped_column(DateTime, default=func.now(), nullable=False)
+    # lease of running job, other workers take it again after locked_until
+    locked_by: Mapped[str] = mapped_column(String(64), nullable=True)
+    locked_until: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[str] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        "created_at", DateTime, default=func.now()
+    )
@@ -1,8 +1,8 @@
 from datetime import datetime
 
-from sqlalchemy import (Column, DateTime, ForeignKey, Integer, String, Table,
-                        func)
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import (Column, Computed, DateTime, ForeignKey, Index, Integer,
+                        PrimaryKeyConstraint, String, Table, func, text)
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.models.base import Base
@@ -12,17 +12,48 @@ from src.models.users import UserModel
 photos_tags = Table(
     "photos_tags",
     Base.metadata,
-    Column("photo_id", Integer, ForeignKey("photos.id")),
-    Column("tag_id", Integer, ForeignKey("tags.id")),
+    Column("photo_id", Integer, ForeignKey("photos.id", ondelete="CASCADE"), nullable=False),
+    Column("tag_id", Integer, ForeignKey("tags.id"), nullable=False),
+    # inverted index: tag -> photos, for search by tags
+    PrimaryKeyConstraint("tag_id", "photo_id", name="pk_photos_tags"),
+    # photo -> tags, for tags of the photo
+    Index("ix_photos_tags_photo_id_tag_id", "photo_id", "tag_id"),
 )
 
 
 class PhotoModel(Base):
     __tablename__ = "photos"
+    __table_args__ = (
+        # keyset pagination of the feed: ORDER BY created_at DESC, id DESC
+        Index("ix_photos_created_at_id", "created_at", "id"),
+        # deduplication of uploads: same user, same file content
+        Index("ix_photos_user_id_content_hash", "user_id", "content_hash"),
+        # stored file can be shared by several photos, check it before destroy
+        Index("ix_photos_public_id", "public_id"),
+        # full-text search by description and comments, see PhotoRepo.search_document
+        Index(
+            "ix_photos_search_document",
+            text("(search_vector || comments_vector)"),
+            postgresql_using="gin",
+        ),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     public_id: Mapped[str] = mapped_column(String(255), nullable=False)
     image_url: Mapped[str] = mapped_column(String(255), nullable=True)
     description: Mapped[str] = mapped_column(String(255), nullable=True)
+    # sha256 of uploaded file, None for photos uploaded before deduplication
+    content_hash: Mapped[str] = mapped_column(String(64), nullable=True)
+    # full-text search. Description (weight A) is generated by postgres on every write,
+    # comments (weight B) are rebuilt by job worker after changes of comments.
+    # "simple" configuration - descriptions are in different languages
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed("setweight(to_tsvector('simple', coalesce(description, '')), 'A')", persisted=True),
+        deferred=True,
+    )
+    comments_vector: Mapped[str] = mapped_column(
+        TSVECTOR, nullable=False, server_default=text("''::tsvector"), deferred=True
+    )
     user_id: Mapped[UUID] = mapped_column(UUID, ForeignKey("users.id"), nullable=True)
     user: Mapped[UserModel] = relationship("UserModel", backref="photos")
     created_at: Mapped[datetime] = mapped_column(
@@ -31,30 +62,44 @@ class PhotoModel(Base):
     updated_at: Mapped[datetime] = mapped_column(
         "updated_at", DateTime, default=func.now(), onupdate=func.now()
     )
+    # rating aggregates, changed in the same transaction as ratings table.
+    # rating_histogram[N] = count of rates with value N (1..5, postgres arrays start from 1)
+    rating_count: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    rating_sum: Mapped[int] = mapped_column(Integer, nullable=False, server_default="0")
+    rating_histogram: Mapped[list[int]] = mapped_column(
+        ARRAY(Integer), nullable=False, server_default="{0,0,0,0,0}"
+    )
+    # collections are never loaded implicitly - choose load profile
+    # in PhotoRepo (exists, owner_check, full) or add loader options to query.
+    # Rows of collections are deleted with photo by database (ON DELETE CASCADE)
     transformed_images: Mapped[list["TransformedImageLinkModel"]] = relationship(
         "TransformedImageLinkModel",
         cascade="all, delete-orphan",
         back_populates="photo",
-        lazy="joined",
+        lazy="raise",
+        passive_deletes=True,
     )
     comments: Mapped[list["CommentModel"]] = relationship(
         "CommentModel",
         cascade="all, delete-orphan",
         back_populates="photo",
-        lazy="joined",
+        lazy="raise",
+        passive_deletes=True,
     )
     ratings: Mapped[list["RatingModel"]] = relationship(
         "RatingModel",
         cascade="all, delete-orphan",
         back_populates="photo",
-        lazy="joined",
+        lazy="raise",
+        passive_deletes=True,
     )
     tags: Mapped[list["TagModel"]] = relationship(
         secondary=photos_tags,
         cascade="save-update, merge",
         back_populates="photos",
         single_parent=True,
-        lazy="joined"
+        lazy="raise",
+        passive_deletes=True,
     )
 
 
@@ -69,6 +114,10 @@ class TagModel(Base):
 
 class TransformedImageLinkModel(Base):
     __tablename__ = "transformed_images"
+    __table_args__ = (
+        # transformations of photo and their version for conditional GET
+        Index("ix_transformed_images_photo_id_created_at", "photo_id", "created_at"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     image_url: Mapped[str] = mapped_column(String(255), nullable=True)
     photo_id: Mapped[int] = mapped_column(
@@ -84,6 +133,10 @@ class TransformedImageLinkModel(Base):
 
 class CommentModel(Base):
     __tablename__ = "comments"
+    __table_args__ = (
+        # comments of photo and their version for conditional GET
+        Index("ix_comments_photo_id_updated_at", "photo_id", "updated_at"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     content: Mapped[str] = mapped_column(String(255), nullable=False)
     photo_id: Mapped[int] = mapped_column(
@@ -28,6 +28,10 @@ class UserModel(Base):
     role: Mapped[Roles] = mapped_column(Enum(Roles), default=Roles.users, nullable=False)
     confirmed: Mapped[bool] = mapped_column(Boolean, default=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    # is increased when admin changes user, access tokens with older version are revoked
+    token_version: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0", nullable=False
+    )
     created_at: Mapped[datetime] = mapped_column(
         "created_at", DateTime, default=func.now()
     )
@@ -53,9 +57,16 @@ class TokenModel(Base):
 
 
 class BlackListModel(Base):
+    # revoked tokens: one token by jti (logout), all tokens of subject
+    # issued before created_at (ban) or with version lower than token_version.
+    # Rows are deleted after expires_at, checks are done by TokenRevocationList in memory
     __tablename__ = "blacklist"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     token: Mapped[str] = mapped_column(String(255), nullable=True)
+    jti: Mapped[str] = mapped_column(String(64), nullable=True, index=True)
+    subject: Mapped[str] = mapped_column(String(255), nullable=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=True, index=True)
+    token_version: Mapped[int] = mapped_column(Integer, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
         "created_at", DateTime, default=func.now()
     )
@@ -1,9 +1,9 @@
 from uuid import UUID
 
-from sqlalchemy import and_, select
+from sqlalchemy import and_, func, literal_column, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.models.photos import CommentModel
+from src.models.photos import CommentModel, PhotoModel
 from src.models.users import UserModel
 
 
@@ -11,11 +11,39 @@ class CommentRepo:
     def __init__(self, db):
         self.db: AsyncSession = db
 
-    async def add_comment(self, photo_id: int, comment: str, user_id: UUID):
+    async def update_comments_vector(self, photo_id: int):
+        # full-text search document of comments is kept in photos table and rebuilt
+        # by job after comment changes (see CommentService), so writes of comments
+        # don't wait for each other. Concurrent rebuilds of the photo wait here,
+        # then the next statement sees all committed comments.
+        # NO KEY UPDATE doesn't conflict with KEY SHARE locks of inserted comments (foreign key)
+        await self.db.execute(
+            select(PhotoModel.id).filter(PhotoModel.id == photo_id).with_for_update(key_share=True)
+        )
+        comments_vector = (
+            select(func.setweight(
+                func.to_tsvector("simple", func.coalesce(func.string_agg(CommentModel.content, " "), "")),
+                literal_column("'B'"),
+            ))
+            .filter(CommentModel.photo_id == photo_id)
+            .scalar_subquery()
+        )
+        stmt = (update(PhotoModel)
+                .filter(PhotoModel.id == photo_id)
+                # search document is not a change of photo - keep updated_at
+                .values(comments_vector=comments_vector, updated_at=PhotoModel.updated_at)
+                .execution_options(synchronize_session=False))
+        await self.db.execute(stmt)
+
+    async def add_comment(self, photo_id: int, comment: str, user_id: UUID, commit: bool = True):
         new_comment = CommentModel(content=comment, photo_id=photo_id, user_id=user_id)
         self.db.add(new_comment)
-        await self.db.commit()
-        await self.db.refresh(new_comment)
+        if commit:
+            await self.db.commit()
+            await self.db.refresh(new_comment)
+        else:
+            # committed later together with other changes
+            await self.db.flush()
         return new_comment
 
     async def get_all_comments(self, photo_id: int, skip: int, limit: int):
@@ -46,7 +74,7 @@ class CommentRepo:
         result = await self.db.execute(stmt)
         return result.scalar_one_or_none()
 
-    async def del_comment(self, photo_id: int, comment_id: int):
+    async def del_comment(self, photo_id: int, comment_id: int, commit: bool = True):
         stmt = select(CommentModel).filter(
             and_(CommentModel.id == comment_id, CommentModel.photo_id == photo_id)
         )
@@ -54,9 +82,12 @@ class CommentRepo:
         result = result.scalar_one_or_none()
         if result:
             await self.db.delete(result)
-            await self.db.commit()
+            if commit:
+                await self.db.commit()
+            else:
+                await self.db.flush()
 
-    async def edit_comment(self, photo_id: int, comment_id: int, comment: str):
+    async def edit_comment(self, photo_id: int, comment_id: int, comment: str, commit: bool = True):
         stmt = select(CommentModel).filter(
             and_(CommentModel.id == comment_id, CommentModel.photo_id == photo_id)
         )
@@ -64,6 +95,9 @@ class CommentRepo:
         result = result.scalar_one_or_none()
         if result:
             result.content = comment
-            await self.db.commit()
-            await self.db.refresh(result)
+            if commit:
+                await self.db.commit()
+                await self.db.refresh(result)
+            else:
+                await self.db.flush()
         return result
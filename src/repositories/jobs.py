@@ -0,0 +1,97 @@
+from datetime import timedelta
+from typing import Sequence
+
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.jobs import JobModel, JobStatus
+
+
+class JobRepo:
+    def __init__(self, db):
+        self.db: AsyncSession = db
+
+    async def add_job(self, kind: str, payload: dict, max_attempts: int, delay: float, commit: bool):
+        # commit=False - job is saved in the same transaction as the change that needs it
+        job = JobModel(
+            kind=kind,
+            payload=payload,
+            max_attempts=max_attempts,
+            run_at=func.now() + timedelta(seconds=delay),
+        )
+        self.db.add(job)
+        if commit:
+            await self.db.commit()
+        else:
+            await self.db.flush()
+        return job
+
+    async def lease_jobs(self, worker: str, limit: int, lease_time: float) -> Sequence[JobModel]:
+        # due jobs and jobs of crashed workers (lease is over) in one statement.
+        # SKIP LOCKED - workers in other processes and nodes take other rows without waiting.
+        # Time is taken from database, so clocks of nodes don't matter
+        now = func.now()
+        due = (
+            select(JobModel.id)
+            .filter(
+                or_(
+                    and_(JobModel.status == JobStatus.pending, JobModel.run_at <= now),
+                    and_(JobModel.status == JobStatus.running, JobModel.locked_until < now),
+                )
+            )
+            .order_by(JobModel.run_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(JobModel)
+            .filter(JobModel.id.in_(due.scalar_subquery()))
+            .values(
+                status=JobStatus.running,
+                attempts=JobModel.attempts + 1,
+                locked_by=worker,
+                locked_until=now + timedelta(seconds=lease_time),
+            )
+            .returning(JobModel)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.db.execute(stmt)
+        jobs = result.scalars().all()
+        await self.db.commit()
+        return jobs
+
+    async def complete_job(self, job_id: int, worker: str) -> None:
+        # only while lease is ours, otherwise other worker has taken the job
+        stmt = delete(JobModel).filter_by(id=job_id, locked_by=worker)
+        await self.db.execute(stmt)
+        await self.db.commit()
+
+    async def fail_job(self, job_id: int, worker: str, error: str, retry_delay: float | None) -> None:
+        # retry_delay None - no retries left, job is dead
+        values = {"last_error": error, "locked_by": None, "locked_until": None}
+        if retry_delay is None:
+            values["status"] = JobStatus.dead
+        else:
+            values["status"] = JobStatus.pending
+            values["run_at"] = func.now() + timedelta(seconds=retry_delay)
+        stmt = (
+            update(JobModel)
+            .filter_by(id=job_id, locked_by=worker)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.execute(stmt)
+        await self.db.commit()
+
+    async def retry_dead_jobs(self, kind: str | None = None) -> int:
+        stmt = (
+            update(JobModel)
+            .filter_by(status=JobStatus.dead)
+            .values(status=JobStatus.pending, attempts=0, run_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        if kind is not None:
+            stmt = stmt.filter_by(kind=kind)
+        result = await self.db.execute(stmt)
+        await self.db.commit()
+        return result.rowcount
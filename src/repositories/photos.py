@@ -1,53 +1,146 @@
+from datetime import datetime
 from uuid import UUID
 
-from sqlalchemy import and_, func, select
+from sqlalchemy import (Integer, Numeric, Row, String, and_, any_, cast, delete,
+                        func, literal, null, select, tuple_)
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, selectinload
 
-from src.models.photos import (PhotoModel, RatingModel, TagModel,
+from src.models.photos import (CommentModel, PhotoModel, TagModel,
                                TransformedImageLinkModel, photos_tags)
 from src.models.users import UserModel
+from src.repositories.tags import TagRepo
 
 
 class PhotoRepo:
+    # loader options for queries of one photo:
+    #   exists - only primary key, to check if photo exists
+    #   owner_check - photo columns (owner, public_id, ...) without collections
+    #   full - photo with all collections
+    load_profiles = {
+        "exists": (load_only(PhotoModel.id),),
+        "owner_check": (),
+        "full": (
+            selectinload(PhotoModel.transformed_images),
+            selectinload(PhotoModel.comments),
+            selectinload(PhotoModel.ratings),
+            selectinload(PhotoModel.tags),
+        ),
+    }
 
     def __init__(self, db):
         self.db: AsyncSession = db
 
-    async def add_photo(self, user: UserModel, public_id: str, photo_url: str, description: str) -> PhotoModel:
+    async def add_photo(
+        self, user: UserModel, public_id: str, photo_url: str, description: str,
+        content_hash: str | None = None, tags: list[str] | None = None
+    ) -> PhotoModel:
         new_photo = PhotoModel(
             public_id=public_id,
             image_url=photo_url,
             user_id=user.id,
-            description=description
+            description=description,
+            content_hash=content_hash,
         )
         self.db.add(new_photo)
+        if tags:
+            # photo and its tags in one transaction
+            await self.db.flush()
+            await TagRepo(self.db).add_tags_to_photo(new_photo.id, tags, commit=False)
         await self.db.commit()
         await self.db.refresh(new_photo)
         return new_photo
 
+    async def add_photos(
+        self, user: UserModel, photos: list[dict], tags: list[str] | None = None
+    ) -> list[PhotoModel]:
+        # photos: public_id, image_url, description, content_hash of every photo.
+        # All photos and their tags are added in one transaction
+        new_photos = [PhotoModel(user_id=user.id, **photo) for photo in photos]
+        self.db.add_all(new_photos)
+        await self.db.flush()
+        photo_ids = [photo.id for photo in new_photos]
+        if tags:
+            await TagRepo(self.db).add_tags_to_photos(photo_ids, tags, commit=False)
+        await self.db.commit()
+        # one query instead of refresh of every photo
+        stmt = select(PhotoModel).filter(PhotoModel.id.in_(photo_ids))
+        photos_by_id = {photo.id: photo for photo in (await self.db.execute(stmt)).scalars()}
+        return [photos_by_id[photo_id] for photo_id in photo_ids]
+
+    async def get_photos_by_content_hashes(
+        self, user_id: UUID, content_hashes: list[str]
+    ) -> dict[str, PhotoModel]:
+        stmt = (select(PhotoModel)
+                .filter(PhotoModel.user_id == user_id, PhotoModel.content_hash.in_(content_hashes))
+                .distinct(PhotoModel.content_hash))
+        result = await self.db.execute(stmt)
+        return {photo.content_hash: photo for photo in result.scalars().all()}
+
+    async def get_photo_by_content_hash(self, user_id: UUID, content_hash: str):
+        stmt = (select(PhotoModel)
+                .filter_by(user_id=user_id, content_hash=content_hash)
+                .limit(1))
+        result = await self.db.execute(stmt)
+        return result.scalar_one_or_none()
+
     async def get_all_photos(self, skip: int, limit: int):
         stmt = select(PhotoModel).offset(skip).limit(limit)
         result = await self.db.execute(stmt)
         # check here. Pycharm:  Expected type 'list[PhotoModel]', got 'Sequence[PhotoModel]' instead
-        return result.unique().scalars().all()
+        return result.scalars().all()
 
-    async def get_photo_from_db(self, photo_id: int):
+    async def get_photo_from_db(self, photo_id: int, profile: str = "exists"):
         # to check if the object exists or get one photo by id
-        stmt = select(PhotoModel).filter_by(id=photo_id)
+        stmt = (select(PhotoModel)
+                .filter_by(id=photo_id)
+                .options(*self.load_profiles[profile]))
         result = await self.db.execute(stmt)
-        return result.unique().scalar_one_or_none()
+        return result.scalar_one_or_none()
 
     async def get_photo_owner(self, photo_id: int, user_id: UUID):
         # to check if the user is owner of the photo. If result not None = exists
-        stmt = select(PhotoModel).filter(
-            and_(PhotoModel.id == photo_id, PhotoModel.user_id == user_id)
+        stmt = (select(PhotoModel)
+                .filter(and_(PhotoModel.id == photo_id, PhotoModel.user_id == user_id))
+                .options(*self.load_profiles["exists"]))
+        result = await self.db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def delete_photos(
+        self, photo_ids: list[int], user_id: UUID | None = None, commit: bool = True
+    ) -> list[Row]:
+        # one DELETE for all photos, comments, ratings, transformations and links to tags
+        # are deleted by database (ON DELETE CASCADE). user_id - delete only photos of the user.
+        # Return id and public_id of deleted photos
+        stmt = delete(PhotoModel).filter(PhotoModel.id == any_(self.int_array(photo_ids)))
+        if user_id is not None:
+            stmt = stmt.filter(PhotoModel.user_id == user_id)
+        result = await self.db.execute(stmt.returning(PhotoModel.id, PhotoModel.public_id))
+        deleted = result.all()
+        if commit:
+            await self.db.commit()
+        return deleted
+
+    async def get_photo_owners(self, photo_ids: list[int]) -> dict[int, UUID]:
+        stmt = select(PhotoModel.id, PhotoModel.user_id).filter(
+            PhotoModel.id == any_(self.int_array(photo_ids))
         )
         result = await self.db.execute(stmt)
-        return result.unique().scalar_one_or_none()
+        return dict(result.tuples().all())
 
-    async def delete_photo(self, photo: PhotoModel):
-        await self.db.delete(photo)
-        await self.db.commit()
+    async def get_used_public_ids(self, public_ids: list[str]) -> set[str]:
+        # stored files which are still used by some photos
+        stmt = select(PhotoModel.public_id).distinct().filter(
+            PhotoModel.public_id == any_(literal(public_ids, ARRAY(String)))
+        )
+        result = await self.db.execute(stmt)
+        return set(result.scalars().all())
+
+    @staticmethod
+    def int_array(values: list[int]):
+        # one array parameter instead of parameter for every value of IN (...)
+        return literal(values, ARRAY(Integer))
 
     async def update_photo(self, photo: PhotoModel):
         await self.db.commit()
@@ -86,52 +179,126 @@ class PhotoRepo:
         result = await self.db.execute(stmt)
         return result.scalar_one_or_none()
 
-    async def get_photo_object_with_params(self, skip: int, limit: int):
-        stmt = (select(PhotoModel.id,
-                       PhotoModel.image_url,
-                       PhotoModel.description,
-                       UserModel.username,
-                       func.json_agg(func.distinct(TagModel.name)).label('tags'),
-                       func.round(func.avg(RatingModel.value), 2).label('avg_rating')
-                       )
-                .select_from(UserModel)
-                .join(PhotoModel, isouter=True)
-                .join(RatingModel, isouter=True)
-                .join(photos_tags, isouter=True)
-                .join(TagModel, isouter=True)
-                .filter(PhotoModel.id.isnot(None))
-                .group_by(PhotoModel.id,
-                          UserModel.username,
-                          PhotoModel.image_url,
-                          PhotoModel.description,
-                          )
-                .offset(skip)
+    async def get_transformed_photo_by_url(self, photo_id: int, image_url: str):
+        stmt = select(TransformedImageLinkModel).filter_by(
+            photo_id=photo_id, image_url=image_url
+        ).limit(1)
+        result = await self.db.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def get_photo_object_with_params(
+        self, skip: int, limit: int, cursor: tuple[datetime, int] | None = None,
+        tags: list[str] | None = None, match_all: bool = True
+    ):
+        # choose photos for the page first, then read their columns
+        page = self.select_page(
+            (PhotoModel.id,), skip, limit, cursor, tags, match_all
+        ).subquery()
+
+        stmt = (select(*self.photo_row_columns(), PhotoModel.created_at)
+                .select_from(page)
+                .join(PhotoModel, PhotoModel.id == page.c.id)
+                .join(UserModel, UserModel.id == PhotoModel.user_id, isouter=True)
+                .order_by(PhotoModel.created_at.desc(), PhotoModel.id.desc()))
+        result = await self.db.execute(stmt)
+        return result
+
+    def select_page(
+        self, columns: tuple, skip: int, limit: int, cursor: tuple[datetime, int] | None = None,
+        tags: list[str] | None = None, match_all: bool = True
+    ):
+        # photos of the feed page, newest first.
+        # With cursor - seek right after the last photo of previous page,
+        # without it - old skip/limit mode.
+        page = (select(*columns)
+                .order_by(PhotoModel.created_at.desc(), PhotoModel.id.desc())
                 .limit(limit))
+        if tags:
+            page = page.filter(PhotoModel.id.in_(self.photo_ids_by_tags(tags, match_all)))
+        if cursor is not None:
+            page = page.filter(
+                tuple_(PhotoModel.created_at, PhotoModel.id) < tuple_(*cursor)
+            )
+        else:
+            page = page.offset(skip)
+        return page
+
+    @staticmethod
+    def search_document():
+        # description (weight A) and comments (weight B) of photo,
+        # the same expression as in GIN index ix_photos_search_document
+        return PhotoModel.search_vector.op("||")(PhotoModel.comments_vector)
+
+    async def search_photos(self, query: str, skip: int, limit: int):
+        # full-text search by description and comments,
+        # words in description rank higher than in comments
+        ts_query = func.websearch_to_tsquery("simple", query)
+        document = self.search_document()
+        rank = func.ts_rank(document, ts_query)
+        page = (select(PhotoModel.id, rank.label("rank"))
+                .filter(document.bool_op("@@")(ts_query))
+                .order_by(rank.desc(), PhotoModel.id.desc())
+                .offset(skip)
+                .limit(limit)
+                .subquery())
+
+        stmt = (select(*self.photo_row_columns(), page.c.rank)
+                .select_from(page)
+                .join(PhotoModel, PhotoModel.id == page.c.id)
+                .join(UserModel, UserModel.id == PhotoModel.user_id, isouter=True)
+                .order_by(page.c.rank.desc(), PhotoModel.id.desc()))
         result = await self.db.execute(stmt)
         return result
 
-    async def get_photo_page(self, photo_id: int, skip: int | None = None, limit: int | None = None):
-        stmt = (select(PhotoModel.id,
-                       PhotoModel.image_url,
-                       PhotoModel.description,
-                       UserModel.username,
-                       func.json_agg(func.distinct(TagModel.name)).label('tags'),
-                       func.round(func.avg(RatingModel.value), 2).label('avg_rating')
-                       )
-                .select_from(UserModel)
-                .join(PhotoModel, isouter=True)
-                .join(RatingModel, isouter=True)
-                .join(photos_tags, isouter=True)
-                .join(TagModel, isouter=True)
-                .filter(PhotoModel.id == photo_id)
-                .group_by(PhotoModel.id,
-                          UserModel.username,
-                          PhotoModel.image_url,
-                          PhotoModel.description,
-                          ))
+    async def get_photo_page(self, photo_id: int):
+        stmt = (select(*self.photo_row_columns(), PhotoModel.rating_histogram)
+                .join(UserModel, UserModel.id == PhotoModel.user_id, isouter=True)
+                .filter(PhotoModel.id == photo_id))
         result = await self.db.execute(stmt)
         return result.first()
 
+    async def get_transformed_photos_version(self, photo_id: int):
+        # count and the last creation of transformations, they are not changed
+        stmt = (select(func.count().label("count"),
+                       func.max(TransformedImageLinkModel.created_at).label("created_at"))
+                .filter(TransformedImageLinkModel.photo_id == photo_id))
+        result = await self.db.execute(stmt)
+        return result.one()
+
+    @staticmethod
+    def photo_ids_by_tags(tags: list[str], match_all: bool = True):
+        # ids of photos with tags, read from inverted index photos_tags (tag_id, photo_id).
+        # match_all - photo has every tag (intersection), else any of them (union)
+        tag_ids = select(TagModel.id).filter(TagModel.name.in_(tags))
+        stmt = (select(photos_tags.c.photo_id)
+                .filter(photos_tags.c.tag_id.in_(tag_ids)))
+        if match_all:
+            stmt = (stmt.group_by(photos_tags.c.photo_id)
+                    .having(func.count() == len(set(tags))))
+        return stmt
+
+    @staticmethod
+    def photo_row_columns():
+        # columns for photo in feed and on photo page.
+        # Rating is read from aggregates in photos table (see RatingRepo),
+        # tags are collected by subquery, so no GROUP BY is needed
+        tags = (select(func.json_agg(func.distinct(TagModel.name)))
+                .select_from(photos_tags)
+                .join(TagModel, TagModel.id == photos_tags.c.tag_id)
+                .filter(photos_tags.c.photo_id == PhotoModel.id)
+                .scalar_subquery())
+        avg_rating = func.round(
+            cast(PhotoModel.rating_sum, Numeric) / func.nullif(PhotoModel.rating_count, 0), 2
+        )
+        return (PhotoModel.id,
+                PhotoModel.image_url,
+                PhotoModel.description,
+                UserModel.username,
+                # photo without tags has [null] in tags, as before
+                func.coalesce(tags, func.json_build_array(null())).label('tags'),
+                avg_rating.label('avg_rating'),
+                )
+
     async def get_picture_count(self, user_id: UUID):
         stmt = select(func.count(PhotoModel.id)).where(PhotoModel.user_id == user_id)
         result = await self.db.execute(stmt)
@@ -1,9 +1,10 @@
 from uuid import UUID
 
-from sqlalchemy import and_, select
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.dialects.postgresql import array
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.models.photos import RatingModel
+from src.models.photos import PhotoModel, RatingModel
 from src.models.users import UserModel
 
 
@@ -11,9 +12,24 @@ class RatingRepo:
     def __init__(self, db):
         self.db: AsyncSession = db
 
+    async def change_rating_aggregates(self, photo_id: int, rate: int, sign: int):
+        # sign = 1 when rate added, -1 when deleted. Commit is up to caller.
+        stmt = (
+            update(PhotoModel)
+            .filter(PhotoModel.id == photo_id)
+            .values({
+                PhotoModel.rating_count: PhotoModel.rating_count + sign,
+                PhotoModel.rating_sum: PhotoModel.rating_sum + sign * rate,
+                PhotoModel.rating_histogram[rate]: PhotoModel.rating_histogram[rate] + sign,
+            })
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.execute(stmt)
+
     async def set_single_rate(self, photo_id: int, rate: int, user_id: UUID):
         new_rate = RatingModel(value=rate, photo_id=photo_id, user_id=user_id)
         self.db.add(new_rate)
+        await self.change_rating_aggregates(photo_id, rate, 1)
         await self.db.commit()
         await self.db.refresh(new_rate)
         return new_rate
@@ -69,5 +85,43 @@ class RatingRepo:
         result = result.scalar_one_or_none()
         if result:
             await self.db.delete(result)
+            await self.change_rating_aggregates(photo_id, result.value, -1)
             await self.db.commit()
         return result
+
+    async def rebuild_rating_aggregates(self, photo_id: int | None = None) -> int:
+        """
+        The rebuild_rating_aggregates function recalculates rating_count, rating_sum
+        and rating_histogram of photos from the ratings table.
+        Use it to backfill or repair aggregates (src/commands/rebuild_rating_aggregates.py).
+
+        :param self: Represent the instance of a class
+        :param photo_id: int | None: Rebuild only one photo. All photos if None
+        :return: Number of updated photos
+        """
+        photo_ratings = RatingModel.photo_id == PhotoModel.id
+        stmt = (
+            update(PhotoModel)
+            .values(
+                rating_count=select(func.count(RatingModel.id))
+                .filter(photo_ratings)
+                .scalar_subquery(),
+                rating_sum=select(func.coalesce(func.sum(RatingModel.value), 0))
+                .filter(photo_ratings)
+                .scalar_subquery(),
+                rating_histogram=select(
+                    array([
+                        func.count(RatingModel.id).filter(RatingModel.value == star)
+                        for star in range(1, 6)
+                    ])
+                )
+                .filter(photo_ratings)
+                .scalar_subquery(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if photo_id is not None:
+            stmt = stmt.filter(PhotoModel.id == photo_id)
+        result = await self.db.execute(stmt)
+        await self.db.commit()
+        return result.rowcount
@@ -1,7 +1,8 @@
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.models.photos import PhotoModel, TagModel
+from src.models.photos import TagModel, photos_tags
 
 
 class TagRepo:
@@ -9,20 +10,39 @@ class TagRepo:
     def __init__(self, db):
         self.db: AsyncSession = db
 
-    async def add_tags_to_photo(self, photo_id: int, tags_list: list[str]) -> None:
-        tags = []
-        for tag_str in tags_list:
-            tag_name = tag_str.lower().strip()
-            stmt = select(TagModel).filter_by(name=tag_name)
-            result = await self.db.execute(stmt)
-            tag = result.scalar_one_or_none()
-            if tag is None:
-                tag = TagModel(name=tag_name)
-                self.db.add(tag)
-                await self.db.commit()
-                await self.db.refresh(tag)
-            tags.append(tag)
-
-        photo = await self.db.get(PhotoModel, photo_id)
-        photo.tags = tags
-        await self.db.commit()
+    async def add_tags_to_photo(self, photo_id: int, tags_list: list[str], commit: bool = True) -> None:
+        await self.add_tags_to_photos([photo_id], tags_list, commit)
+
+    async def add_tags_to_photos(
+        self, photo_ids: list[int], tags_list: list[str], commit: bool = True
+    ) -> None:
+        # set-based: one upsert for all tags, one insert for all links of all photos.
+        # commit=False - caller commits, e.g. in the same transaction as photo insert
+        # sorted: concurrent uploads lock the same new tags in the same order
+        # in unique index, so they wait for each other instead of deadlock
+        tag_names = sorted({tag_str.lower().strip() for tag_str in tags_list})
+        if not tag_names:
+            return
+
+        # ON CONFLICT DO NOTHING returns only new tags, and it doesn't fail
+        # when concurrent upload creates the same tag
+        stmt = (pg_insert(TagModel)
+                .values([{"name": name} for name in tag_names])
+                .on_conflict_do_nothing(index_elements=[TagModel.name])
+                .returning(TagModel.id, TagModel.name))
+        tag_ids = dict((await self.db.execute(stmt)).tuples().all())
+        existing_names = set(tag_names) - set(tag_ids.values())
+        if existing_names:
+            stmt = select(TagModel.id, TagModel.name).filter(TagModel.name.in_(existing_names))
+            tag_ids.update((await self.db.execute(stmt)).tuples().all())
+
+        stmt = (pg_insert(photos_tags)
+                .values([
+                    {"photo_id": photo_id, "tag_id": tag_id}
+                    for photo_id in sorted(photo_ids)
+                    for tag_id in sorted(tag_ids)
+                ])
+                .on_conflict_do_nothing())
+        await self.db.execute(stmt)
+        if commit:
+            await self.db.commit()
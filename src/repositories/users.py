@@ -1,6 +1,8 @@
+from datetime import datetime, timedelta
+from typing import Sequence
 from uuid import UUID
 
-from sqlalchemy import func, select
+from sqlalchemy import delete, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 # models
@@ -31,7 +33,7 @@ class UserRepo:
         user = user.scalar_one_or_none()
         return user
 
-    async def create_user(self, body: UserSchema):
+    async def create_user(self, body: UserSchema, commit: bool = True):
         # Get all exist users in db
         stmt = select(UserModel)
         users = await self.db.execute(stmt)
@@ -43,8 +45,12 @@ class UserRepo:
             new_user.confirmed = True
             new_user.role = Roles.admin
         self.db.add(new_user)
-        await self.db.commit()
-        await self.db.refresh(new_user)
+        if commit:
+            await self.db.commit()
+            await self.db.refresh(new_user)
+        else:
+            # committed later together with other changes
+            await self.db.flush()
         return new_user
 
     async def change_email(self, user_id: UUID, new_email: str):
@@ -62,13 +68,14 @@ class UserRepo:
         token = token.scalar_one_or_none()
         return token
 
-    async def update_password(self, user_id: UUID, new_password_hash: str):
+    async def update_password(self, user_id: UUID, new_password_hash: str, commit: bool = True):
         stmt = select(UserModel).filter_by(id=user_id)
         user = await self.db.execute(stmt)
         user = user.scalar_one_or_none()
         user.password = new_password_hash
-        await self.db.commit()
-        await self.db.refresh(user)
+        if commit:
+            await self.db.commit()
+            await self.db.refresh(user)
 
     async def update_refresh_token(
         self, user: UserModel, refresh_token: TokenModel | None
@@ -92,24 +99,58 @@ class UserRepo:
             await self.db.commit()
         return result
 
-    async def add_token_to_blacklist(self, token: str):
-        # add access token to blacklist when user banned or use @logout
-        new_token = BlackListModel(token=token)
+    async def add_token_to_blacklist(
+        self,
+        jti: str | None,
+        subject: str | None,
+        created_at: datetime,
+        expires_at: datetime,
+        channel: str,
+        payload: str,
+        token_version: int | None = None,
+    ) -> BlackListModel:
+        # revoke token by jti (logout) or tokens of subject (ban, change by admin),
+        # other workers are notified in the same transaction
+        new_token = BlackListModel(
+            jti=jti,
+            subject=subject,
+            created_at=created_at,
+            expires_at=expires_at,
+            token_version=token_version,
+        )
         self.db.add(new_token)
+        await self.db.execute(select(func.pg_notify(channel, payload)))
         await self.db.commit()
-        await self.db.refresh(new_token)
         return new_token
 
-    async def get_token_blacklist(self, token: str):
-        # to check if object exists (token in blacklist)
-        stmt = select(BlackListModel).filter_by(token=token)
+    async def get_active_blacklist(self, now: datetime) -> Sequence[BlackListModel]:
+        stmt = select(BlackListModel).filter(BlackListModel.expires_at > now)
+        result = await self.db.execute(stmt)
+        return result.scalars().all()
+
+    async def purge_blacklist(self, now: datetime, max_token_lifetime: timedelta) -> int:
+        # rows without expires_at were added before it existed
+        stmt = delete(BlackListModel).filter(
+            (BlackListModel.expires_at < now)
+            | (
+                BlackListModel.expires_at.is_(None)
+                & (BlackListModel.created_at < now - max_token_lifetime)
+            )
+        )
         result = await self.db.execute(stmt)
-        return result.scalar_one_or_none()
+        await self.db.commit()
+        return result.rowcount
 
     async def confirmed_email(self, user: UserModel) -> None:
         user.confirmed = True
         await self.db.commit()
 
+    async def get_used_avatars(self, avatar_urls: list[str]) -> set[str]:
+        # avatar urls which are still set for some users
+        stmt = select(UserModel.avatar).distinct().filter(UserModel.avatar.in_(avatar_urls))
+        result = await self.db.execute(stmt)
+        return set(result.scalars().all())
+
     async def update_avatar(self, user_id: UUID, avatar_url: str) -> UserModel:
         stmt = select(UserModel).filter_by(id=user_id)
         user = await self.db.execute(stmt)
@@ -128,6 +169,7 @@ class UserRepo:
         user.is_active = body.is_active
         user.confirmed = body.confirmed
         user.role = body.role
+        user.token_version = UserModel.token_version + 1
         await self.db.commit()
         await self.db.refresh(user)
         return user
@@ -1,5 +1,5 @@
-from fastapi import (APIRouter, BackgroundTasks, Depends, HTTPException,
-                     Request, Security, status)
+from fastapi import (APIRouter, Depends, HTTPException, Request, Security,
+                     status)
 from fastapi.responses import RedirectResponse
 from fastapi.security import (HTTPAuthorizationCredentials, HTTPBearer,
                               OAuth2PasswordRequestForm)
@@ -11,7 +11,7 @@ from src.models.users import UserModel
 from src.schemas.users import (RequestPasswordResetSchema, TokenSchema,
                                UserSchema, UserMyResponseSchema)
 from src.services.auth import auth_service
-from src.services.email import EmailService
+from src.services.jobs import SEND_PASSWORD_RESET_MAIL, JobService
 
 router_auth = APIRouter(prefix="/auth", tags=["Auth"])
 get_refresh_token = HTTPBearer()
@@ -25,7 +25,6 @@ get_refresh_token = HTTPBearer()
 async def register(
     body: UserSchema,
     request: Request,
-    bt: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
 ):
     # need response model and body schema
@@ -42,17 +41,8 @@ async def register(
             detail=messages.USERNAME_IS_ALREADY_BUSY,
         )
 
-    body.password = auth_service.get_password_hash(body.password)
-    new_user = await auth_service.create_user(body, db)
-
-    # when we create the first user he is already confirmed. Don't need to send a verification mail.
-    if not new_user.confirmed:
-        bt.add_task(
-            EmailService().send_varification_mail,
-            new_user.email,
-            new_user.username,
-            str(request.base_url),
-        )
+    body.password = await auth_service.hash_password(body.password)
+    new_user = await auth_service.create_user(body, str(request.base_url), db)
 
     return new_user
 
@@ -78,11 +68,17 @@ async def login(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=messages.EMAIL_NOT_CONFIRMED,
         )
-    if not auth_service.verify_password(body.password, user.password):
+    is_valid, new_password_hash = await auth_service.check_password(body.password, user.password)
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail=messages.INVALID_PASSWORD
         )
-    access_token = await auth_service.create_access_token(user.email)
+    if new_password_hash is not None:
+        # work factor was changed in config - rehash with the new one
+        await auth_service.update_password(user.id, new_password_hash, db)
+    access_token = await auth_service.create_access_token(
+        user.email, role=user.role, token_version=user.token_version
+    )
     refresh_token = await auth_service.create_refresh_token(user.email)
 
     await auth_service.update_refresh_token(user, refresh_token, db)
@@ -121,7 +117,9 @@ async def refresh_token(
             detail=messages.INVALID_REFRESH_TOKEN,
         )
 
-    access_token = await auth_service.create_access_token(user.email)
+    access_token = await auth_service.create_access_token(
+        user.email, role=user.role, token_version=user.token_version
+    )
     refresh_token = await auth_service.create_refresh_token(user.email)
     await auth_service.update_refresh_token(user, refresh_token, db)
 
@@ -149,7 +147,6 @@ async def confirm_email(token: str, db: AsyncSession = Depends(get_db)):
 @router_auth.get("/password-reset/{token}", response_model=None)
 async def password_reset(
     token: str,
-    bt: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
 ):
     email = await auth_service.get_email_from_token(token)
@@ -158,15 +155,7 @@ async def password_reset(
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail=messages.VERIFICATION_ERROR
         )
-    new_password = auth_service.generate_password()
-    new_password_hash = auth_service.get_password_hash(new_password)
-    await auth_service.update_password(user.id, new_password_hash, db)
-    bt.add_task(
-        EmailService().send_new_password_mail,
-        user.email,
-        user.username,
-        new_password,
-    )
+    await auth_service.reset_password(user, db)
     return {"message": messages.NEW_PASSWORD_SENT}
 
 
@@ -174,7 +163,6 @@ async def password_reset(
 async def request_password_reset(
     body: RequestPasswordResetSchema,
     request: Request,
-    bt: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
 ):
     # Check if email exists
@@ -193,10 +181,12 @@ async def request_password_reset(
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail=messages.INVALID_USERNAME
         )
-    bt.add_task(
-        EmailService().send_request_password_mail,
-        exist_user.email,
-        exist_user.username,
-        str(request.base_url),
+    await JobService(db).enqueue(
+        SEND_PASSWORD_RESET_MAIL,
+        {
+            "email": exist_user.email,
+            "username": exist_user.username,
+            "host": str(request.base_url),
+        },
     )
     return {"message": messages.PASSWORD_RESET_REQUEST_SENT}
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, status
+
+from src.models.users import Roles
+from src.services.cache import photo_page_cache
+from src.services.qr import qr_code_cache
+from src.services.roles import RoleChecker
+from src.services.single_flight import photo_reads
+from src.services.token_cache import verified_tokens
+from src.services.user_cache import user_cache
+
+router_cache = APIRouter(prefix="/cache", tags=["Cache"])
+
+
+@router_cache.get(
+    "/stats",
+    dependencies=[Depends(RoleChecker([Roles.admin]))],
+    status_code=status.HTTP_200_OK,
+)
+async def cache_stats():
+    """
+    Hits and misses of caches in current worker process,
+    reads of photos which were executed and which got result of concurrent read.
+
+    Only for admin.
+    """
+    return {
+        "photo_page": photo_page_cache.stats(),
+        "photo_reads": photo_reads.stats(),
+        "users": user_cache.stats(),
+        "tokens": verified_tokens.stats(),
+        "qr_codes": qr_code_cache.stats(),
+    }
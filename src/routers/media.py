@@ -0,0 +1,107 @@
+import mimetypes
+import re
+from pathlib import Path as FilePath
+
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, Path, Request, Response, status
+from fastapi.responses import FileResponse, StreamingResponse
+
+from src.conf import messages
+from src.dependencies.storage import get_storage
+from src.services.storage import StorageBackend
+
+router_media = APIRouter(prefix="/media", tags=["Media"])
+
+CHUNK_SIZE_BYTES = 64 * 1024
+# files are content-addressed, so they never change and can be cached forever
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(range_header: str, file_size: int) -> tuple[int, int]:
+    """
+    Parse single "Range: bytes=start-end" header, return (start, end) with end included.
+    Raise ValueError if range is invalid or not satisfiable.
+    """
+    match = RANGE_PATTERN.match(range_header.strip())
+    if not match:
+        raise ValueError(range_header)
+    start, end = match.groups()
+    if not start and not end:
+        raise ValueError(range_header)
+    if not start:
+        # suffix range: last N bytes
+        length = int(end)
+        if length == 0:
+            raise ValueError(range_header)
+        return max(file_size - length, 0), file_size - 1
+    start = int(start)
+    end = int(end) if end else file_size - 1
+    if start >= file_size or start > end:
+        raise ValueError(range_header)
+    return start, min(end, file_size - 1)
+
+
+async def read_file_range(path: FilePath, start: int, end: int):
+    async with await anyio.open_file(path, "rb") as file:
+        await file.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await file.read(min(CHUNK_SIZE_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+@router_media.get("/{public_id:path}", response_class=FileResponse)
+async def get_media_file(
+    request: Request,
+    public_id: str = Path(description="Public ID of stored file"),
+    storage: StorageBackend = Depends(get_storage),
+):
+    """
+    Serve file of local storage backend.
+    Supports single byte range requests and conditional requests by ETag.
+
+    """
+    path = storage.get_file_path(public_id)
+    if path is None or not await anyio.Path(path).is_file():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=messages.FILE_NOT_FOUND
+        )
+
+    # name of file is sha256 of its content, so it is strong ETag
+    headers = {
+        "ETag": f'"{path.stem}"',
+        "Cache-Control": CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+    }
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if_none_match_tags = [tag.strip() for tag in if_none_match.split(",")]
+    if headers["ETag"] in if_none_match_tags or "*" in if_none_match_tags:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    range_header = request.headers.get("range")
+    if range_header:
+        file_size = (await anyio.Path(path).stat()).st_size
+        try:
+            start, end = parse_range(range_header, file_size)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                detail=messages.INVALID_RANGE,
+                headers={"Content-Range": f"bytes */{file_size}"},
+            )
+        headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            read_file_range(path, start, end),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            headers=headers,
+            media_type=mimetypes.guess_type(path.name)[0],
+        )
+
+    # whole file is sent by server (sendfile / pathsend) when it is supported
+    return FileResponse(path, headers=headers)
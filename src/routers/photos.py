@@ -1,20 +1,24 @@
-from copy import deepcopy
-from typing import Annotated, List
+from typing import Annotated, List, Literal
 
 from fastapi import (APIRouter, Depends, HTTPException, Path, Query, Request,
-                     status)
-from fastapi.responses import RedirectResponse, StreamingResponse
+                     Response, status)
+from fastapi.responses import FileResponse, RedirectResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 # config
 from src.conf import messages
+from src.conf.config import config
 from src.dependencies.database import get_db
+from src.dependencies.storage import get_storage
 # models
 from src.models.users import Roles, UserModel
 # schemas
 from src.schemas import comment, rating
 from src.schemas.comment import CommentResponseShort
-from src.schemas.photos import (ImageResponseAfterCreateSchema,
+from src.schemas.photos import (ImageBatchDeleteResponseSchema,
+                                ImageBatchDeleteSchema,
+                                ImageBatchItemResponseSchema, ImageBatchSchema,
+                                ImageResponseAfterCreateSchema,
                                 ImageResponseAfterUpdateSchema, ImageSchema)
 from src.schemas.transform import TransformRequestSchema
 from src.schemas.unified import (ImagePageResponseFullSchema,
@@ -22,16 +26,21 @@ from src.schemas.unified import (ImagePageResponseFullSchema,
                                  ShowAllRateSchema)
 # services
 from src.services.auth import auth_service
-from src.services.cloudinary import CloudinaryService
 from src.services.comments import CommentService
+from src.services.conditional import ConditionalService
 from src.services.photos import PhotoService
-from src.services.qr import QRCodeService
+from src.services.qr import QRCodeService, qr_code_cache
 from src.services.rating import RatingService
 from src.services.roles import RoleChecker
+from src.services.serialization import get_serializer
+from src.services.storage import StorageBackend
 from src.services.tags import TagService
+from src.services.transform import TransformService, derivative_cache
 
 # routers
 router_photos = APIRouter(prefix="/photos", tags=["Photos"])
+# qr code of url never changes, but transformation can be deleted
+QR_CODE_CACHE_CONTROL = "public, max-age=86400"
 
 
 @router_photos.get(
@@ -41,21 +50,108 @@ router_photos = APIRouter(prefix="/photos", tags=["Photos"])
     status_code=status.HTTP_200_OK,
 )
 async def show_photos(
+    request: Request,
     limit: Annotated[int, Query(description="Limit photos per page", ge=4, le=20)] = 4,
     skip: Annotated[int, Query(description="Skip number of photos", ge=0)] = 0,
+    cursor: Annotated[
+        str | None, Query(description="Cursor from X-Next-Cursor header of previous page")
+    ] = None,
+    tags: Annotated[
+        str | None, Query(description="Show only photos with tags, separated by comma")
+    ] = None,
+    mode: Annotated[
+        Literal["all", "any"], Query(description="Photo has all tags or any of them")
+    ] = "all",
     db: AsyncSession = Depends(get_db),
 ):
     """
-    Show all photos. Pagination in query parameters:
+    Show all photos, newest first. Pagination in query parameters:
         limit = limit photos per page
         skip = skip images from previous pages.
             Example: when limit = 10 photos per page,
             for the 3d page skip = 20.
+        cursor = value of X-Next-Cursor header from previous page.
+            When cursor is set, skip is ignored.
+            Use it for deep pages - it is fast for any page
+            and does not shift when new photos are uploaded.
+
+    X-Next-Cursor header is not sent for the last page.
+
+    Conditional GET: If-None-Match with ETag of the previous response -
+    304 without body if photos of the page are not changed.
+
+    Search by tags: tags = "tag1,tag2" (max 5 tags),
+        mode = all - photos with every tag, any - with at least one of them.
 
     Show for all users, unregistered too
     """
-    photos = await PhotoService(db).get_all_photo_per_page(skip=skip, limit=limit)
-    return photos
+    list_tags = None
+    if tags:
+        list_tags = await TagService(db).normalize_list_of_tag(tags)
+        if len(list_tags) > 5:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=messages.TOO_MANY_TAGS
+            )
+    photos, next_cursor, validators = await PhotoService(db).get_all_photo_per_page(
+        skip=skip, limit=limit, cursor=cursor, tags=list_tags, match_all=mode == "all"
+    )
+    not_modified = ConditionalService.not_modified_response(request, validators)
+    if not_modified is not None:
+        if next_cursor is not None:
+            not_modified.headers["X-Next-Cursor"] = next_cursor
+        return not_modified
+
+    headers = validators.headers
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+    # rows of our query have types of the schema, they are not validated again
+    return get_serializer(list[ImagePageResponseShortSchema]).response(photos, headers=headers)
+
+
+@router_photos.post(
+    "/batch",
+    response_model=list[ImageBatchItemResponseSchema],
+    dependencies=None,
+    status_code=status.HTTP_200_OK,
+)
+async def upload_photos_batch(
+    body: ImageBatchSchema = Depends(),
+    db: AsyncSession = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage),
+    current_user: UserModel = Depends(auth_service.get_current_user),
+):
+    """
+    Upload many photos in one request (max 50 files in "files").
+    Description and tags are optional and the same for all photos.
+    Only 5 tags accepted with ,(coma) separator.
+
+    Result is returned for every file in the same order: status_code 201 and photo
+    when it is created, or status_code and detail of error. Valid files are added
+    even if other files are not valid.
+
+    Only for registered users.
+    """
+    if len(body.files) > config.MAX_BATCH_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=messages.TOO_MANY_FILES.format(max_files=config.MAX_BATCH_FILES)
+        )
+
+    tags = []
+    if body.tags:
+        tags = await TagService(db).normalize_list_of_tag(body.tags)
+        if len(tags) > 5:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=messages.TOO_MANY_TAGS
+            )
+        if any(len(tag) > 20 for tag in tags):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=messages.MAX_LEN_TAG
+            )
+
+    results = await PhotoService(db).add_photos_batch(
+        current_user, body.files, body.description, tags, storage
+    )
+    return results
 
 
 @router_photos.get(
@@ -65,6 +161,7 @@ async def show_photos(
     status_code=status.HTTP_200_OK,
 )
 async def show_photo(
+    request: Request,
     photo_id: Annotated[int, Path(title="Photo ID", ge=1)],
     limit: Annotated[
         int, Query(description="Limit comments per page", ge=1, le=50)
@@ -79,14 +176,21 @@ async def show_photo(
     Additional undocumented functionality: if limit = 1,
     skip shows specific comment. (do not use as hardcoded url for comment)
 
+    Conditional GET: If-None-Match with ETag - 304 without body
+    if photo, its rates, tags and comments are not changed.
+
     Show for all users, unregistered too
     """
-    photo = await PhotoService(db).get_one_photo_page(photo_id, skip, limit)
+    photo, validators = await PhotoService(db).get_one_photo_page(photo_id, skip, limit)
     if not photo:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=messages.PHOTO_NOT_FOUND
         )
-    return photo
+    not_modified = ConditionalService.not_modified_response(request, validators)
+    if not_modified is not None:
+        return not_modified
+
+    return get_serializer(ImagePageResponseFullSchema).response(photo, headers=validators.headers)
 
 
 @router_photos.post(
@@ -98,6 +202,7 @@ async def show_photo(
 async def upload_photo(
     body: ImageSchema = Depends(),
     db: AsyncSession = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage),
     current_user: UserModel = Depends(auth_service.get_current_user),
 ):
     """
@@ -107,8 +212,8 @@ async def upload_photo(
     Only for registered users.
     """
 
-    # Validate photo
-    await PhotoService(db).validate_photo(body.file)
+    # Validate photo. Too big request is rejected before by UploadLimitMiddleware
+    content_hash = await PhotoService(db).validate_photo(body.file)
 
     # Normalize tags
     if body.tags:
@@ -125,20 +230,21 @@ async def upload_photo(
     else:
         body.tags = []
 
-    # Upload photo and get url
-    photo_cloud_url, public_id = CloudinaryService().upload_photo(
-        body.file, current_user
+    # Upload photo and get url. If user has already uploaded the same file,
+    # new photo uses stored file of the old one
+    same_photo = await PhotoService(db).get_photo_by_content_hash(current_user.id, content_hash)
+    if same_photo:
+        photo_cloud_url, public_id = same_photo.image_url, same_photo.public_id
+    else:
+        photo_cloud_url, public_id = await storage.upload_photo(body.file, current_user)
+    # Add new_photo to db. Response is made here, while the session is open,
+    # so the photo doesn't have to be copied
+    new_photo = await PhotoService(db).add_photo(
+        current_user, public_id, photo_cloud_url, body.description, content_hash, body.tags
     )
-    # Add new_photo to db
-    # Without deepcopy(or copy), new_photo isn't returned. I don't know why.
-    new_photo = deepcopy(
-        await PhotoService(db).add_photo(
-            current_user, public_id, photo_cloud_url, body.description
-        )
+    return get_serializer(ImageResponseAfterCreateSchema).response(
+        new_photo, status_code=status.HTTP_201_CREATED
     )
-    if body.tags:
-        await TagService(db).add_tags_to_photo(new_photo.id, body.tags)
-    return new_photo
 
 
 @router_photos.post(
@@ -201,6 +307,36 @@ async def add_rate(
     return result
 
 
+@router_photos.delete(
+    "/batch",
+    response_model=ImageBatchDeleteResponseSchema,
+    dependencies=None,
+    status_code=status.HTTP_200_OK,
+)
+async def delete_photos_batch(
+    body: ImageBatchDeleteSchema,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserModel = Depends(auth_service.get_current_user),
+):
+    """
+    Delete many photos (max 10000 ids in body) with their comments,
+    ratings and transformations from db and storage.
+
+    Only for registered users.
+    Owners delete their photos, moderators and admins - any photos.
+    Result has ids of deleted photos, photos which are not found
+    and photos of other users (not deleted).
+    """
+    admin_moderator_check = await RoleChecker(
+        [Roles.admin, Roles.moderator]
+    ).check_admin_or_moderator(user_id=current_user.id, db=db)
+
+    result = await PhotoService(db).delete_photos_batch(
+        body.photo_ids, current_user, admin_moderator_check is not None
+    )
+    return result
+
+
 @router_photos.delete(
     "/{photo_id}",
     response_model=None,
@@ -218,7 +354,7 @@ async def delete_photo_comment(
 ):
     """
     Delete
-    image from db and cloudinary
+    image from db and storage (later, by job worker)
     or
     Photo transformation with selected id for selected photo_id
     or
@@ -227,7 +363,7 @@ async def delete_photo_comment(
     Only for registered users.
     Operation for owners, moderators and admins.
     """
-    photo = await PhotoService(db).get_photo_exists(photo_id)
+    photo = await PhotoService(db).get_photo_exists(photo_id, profile="owner_check")
     # if del photo
     if photo is None:
         # if no object to work with
@@ -245,20 +381,9 @@ async def delete_photo_comment(
         if (photo.user_id == current_user.id) or admin_moderator_check is not None:
             # if owner or admin - we can delete photo or one of transformation
             if not select:
-                # delete photo
-                try:
-                    result = CloudinaryService().destroy_photo(public_id=photo.public_id)
-                    if result["result"] == "ok":
-                        await PhotoService(db).delete_photo(photo)
-                    elif result["result"] == "not found":
-                        raise HTTPException(
-                            status_code=status.HTTP_404_NOT_FOUND,
-                            detail=messages.PHOTO_NOT_FOUND,
-                        )
-                except AttributeError:
-                    raise HTTPException(
-                        status_code=status.HTTP_404_NOT_FOUND, detail=messages.PHOTO_NOT_FOUND
-                    )
+                # delete photo, stored file is deleted by job worker
+                # if it is not used by other photos
+                await PhotoService(db).delete_photo(photo)
             elif select == "transform":
                 # delete transformation by id no checks because no errors if not exists
                 await PhotoService(db).delete_transformed_photo(photo_id, object_id)
@@ -296,12 +421,18 @@ async def delete_photo_comment(
     status_code=status.HTTP_200_OK,
 )
 async def get_transformed_photos(
+    request: Request,
+    response: Response,
     photo_id: Annotated[int, Path(title="Photo ID", ge=1)],
     select: Annotated[
-        str | None, Query(description="Choose action", enum=["url", "qrcode"])
+        str | None, Query(description="Choose action", enum=["url", "qrcode", "image"])
     ] = None,
     object_id: Annotated[int, Query(description="Choose object ID", ge=1)] = None,
+    t: Annotated[
+        str | None, Query(description="Transformation for local engine (select=image)")
+    ] = None,
     db: AsyncSession = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage),
 ):
     """
     Get List of photo transformations with default query
@@ -312,21 +443,49 @@ async def get_transformed_photos(
     or show photo by url from qrcode (generated in post method)
     for transformation with object_id for photo with photo_id
 
+    Show transformed photo rendered by local engine (select=image),
+    url with transformation is created by post method
+
+    List of transformations supports conditional GET (If-None-Match)
     """
     # check if photo object exists to work with it
-    photo = await PhotoService(db).get_photo_exists(photo_id)
+    photo = await PhotoService(db).get_photo_exists(photo_id, profile="owner_check")
     if not photo:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=messages.PHOTO_NOT_FOUND
         )
 
+    if select == "image":
+        # render only transformations which were created by photo owner
+        source_path = storage.get_file_path(photo.public_id)
+        transformed_photo = None
+        if t is not None and source_path is not None:
+            transformed_photo = await PhotoService(db).get_transformed_photo_by_url(
+                photo_id, TransformService.build_url(photo_id, t)
+            )
+        if not transformed_photo:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=messages.TRANSFORMED_PHOTOS_NOT_FOUND,
+            )
+        path = await derivative_cache.get_or_create(photo.public_id, t, source_path)
+        return FileResponse(
+            path,
+            headers={"Cache-Control": "public, max-age=31536000, immutable"},
+        )
+
     # get all variants of transformations for current photo
     if select is None:
         # show list of transformed variants for current photo.
         # Empty list if we have no transformations
+        validators = await PhotoService(db).get_transformed_photos_validators(photo_id)
+        not_modified = ConditionalService.not_modified_response(request, validators)
+        if not_modified is not None:
+            return not_modified
         transformed_photos = await PhotoService(db).get_transformed_photos_by_photo_id(
             photo_id
         )
+        response.headers.update(validators.headers)
         return transformed_photos
 
     elif select and object_id:
@@ -362,6 +521,62 @@ async def get_transformed_photos(
         )
 
 
+async def qr_code_response(
+    request: Request, photo_id: int, object_id: int, image_format: str | None, status_code: int
+) -> Response:
+    # qr code depends only on url, images are cached and have strong ETag.
+    # Url is made from configured BASE_URL, so there is one cached image
+    # for every transformation whatever Host header is sent
+    transform_photo_url = (
+        f"{config.BASE_URL.rstrip('/')}/api/photos/{photo_id}/transform/"
+        f"?select=qrcode&object_id={object_id}"
+    )
+    image_format = image_format or QRCodeService.choose_format(request.headers.get("accept"))
+    image = await qr_code_cache.get_or_create(transform_photo_url, image_format)
+
+    headers = {"ETag": image.etag, "Vary": "Accept", "Cache-Control": QR_CODE_CACHE_CONTROL}
+    if request.method == "GET" and ConditionalService.etag_matches(
+        request.headers.get("if-none-match"), image.etag
+    ):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(
+        image.content, status_code=status_code, media_type=image.media_type, headers=headers
+    )
+
+
+@router_photos.get(
+    "/{photo_id}/transform/qrcode",
+    response_class=Response,
+    dependencies=None,
+    status_code=status.HTTP_200_OK,
+)
+async def get_transformed_photo_qr_code(
+    photo_id: Annotated[int, Path(title="Photo ID", ge=1)],
+    object_id: Annotated[int, Query(description="Transformation ID", ge=1)],
+    request: Request,
+    image_format: Annotated[
+        str | None, Query(alias="format", description="Format of qr code", enum=["png", "svg"])
+    ] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Show qr code with url of photo transformation: png or svg
+    (by format or Accept header, png by default).
+
+    For all users, unregistered too.
+    Supports conditional requests by ETag.
+    """
+    transform_photo = await PhotoService(db).get_transformed_photo_by_transformed_id(
+        photo_id, object_id
+    )
+    if not transform_photo:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=messages.TRANSFORMED_PHOTOS_NOT_FOUND,
+        )
+    return await qr_code_response(request, photo_id, object_id, image_format, status.HTTP_200_OK)
+
+
 @router_photos.post(
     "/{photo_id}/transform",
     response_model=None,
@@ -376,15 +591,19 @@ async def transform_photo(
         str, Query(description="Choose action", enum=["create", "qrcode"])
     ] = "create",
     object_id: Annotated[int, Query(description="Choose object ID", ge=1)] = None,
+    image_format: Annotated[
+        str | None, Query(alias="format", description="Format of qr code", enum=["png", "svg"])
+    ] = None,
     db: AsyncSession = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage),
     current_user: UserModel = Depends(auth_service.get_current_user),
 ):
     """
     Crate photo transformation for current photo or
-    Generate qr code for photo transformation
+    Generate qr code for photo transformation (png or svg, by format or Accept header)
 
     """
-    photo = await PhotoService(db).get_photo_exists(photo_id)
+    photo = await PhotoService(db).get_photo_exists(photo_id, profile="owner_check")
     if not photo:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=messages.PHOTO_NOT_FOUND
@@ -394,7 +613,8 @@ async def transform_photo(
     if select == "create" and photo.user_id == current_user.id:
         # make transformation with current photo
         try:
-            transform_photo_url = CloudinaryService().get_transformed_photo_url(
+            transform_photo_url = storage.get_transformed_photo_url(
+                photo_id=photo.id,
                 public_id=photo.public_id,
                 request_for_transformation=transformation.model_dump(),
             )
@@ -419,12 +639,10 @@ async def transform_photo(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=messages.TRANSFORMED_PHOTOS_NOT_FOUND,
             )
-        transform_photo_url = \
-            f"{str(request.base_url)}api/photos/{photo_id}/transform/?select=qrcode&object_id={object_id}"
-
-        transformed_qr_code = QRCodeService().generate_qr_code(transform_photo_url)
         # Show qrcode in Swagger
-        return StreamingResponse(transformed_qr_code, media_type="image/jpeg", status_code=status.HTTP_201_CREATED)
+        return await qr_code_response(
+            request, photo_id, object_id, image_format, status.HTTP_201_CREATED
+        )
     else:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
@@ -454,7 +672,7 @@ async def update_photo(
     Only for registered users.
     Add - check if admin|moderator|owner
     """
-    photo = await PhotoService(db).get_photo_exists(photo_id)
+    photo = await PhotoService(db).get_photo_exists(photo_id, profile="owner_check")
     # if no photo exists - nothing to edit
     if not photo:
         raise HTTPException(
@@ -524,7 +742,7 @@ async def show_rates(
         )
 
     result = await RatingService(db).get_rates(photo_id=photo_id)
-    return result
+    return get_serializer(List[ShowAllRateSchema]).response(result)
 
 
 @router_photos.delete(
@@ -556,4 +774,3 @@ async def delete_rate(
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail=messages.RATING_NOT_SET
         )
-    return result
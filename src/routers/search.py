@@ -0,0 +1,36 @@
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.dependencies.database import get_db
+from src.schemas.unified import ImageSearchResponseSchema
+from src.services.photos import PhotoService
+from src.services.serialization import get_serializer
+
+router_search = APIRouter(prefix="/search", tags=["Search"])
+
+
+@router_search.get(
+    "",
+    response_model=list[ImageSearchResponseSchema],
+    dependencies=None,
+    status_code=status.HTTP_200_OK,
+)
+async def search_photos(
+    q: Annotated[str, Query(description="Words to search", min_length=1, max_length=255)],
+    limit: Annotated[int, Query(description="Limit photos per page", ge=4, le=20)] = 4,
+    skip: Annotated[int, Query(description="Skip number of photos", ge=0)] = 0,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Full-text search of photos by description and comments.
+    Best matches first: words in description count more than in comments.
+
+    Query syntax: words, "quoted phrase", OR, -word to exclude.
+    Pagination in query parameters: limit and skip, as for all photos.
+
+    Show for all users, unregistered too
+    """
+    photos = await PhotoService(db).search_photos(q, skip=skip, limit=limit)
+    return get_serializer(list[ImageSearchResponseSchema]).response(photos)
@@ -3,13 +3,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.conf import messages
 from src.dependencies.database import get_db
+from src.dependencies.storage import get_storage
 from src.models.users import Roles, UserModel
 from src.schemas.users import (UserUpdateAvatarSchema, UserMyResponseSchema, UserResponseExtendedSchema,
                                UserUpdateByAdminSchema, UserUpdateEmailSchema, UserAdminResponseSchema)
 from src.services.auth import auth_service
 from src.services.photos import PhotoService
-from src.services.cloudinary import CloudinaryService
 from src.services.roles import RoleChecker
+from src.services.storage import StorageBackend
 
 router_users = APIRouter(prefix="/users", tags=["Users"])
 
@@ -56,7 +57,10 @@ async def update_email_current_user(
             status_code=status.HTTP_409_CONFLICT, detail=messages.EMAIL_IS_ALREADY_BUSY
         )
 
-    if not auth_service.verify_password(body.confirm_password, current_user.password):
+    # password hash is not kept in cached current user
+    user = await auth_service.get_user_by_id(current_user.id, db)
+    is_valid, _ = await auth_service.check_password(body.confirm_password, user.password)
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail=messages.INVALID_PASSWORD
         )
@@ -77,16 +81,18 @@ async def update_avatar_current_user(
     body: UserUpdateAvatarSchema = Depends(),
     current_user: UserModel = Depends(auth_service.get_current_user),
     db: AsyncSession = Depends(get_db),
+    storage: StorageBackend = Depends(get_storage),
 ):
-    if not auth_service.verify_password(body.confirm_password, current_user.password):
+    # password hash is not kept in cached current user
+    user = await auth_service.get_user_by_id(current_user.id, db)
+    is_valid, _ = await auth_service.check_password(body.confirm_password, user.password)
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail=messages.INVALID_PASSWORD
         )
 
     if body.avatar:
-        photo_cloud_url = CloudinaryService().upload_avatar(
-            body.avatar, current_user.id
-        )
+        photo_cloud_url = await storage.upload_avatar(body.avatar, current_user.id)
         current_user = await auth_service.update_avatar(
             current_user.id, photo_cloud_url, db
         )
@@ -5,6 +5,8 @@ from typing import List, Optional
 from fastapi import File, UploadFile
 from pydantic import BaseModel, Field
 
+from src.conf.config import config
+
 
 class ImageUpdateSchema(BaseModel):
     description: Optional[str] = Field(min_length=3, max_length=255)
@@ -15,6 +17,22 @@ class ImageSchema(ImageUpdateSchema):
     tags: Optional[str] = None
 
 
+class ImageBatchSchema(BaseModel):
+    files: List[UploadFile] = File()
+    description: Optional[str] = Field(default=None, min_length=3, max_length=255)
+    tags: Optional[str] = None
+
+
+class ImageBatchDeleteSchema(BaseModel):
+    photo_ids: List[int] = Field(min_length=1, max_length=config.MAX_BATCH_DELETE)
+
+
+class ImageBatchDeleteResponseSchema(BaseModel):
+    deleted: List[int]
+    not_found: List[int]
+    forbidden: List[int]
+
+
 class ImageBaseResponseSchema(BaseModel):
     id: int
     image_url: str | None
@@ -42,6 +60,14 @@ class ImageResponseAfterCreateSchema(ImageResponseAfterUpdateSchema):
     public_id: str
 
 
+class ImageBatchItemResponseSchema(BaseModel):
+    # result for one file of batch upload, in the same order as files
+    filename: str | None
+    status_code: int
+    detail: str | None = None
+    photo: ImageResponseAfterCreateSchema | None = None
+
+
 class ImageResponseSchema(ImageExtendedResponseSchema):
     user_id: uuid.UUID
     # tags: Optional[List[str]] = []
@@ -11,7 +11,14 @@ class ImagePageResponseShortSchema(ImageResponseTagsSchema):
     avg_rating: Optional[float] | None
 
 
+class ImageSearchResponseSchema(ImagePageResponseShortSchema):
+    # how good photo matches the search query, the higher the better
+    rank: float
+
+
 class ImagePageResponseFullSchema(ImagePageResponseShortSchema):
+    # count of rates with value 1, 2, 3, 4, 5
+    rating_histogram: Optional[List[int]] | None = None
     comments: Optional[List[CommentResponseIntegratedSchema | None]] = []
 
 
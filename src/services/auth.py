@@ -1,25 +1,30 @@
 import secrets
+import time
 from copy import copy
 from datetime import datetime, timedelta
 from typing import Optional
-from uuid import UUID
+from uuid import UUID, uuid4
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.conf import messages
 from src.conf.config import config
 from src.dependencies.database import get_db
-from src.models.users import UserModel
+from src.models.users import Roles, UserModel
 from src.repositories.users import UserRepo
 from src.schemas.users import UserSchema, UserUpdateByAdminSchema
+from src.services.jobs import SEND_NEW_PASSWORD_MAIL, SEND_VERIFICATION_MAIL, JobService
+from src.services.passwords import password_hasher
+from src.services.revocation import token_revocation
+from src.services.token_cache import verified_tokens
+from src.services.user_cache import get_request_roles, get_request_users, user_cache
 
 
 class AuthService:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    pwd_context = password_hasher.context
     SECRET_KEY = config.SECRET_KEY_JWT
     ALGORITHM = config.ALGORITHM
 
@@ -36,8 +41,21 @@ class AuthService:
         return user
 
     def get_password_hash(self, password: str):
+        # blocks event loop, in async code use hash_password
         return self.pwd_context.hash(password)
 
+    async def hash_password(self, password: str) -> str:
+        return await password_hasher.hash_async(password)
+
+    async def check_password(
+        self, plain_password: str, hashed_password: str
+    ) -> tuple[bool, str | None]:
+        """
+        Verify password in pool of workers. Return (is password valid,
+        new hash if old one was made with other work factor or None).
+        """
+        return await password_hasher.verify_and_update(plain_password, hashed_password)
+
     def generate_password(self):
         length = 12
         alphabet = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
@@ -46,8 +64,18 @@ class AuthService:
     def verify_password(self, plain_password, hashed_pasword):
         return self.pwd_context.verify(plain_password, hashed_pasword)
 
-    async def create_user(self, body: UserSchema, db: AsyncSession):
-        new_user = await UserRepo(db).create_user(body)
+    async def create_user(self, body: UserSchema, host: str, db: AsyncSession):
+        # user and verification mail (outbox of job worker) are committed together
+        new_user = await UserRepo(db).create_user(body, commit=False)
+        # when we create the first user he is already confirmed. Don't need to send a verification mail.
+        if not new_user.confirmed:
+            await JobService(db).enqueue(
+                SEND_VERIFICATION_MAIL,
+                {"email": new_user.email, "username": new_user.username, "host": host},
+                commit=False,
+            )
+        await db.commit()
+        await db.refresh(new_user)
 
         return new_user
 
@@ -64,35 +92,41 @@ class AuthService:
     #     return user
 
     async def check_access_token_blacklist(self, token, db: AsyncSession):
-        blacklist = await UserRepo(db).get_token_blacklist(token)
-        return blacklist
+        # checked in memory, db is not used
+        return True if token_revocation.is_revoked(token) else None
 
     async def change_email(self, user_id: UUID, new_email: str, db: AsyncSession):
         user = await UserRepo(db).change_email(user_id, new_email)
+        user_cache.invalidate(user_id)
         return user
 
     async def extract_token_data(self, token, db: AsyncSession):
         # double usage of code, separate func
         # check if we can use token (not in blacklist)
         # if it is - raise 401.
-        blacklist = await self.check_access_token_blacklist(token, db)
-        if blacklist is not None:
-            raise self.credentials_exception
-
-        try:
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
-            email = payload["sub"]
-            if payload["scope"] == "access_token":
-                if email is None:
-                    raise self.credentials_exception
-            else:
+        payload = verified_tokens.get(token)
+        if payload is None:
+            try:
+                payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            except JWTError:
                 raise self.credentials_exception
-        except JWTError:
+            verified_tokens.set(token, payload)
+        if token_revocation.is_revoked(token, payload):
+            raise self.credentials_exception
+        email = payload.get("sub")
+        if payload.get("scope") != "access_token" or email is None:
             raise self.credentials_exception
         user_hash = str(email)
-        user = await UserRepo(db).get_user_by_email(user_hash)
+        user = user_cache.get(user_hash)
         if user is None:
-            raise self.credentials_exception
+            user = await UserRepo(db).get_user_by_email(user_hash)
+            if user is None:
+                raise self.credentials_exception
+            user_cache.set(user)
+        get_request_users(db)[user.id] = user
+        if "role" in payload:
+            # token version is checked by token_revocation, so role in claims is current
+            get_request_roles(db)[user.id] = Roles(payload["role"])
         return user
 
     async def get_current_user(self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
@@ -108,14 +142,31 @@ class AuthService:
         user = await self.extract_token_data(token, db)
         return user
 
-    async def create_access_token(self, email: str, expires_delta: Optional[float] = None):
+    async def create_access_token(
+        self,
+        email: str,
+        expires_delta: Optional[float] = None,
+        role: Optional[Roles] = None,
+        token_version: Optional[int] = None,
+    ):
         to_encode = {"sub": str(email)}
+        if role is not None:
+            # role checks use claims, token is revoked when admin changes user
+            to_encode.update({"role": role.value, "ver": token_version or 0})
         if expires_delta:
             expire = datetime.utcnow() + timedelta(seconds=expires_delta)
         else:
             expire = datetime.utcnow() + timedelta(minutes=15)
+        # refresh token is stored in db and removed on logout,
+        # only access tokens need id for revocation.
+        # "iat" has fractions of second to compare it with time of ban
         to_encode.update(
-            {"iat": datetime.utcnow(), "exp": expire, "scope": "access_token"}
+            {
+                "iat": time.time(),
+                "exp": expire,
+                "scope": "access_token",
+                "jti": uuid4().hex,
+            }
         )
         encode_jwt = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
 
@@ -142,9 +193,17 @@ class AuthService:
 
     async def update_password(self, user_id: UUID, new_password_hash: str, db: AsyncSession):
         await UserRepo(db).update_password(user_id, new_password_hash)
+        user_cache.invalidate(user_id)
+
+    async def reset_password(self, user: UserModel, db: AsyncSession):
+        # new password is set and mailed by the job, plain password is never saved in db
+        await JobService(db).enqueue(
+            SEND_NEW_PASSWORD_MAIL, {"user_id": str(user.id)}, commit=False
+        )
+        await db.commit()
 
     async def add_token_to_blacklist(self, token: str, db: AsyncSession):
-        await UserRepo(db).add_token_to_blacklist(token)
+        await token_revocation.revoke_token(token, db)
 
     def create_email_token(self, data: dict):
         to_encode = data.copy()
@@ -165,6 +224,7 @@ class AuthService:
 
     async def confirmed_email(self, user: UserModel, db: AsyncSession):
         await UserRepo(db).confirmed_email(user)
+        user_cache.invalidate(user.id)
 
     async def logout_service(self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
         # extract user from token
@@ -181,12 +241,20 @@ class AuthService:
 
     async def update_avatar(self, user_id: UUID, avatar_url: str, db: AsyncSession) -> UserModel:
         user = await UserRepo(db).update_avatar(user_id, avatar_url)
+        user_cache.invalidate(user_id)
         return user
 
     async def update_user_by_admin(
         self, user_id: UUID, body: UserUpdateByAdminSchema, db: AsyncSession
     ) -> UserModel:
         user = await UserRepo(db).update_user_by_admin(user_id, body)
+        user_cache.invalidate(user_id)
+        if user is not None:
+            # access tokens with old role are not valid anymore
+            await token_revocation.revoke_token_version(user.email, user.token_version, db)
+        if user is not None and not user.is_active:
+            # banned user - all tokens issued before are not valid anymore
+            await token_revocation.revoke_subject(user.email, db)
         return user
 
 
@@ -0,0 +1,233 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from decimal import Decimal
+
+import orjson
+
+from src.conf.config import config
+from src.services.cache_stats import CacheStats
+
+
+class PageCache(CacheStats, ABC):
+    """
+    Read-through cache of photo pages (GET /api/photos/{photo_id}),
+    key is (photo_id, skip, limit).
+
+    All pages of a photo are invalidated at once by invalidate(photo_id)
+    when photo, its comments, rates or tags are changed.
+
+    Generation is a counter of invalidations of all photos. Reader takes it
+    before its query, and page is saved only if the photo was not invalidated
+    since then, so a page read before a change is not saved after its invalidation.
+    """
+
+    @abstractmethod
+    async def get(self, photo_id: int, skip: int, limit: int) -> dict | None:
+        """Cached page or None"""
+
+    @abstractmethod
+    async def get_generation(self, photo_id: int):
+        """Current generation, take it before reading the page of photo from db"""
+
+    @abstractmethod
+    async def set(self, photo_id: int, skip: int, limit: int, page: dict, generation=None) -> None:
+        """Save page to cache, if photo was not invalidated after generation (when it is given)"""
+
+    @abstractmethod
+    async def invalidate(self, photo_id: int) -> None:
+        """Remove all pages of photo"""
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """Remove all pages"""
+
+    async def invalidate_many(self, photo_ids: list[int]) -> None:
+        for photo_id in photo_ids:
+            await self.invalidate(photo_id)
+
+
+class MemoryPageCache(PageCache):
+    # LRU with TTL in process memory. Every worker process has its own cache
+
+    def __init__(self, max_items: int, ttl: int):
+        super().__init__()
+        self.max_items = max_items
+        self.ttl = ttl
+        # (photo_id, skip, limit) -> (expire time, page), least recently used first
+        self._pages: OrderedDict[tuple[int, int, int], tuple[float, dict]] = OrderedDict()
+        self._keys_by_photo: dict[int, set[tuple[int, int, int]]] = {}
+        self._generation = 0
+        # photo_id -> generation of its last invalidation, only max_items recent ones.
+        # Photos which are forgotten (and all photos on clear) are taken
+        # as invalidated at _forgotten_generation
+        self._invalidated: OrderedDict[int, int] = OrderedDict()
+        self._forgotten_generation = 0
+
+    async def get(self, photo_id: int, skip: int, limit: int) -> dict | None:
+        key = (photo_id, skip, limit)
+        item = self._pages.get(key)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+        self._pages.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    async def get_generation(self, photo_id: int) -> int:
+        return self._generation
+
+    async def set(self, photo_id: int, skip: int, limit: int, page: dict, generation=None) -> None:
+        invalidated = self._invalidated.get(photo_id, self._forgotten_generation)
+        if generation is not None and invalidated > generation:
+            return
+        key = (photo_id, skip, limit)
+        self._pages[key] = (time.monotonic() + self.ttl, page)
+        self._pages.move_to_end(key)
+        self._keys_by_photo.setdefault(photo_id, set()).add(key)
+        while len(self._pages) > self.max_items:
+            self._remove(next(iter(self._pages)))
+
+    async def invalidate(self, photo_id: int) -> None:
+        self._generation += 1
+        self._invalidated[photo_id] = self._generation
+        self._invalidated.move_to_end(photo_id)
+        while len(self._invalidated) > self.max_items:
+            _, self._forgotten_generation = self._invalidated.popitem(last=False)
+        for key in self._keys_by_photo.pop(photo_id, ()):
+            self._pages.pop(key, None)
+
+    async def clear(self) -> None:
+        self._generation += 1
+        self._forgotten_generation = self._generation
+        self._invalidated.clear()
+        self._pages.clear()
+        self._keys_by_photo.clear()
+
+    def _remove(self, key: tuple[int, int, int]) -> None:
+        self._pages.pop(key, None)
+        keys = self._keys_by_photo.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_photo[key[0]]
+
+    def get_size(self) -> int:
+        return len(self._pages)
+
+
+class RedisPageCache(PageCache):
+    """
+    Cache shared by all workers in Redis (or other server with Redis protocol).
+    Pages of a photo are fields of one hash "photo_page:{photo_id}",
+    so invalidation is one DEL. Generation is counter "photo_page_generation"
+    without TTL, so it never starts again. Generation of the last invalidation
+    of photo is kept in "photo_page_invalidated:{photo_id}" much longer than
+    any read takes, it is checked and page is saved by one script.
+    Needs optional "redis" package.
+    """
+
+    GENERATION_KEY = "photo_page_generation"
+    CLEARED_KEY = "photo_page_cleared"
+    # seconds, invalidation of photo is remembered for readers which started before it
+    INVALIDATED_TTL = 24 * 3600
+
+    # KEYS: page hash, invalidated of photo, cleared. ARGV: generation of reader, field, page, ttl
+    SET_IF_NOT_INVALIDATED = """
+        local invalidated = math.max(
+            tonumber(redis.call('GET', KEYS[2]) or '0'), tonumber(redis.call('GET', KEYS[3]) or '0')
+        )
+        if invalidated > tonumber(ARGV[1]) then
+            return 0
+        end
+        redis.call('HSET', KEYS[1], ARGV[2], ARGV[3])
+        redis.call('EXPIRE', KEYS[1], ARGV[4])
+        return 1
+    """
+
+    # KEYS: generation, then page hash and invalidated key of every photo. ARGV: ttl of invalidated
+    INVALIDATE = """
+        local generation = redis.call('INCR', KEYS[1])
+        for i = 2, #KEYS, 2 do
+            redis.call('DEL', KEYS[i])
+            redis.call('SET', KEYS[i + 1], generation, 'EX', ARGV[1])
+        end
+        return generation
+    """
+
+    def __init__(self, url: str, ttl: int):
+        super().__init__()
+        import redis.asyncio as redis
+
+        self.redis = redis.from_url(url)
+        self.ttl = ttl
+        self._set_if_not_invalidated = self.redis.register_script(self.SET_IF_NOT_INVALIDATED)
+        self._invalidate = self.redis.register_script(self.INVALIDATE)
+
+    @staticmethod
+    def get_key(photo_id: int) -> str:
+        return f"photo_page:{photo_id}"
+
+    @staticmethod
+    def get_invalidated_key(photo_id: int) -> str:
+        return f"photo_page_invalidated:{photo_id}"
+
+    async def get_generation(self, photo_id: int) -> int:
+        return int(await self.redis.get(self.GENERATION_KEY) or 0)
+
+    async def get(self, photo_id: int, skip: int, limit: int) -> dict | None:
+        value = await self.redis.hget(self.get_key(photo_id), f"{skip}:{limit}")
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return orjson.loads(value)
+
+    async def set(self, photo_id: int, skip: int, limit: int, page: dict, generation=None) -> None:
+        key = self.get_key(photo_id)
+        value = orjson.dumps(page, default=self.to_json)
+        if generation is not None:
+            await self._set_if_not_invalidated(
+                keys=[key, self.get_invalidated_key(photo_id), self.CLEARED_KEY],
+                args=[generation, f"{skip}:{limit}", value, self.ttl],
+            )
+            return
+        async with self.redis.pipeline(transaction=True) as pipe:
+            await pipe.hset(key, f"{skip}:{limit}", value).expire(key, self.ttl).execute()
+
+    async def invalidate(self, photo_id: int) -> None:
+        await self.invalidate_many([photo_id])
+
+    async def invalidate_many(self, photo_ids: list[int]) -> None:
+        # one script for many photos: DEL of pages, generation of invalidation
+        for i in range(0, len(photo_ids), 1000):
+            keys = [self.GENERATION_KEY]
+            for photo_id in photo_ids[i:i + 1000]:
+                keys += [self.get_key(photo_id), self.get_invalidated_key(photo_id)]
+            await self._invalidate(keys=keys, args=[self.INVALIDATED_TTL])
+
+    async def clear(self) -> None:
+        # pages which are being read now are not saved
+        await self.redis.set(self.CLEARED_KEY, await self.redis.incr(self.GENERATION_KEY))
+        async for key in self.redis.scan_iter(match="photo_page:*"):
+            await self.redis.delete(key)
+
+    @staticmethod
+    def to_json(value):
+        # types which orjson doesn't know
+        if isinstance(value, Decimal):
+            return float(value)
+        raise TypeError
+
+
+def get_page_cache(name: str) -> PageCache:
+    if name == "memory":
+        return MemoryPageCache(config.PHOTO_CACHE_MAX_ITEMS, config.PHOTO_CACHE_TTL)
+    if name == "redis":
+        return RedisPageCache(config.REDIS_URL, config.PHOTO_CACHE_TTL)
+    raise ValueError(f"Unknown cache backend: {name}")
+
+
+photo_page_cache = get_page_cache(config.CACHE_BACKEND)
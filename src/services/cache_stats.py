@@ -0,0 +1,25 @@
+class CacheStats:
+    """
+    Hits and misses of a cache in current worker process, shown by /api/cache/stats.
+
+    Cache counts self.hits and self.misses and tells its size by get_size()
+    (None - size is not known, e.g. cache is on other server).
+    """
+
+    hits: int = 0
+    misses: int = 0
+
+    def get_size(self) -> int | None:
+        return None
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        result = {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / requests, 4) if requests else None,
+        }
+        size = self.get_size()
+        if size is not None:
+            result["size"] = size
+        return result
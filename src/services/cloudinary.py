@@ -8,17 +8,17 @@ from fastapi import UploadFile
 from src.conf.config import config
 from src.models.users import UserModel
 
+# configure SDK once, not for every request
+cloudinary.config(
+    cloud_name=config.CLOUDINARY_NAME,
+    api_key=config.CLOUDINARY_API_KEY,
+    api_secret=config.CLOUDINARY_API_SECRET,
+    # Use HTTPS with TLS encryption
+    secure=True,
+)
 
-class CloudinaryService:
 
-    def __init__(self):
-        cloudinary.config(
-            cloud_name=config.CLOUDINARY_NAME,
-            api_key=config.CLOUDINARY_API_KEY,
-            api_secret=config.CLOUDINARY_API_SECRET,
-            # Use HTTPS with TLS encryption
-            secure=True,
-        )
+class CloudinaryService:
 
     def upload_photo(self, file: UploadFile, user: UserModel):
         folder = f"photoshare/{user.id}"
@@ -61,6 +61,15 @@ class CloudinaryService:
 
         return result
 
+    def destroy_photos(self, public_ids: list[str]):
+        # Admin API deletes up to 100 resources in one request
+        result = cloudinary.api.delete_resources(public_ids, invalidate=True)
+
+        return result
+
+    def build_url(self, public_id: str):
+        return cloudinary.CloudinaryImage(public_id).build_url()
+
     def get_transformed_photo_url(
         self, public_id: str, request_for_transformation: dict
     ):
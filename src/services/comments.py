@@ -3,6 +3,8 @@ from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.repositories.comments import CommentRepo
+from src.services.cache import photo_page_cache
+from src.services.jobs import UPDATE_COMMENTS_VECTOR, JobService
 
 
 class CommentService:
@@ -13,13 +15,34 @@ class CommentService:
         result = await self.repo.get_comment(photo_id, comment_id)
         return result
 
+    async def update_comments_vector_later(self, photo_id: int) -> None:
+        # search document of comments is rebuilt by job worker, the job is
+        # committed together with the comment change
+        await JobService(self.repo.db).enqueue(
+            UPDATE_COMMENTS_VECTOR, {"photo_id": photo_id}, commit=False
+        )
+        await self.repo.db.commit()
+
     async def add_comment(self, photo_id: int, comment: str, user_id: UUID):
-        result = await self.repo.add_comment(photo_id=photo_id, comment=comment, user_id=user_id)
+        result = await self.repo.add_comment(
+            photo_id=photo_id, comment=comment, user_id=user_id, commit=False
+        )
+        await self.update_comments_vector_later(photo_id)
+        await self.repo.db.refresh(result)
+        await photo_page_cache.invalidate(photo_id)
         return result
 
     async def edit_comment(self, photo_id: int, comment_id: int, comment: str):
-        result = await self.repo.edit_comment(photo_id=photo_id, comment_id=comment_id, comment=comment)
+        result = await self.repo.edit_comment(
+            photo_id=photo_id, comment_id=comment_id, comment=comment, commit=False
+        )
+        if result:
+            await self.update_comments_vector_later(photo_id)
+            await self.repo.db.refresh(result)
+        await photo_page_cache.invalidate(photo_id)
         return result
 
     async def delete_comment(self, photo_id: int, comment_id: int):
-        await self.repo.del_comment(photo_id=photo_id, comment_id=comment_id)
+        await self.repo.del_comment(photo_id=photo_id, comment_id=comment_id, commit=False)
+        await self.update_comments_vector_later(photo_id)
+        await photo_page_cache.invalidate(photo_id)
@@ -0,0 +1,57 @@
+import hashlib
+import json
+from dataclasses import dataclass
+
+from fastapi import Request, Response, status
+
+# response is stored by clients and proxies, but checked with validators before every use
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+@dataclass(frozen=True)
+class Validators:
+    etag: str
+
+    @property
+    def headers(self) -> dict:
+        return {"ETag": self.etag, "Cache-Control": REVALIDATE_CACHE_CONTROL}
+
+
+class ConditionalService:
+    """
+    Conditional GET: ETag of response is made from the data of the response
+    (rows of the feed page, photo page which is cached with its ETag)
+    or from version of data which is never changed, only added
+    (timestamps and counts of transformations), and 304 Not Modified
+    is returned when client has the same version.
+
+    ETag is made from the same rows as the body, never by a separate query,
+    so a write between two queries can't pair new ETag with old body.
+    ETag is weak: it is made from data, not from bytes of the body.
+    Last-Modified is not sent: deletions and added tags don't move timestamps.
+    """
+
+    @staticmethod
+    def make_validators(version) -> Validators:
+        """
+        :param version: JSON serializable data of response or its version (str for other types)
+        """
+        raw = json.dumps(version, default=str, separators=(",", ":")).encode()
+        return Validators(f'W/"{hashlib.sha256(raw).hexdigest()[:32]}"')
+
+    @staticmethod
+    def etag_matches(if_none_match: str | None, etag: str) -> bool:
+        # weak comparison, as required for If-None-Match
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag.removeprefix("W/") in [tag.removeprefix("W/") for tag in tags]
+
+    @classmethod
+    def not_modified_response(cls, request: Request, validators: Validators) -> Response | None:
+        """Response 304 if client has the same version, else None"""
+        if request.method not in ("GET", "HEAD") or not cls.etag_matches(
+            request.headers.get("if-none-match"), validators.etag
+        ):
+            return None
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validators.headers)
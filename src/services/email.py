@@ -1,81 +1,178 @@
-from fastapi_mail import ConnectionConfig, FastMail, MessageSchema, MessageType
-from fastapi_mail.errors import ConnectionErrors
+import asyncio
+import contextlib
+import time
+from email.message import EmailMessage
+from email.utils import formataddr
+from pathlib import Path
+
+import aiosmtplib
+from jinja2 import Environment, FileSystemLoader, select_autoescape
 from pydantic import EmailStr
 
 from src.conf.config import config
 from src.services.auth import auth_service
 
 
+class MailTemplates:
+    """
+    Jinja templates of mails, compiled once for the process
+    (FastMail made new environment and compiled template for every mail).
+    """
+
+    def __init__(self, folder: Path):
+        self.env = Environment(
+            loader=FileSystemLoader(folder),
+            autoescape=select_autoescape(["html"]),
+            cache_size=-1,
+        )
+
+    def compile_all(self) -> None:
+        for name in self.env.list_templates():
+            self.env.get_template(name)
+
+    def render(self, name: str, context: dict) -> str:
+        return self.env.get_template(name).render(context)
+
+
+class SmtpPool:
+    """
+    Persistent SMTP connections shared by all mails of the process,
+    so TLS handshake and login are done once per connection, not for every mail.
+
+    Not more than size mails are sent at the same time, the rest wait for
+    a free connection. Connection idle longer than max_idle is opened again,
+    servers close them anyway.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: str | None,
+        password: str | None,
+        use_tls: bool,
+        start_tls: bool,
+        size: int,
+        max_idle: float,
+        timeout: float = 30,
+    ):
+        self.options = dict(
+            hostname=hostname,
+            port=port,
+            username=username,
+            password=password,
+            use_tls=use_tls,
+            start_tls=start_tls,
+            timeout=timeout,
+        )
+        self.max_idle = max_idle
+        self.opened = 0
+        self._semaphore = asyncio.Semaphore(size)
+        # idle connections: (client, time of last use)
+        self._idle: list[tuple[aiosmtplib.SMTP, float]] = []
+
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        async with self._semaphore:
+            client = await self._acquire()
+            try:
+                yield client
+            except Exception:
+                # state of connection is unknown after error
+                await self._close(client)
+                raise
+            except BaseException:
+                # cancelled (e.g. timeout of job): drop connection without waiting for QUIT
+                client.close()
+                raise
+            self._idle.append((client, time.monotonic()))
+
+    async def send(self, message: EmailMessage) -> None:
+        try:
+            async with self.connection() as client:
+                await client.send_message(message)
+        except aiosmtplib.SMTPServerDisconnected:
+            # idle connection was closed by server, send once more with new connection
+            async with self.connection() as client:
+                await client.send_message(message)
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for client, _ in idle:
+            await self._close(client)
+
+    async def _acquire(self) -> aiosmtplib.SMTP:
+        while self._idle:
+            client, last_used = self._idle.pop()
+            if client.is_connected and time.monotonic() - last_used < self.max_idle:
+                return client
+            await self._close(client)
+        client = aiosmtplib.SMTP(**self.options)
+        await client.connect()
+        self.opened += 1
+        return client
+
+    @staticmethod
+    async def _close(client: aiosmtplib.SMTP) -> None:
+        try:
+            await client.quit()
+        except Exception:
+            client.close()
+
+
 class EmailService:
-    conf = ConnectionConfig(
-        MAIL_USERNAME=config.MAIL_USERNAME,
-        MAIL_PASSWORD=config.MAIL_PASSWORD,
-        MAIL_FROM=config.MAIL_FROM,
-        MAIL_PORT=config.MAIL_PORT,
-        MAIL_SERVER=config.MAIL_SERVER,
-        MAIL_FROM_NAME="FastContacts",
-        MAIL_STARTTLS=False,
-        MAIL_SSL_TLS=True,
-        USE_CREDENTIALS=True,
-        VALIDATE_CERTS=True,
-        TEMPLATE_FOLDER=config.BASE_DIR / "src" / "services" / "templates",
-    )
-    fm = FastMail(conf)
+    # mails are sent by job worker, errors are not caught - failed mail is repeated
+    def __init__(self, pool: SmtpPool | None = None, templates: MailTemplates | None = None):
+        self.pool = pool or smtp_pool
+        self.templates = templates or mail_templates
 
     async def send_varification_mail(self, email: EmailStr, username: str, host: str):
-        try:
-            token_verification = auth_service.create_email_token({"sub": email})
-            message = MessageSchema(
-                subject="Confirm your email",
-                recipients=[email],
-                template_body={
-                    "host": host,
-                    "username": username,
-                    "token": token_verification,
-                },
-                subtype=MessageType.html,
-            )
-            await self.fm.send_message(message, template_name="verify_email.html")
-
-        except ConnectionErrors as err:
-            print(err)
+        token_verification = auth_service.create_email_token({"sub": email})
+        await self.send(
+            email,
+            "Confirm your email",
+            "verify_email.html",
+            {"host": host, "username": username, "token": token_verification},
+        )
 
     async def send_request_password_mail(
         self, email: EmailStr, username: str, host: str
     ):
-        try:
-            token_verification = auth_service.create_email_token({"sub": email})
-            message = MessageSchema(
-                subject="Request psw",
-                recipients=[email],
-                template_body={
-                    "host": host,
-                    "username": username,
-                    "token": token_verification,
-                },
-                subtype=MessageType.html,
-            )
-            await self.fm.send_message(
-                message, template_name="request_password_reset.html"
-            )
-
-        except ConnectionErrors as err:
-            print(err)
+        token_verification = auth_service.create_email_token({"sub": email})
+        await self.send(
+            email,
+            "Request psw",
+            "request_password_reset.html",
+            {"host": host, "username": username, "token": token_verification},
+        )
 
     async def send_new_password_mail(
         self, email: EmailStr, username: str, new_password: str,
     ):
-        try:
-            message = MessageSchema(
-                subject="New psw",
-                recipients=[email],
-                template_body={
-                    "username": username,
-                    "new_psw": new_password,
-                },
-                subtype=MessageType.html,
-            )
-            await self.fm.send_message(message, template_name="new_password.html")
-
-        except ConnectionErrors as err:
-            print(err)
+        await self.send(
+            email,
+            "New psw",
+            "new_password.html",
+            {"username": username, "new_psw": new_password},
+        )
+
+    async def send(self, email: str, subject: str, template_name: str, context: dict):
+        message = EmailMessage()
+        message["From"] = formataddr((config.MAIL_FROM_NAME, config.MAIL_FROM))
+        message["To"] = email
+        message["Subject"] = subject
+        message.set_content(self.templates.render(template_name, context), subtype="html")
+        await self.pool.send(message)
+
+
+mail_templates = MailTemplates(config.BASE_DIR / "src" / "services" / "templates")
+smtp_pool = SmtpPool(
+    hostname=config.MAIL_SERVER,
+    port=config.MAIL_PORT,
+    username=config.MAIL_USERNAME,
+    password=config.MAIL_PASSWORD,
+    use_tls=config.MAIL_SSL_TLS,
+    start_tls=config.MAIL_STARTTLS,
+    size=config.MAIL_POOL_SIZE,
+    max_idle=config.MAIL_CONNECTION_MAX_IDLE,
+)
@@ -0,0 +1,52 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from src.conf.config import config
+
+
+class BlockingExecutor:
+    """
+    Run blocking calls (Cloudinary SDK requests, Pillow image decoding)
+    in a separate bounded thread pool, so they don't stop the event loop.
+
+    Not more than max_workers calls run at the same time, the rest wait
+    in the pool queue. Default executor of the loop is not used, so slow
+    uploads can't take all threads from other work.
+    """
+
+    def __init__(self, max_workers: int, name: str):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+
+    async def run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+
+class ProcessExecutor:
+    """
+    Run CPU heavy calls (image transformations) in a pool of processes,
+    so they use all cores and are not limited by GIL.
+
+    Pool is started on first call. func and its arguments must be picklable,
+    so func must be a module level function.
+    """
+
+    def __init__(self, max_workers: int | None):
+        self.max_workers = max_workers
+        self._executor = None
+
+    async def run(self, func, *args, **kwargs):
+        if self._executor is None:
+            # "spawn" - forking a process with running threads and event loop is not safe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+
+upload_executor = BlockingExecutor(max_workers=config.UPLOAD_WORKERS, name="upload")
+transform_executor = ProcessExecutor(max_workers=config.TRANSFORM_WORKERS)
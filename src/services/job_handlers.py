@@ -0,0 +1,66 @@
+from uuid import UUID
+
+from src.dependencies.database import sessionmanager
+from src.repositories.comments import CommentRepo
+from src.repositories.photos import PhotoRepo
+from src.repositories.users import UserRepo
+from src.services.auth import auth_service
+from src.services.email import EmailService
+from src.services.jobs import (DESTROY_FILES, SEND_NEW_PASSWORD_MAIL, SEND_PASSWORD_RESET_MAIL,
+                               SEND_VERIFICATION_MAIL, UPDATE_COMMENTS_VECTOR,
+                               JobHandler)
+from src.services.storage import StorageBackend
+
+
+def job_handlers(storage: StorageBackend, session=sessionmanager.session) -> dict[str, JobHandler]:
+    """Handlers of all kinds of jobs, an exception in handler means retry"""
+
+    async def destroy_files(payload: dict) -> None:
+        # files were not used when job was added, but a new photo could get
+        # the same stored file since then (same content) - check it again
+        async with session() as db:
+            used = await PhotoRepo(db).get_used_public_ids(payload["public_ids"])
+        public_ids = [public_id for public_id in payload["public_ids"] if public_id not in used]
+        if not public_ids:
+            return
+        failed = await storage.destroy_photos(public_ids)
+        if failed:
+            # already deleted files are not errors, so the whole job is repeated
+            raise RuntimeError(f"Stored files are not deleted: {failed}")
+
+    async def send_verification_mail(payload: dict) -> None:
+        await EmailService().send_varification_mail(
+            payload["email"], payload["username"], payload["host"]
+        )
+
+    async def send_password_reset_mail(payload: dict) -> None:
+        await EmailService().send_request_password_mail(
+            payload["email"], payload["username"], payload["host"]
+        )
+
+    async def send_new_password_mail(payload: dict) -> None:
+        # password is made here, so it is never saved in jobs table.
+        # It is set only after the mail is sent: failed attempt keeps the old password,
+        # and the last mailed password is the one which is set
+        async with session() as db:
+            user = await UserRepo(db).get_user_by_id(UUID(payload["user_id"]))
+        if user is None:
+            return
+        password = auth_service.generate_password()
+        password_hash = await auth_service.hash_password(password)
+        await EmailService().send_new_password_mail(user.email, user.username, password)
+        async with session() as db:
+            await auth_service.update_password(user.id, password_hash, db)
+
+    async def update_comments_vector(payload: dict) -> None:
+        async with session() as db:
+            await CommentRepo(db).update_comments_vector(payload["photo_id"])
+            await db.commit()
+
+    return {
+        DESTROY_FILES: destroy_files,
+        SEND_VERIFICATION_MAIL: send_verification_mail,
+        SEND_PASSWORD_RESET_MAIL: send_password_reset_mail,
+        SEND_NEW_PASSWORD_MAIL: send_new_password_mail,
+        UPDATE_COMMENTS_VECTOR: update_comments_vector,
+    }
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import os
+import random
+import socket
+from typing import Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import config
+from src.dependencies.database import sessionmanager
+from src.models.jobs import JobModel
+from src.repositories.jobs import JobRepo
+
+logger = logging.getLogger(__name__)
+
+# kinds of jobs
+DESTROY_FILES = "storage.destroy_files"
+SEND_VERIFICATION_MAIL = "email.verification"
+SEND_PASSWORD_RESET_MAIL = "email.password_reset_request"
+SEND_NEW_PASSWORD_MAIL = "email.new_password"
+UPDATE_COMMENTS_VECTOR = "search.comments_vector"
+
+JobHandler = Callable[[dict], Awaitable[None]]
+
+
+class JobService:
+    """
+    Slow side effects of requests are saved as jobs in db and done by
+    workers (src.commands.job_worker), so they are not lost on restart
+    and don't take time of the process which serves requests.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.repo = JobRepo(db)
+
+    async def enqueue(
+        self, kind: str, payload: dict, delay: float = 0, commit: bool = True
+    ) -> JobModel:
+        """
+        Add job to the queue.
+
+        :param payload: dict: arguments of handler, must be serializable to JSON
+        :param delay: float: seconds before the first attempt
+        :param commit: bool: False - job is committed together with other changes of the session
+        """
+        job = await self.repo.add_job(kind, payload, config.JOB_MAX_ATTEMPTS, delay, commit)
+        return job
+
+
+def retry_delay(attempts: int) -> float:
+    # exponential backoff with jitter, so failed jobs don't come back all at once
+    delay = min(config.JOB_RETRY_DELAY * 2 ** (attempts - 1), config.JOB_MAX_RETRY_DELAY)
+    return delay * random.uniform(0.5, 1)
+
+
+class JobWorker:
+    """
+    Takes due jobs from db and runs their handlers.
+
+    Jobs are leased with FOR UPDATE SKIP LOCKED, so any number of workers
+    in different processes and nodes share one queue. A failed job is
+    repeated with exponential backoff, after max_attempts it is dead
+    and stays in db until retry_dead_jobs. A job of a crashed worker
+    is taken again when its lease is over.
+    """
+
+    def __init__(
+        self,
+        handlers: dict[str, JobHandler],
+        batch_size: int = config.JOB_BATCH_SIZE,
+        lease_time: float = config.JOB_LEASE_TIME,
+        poll_interval: float = config.JOB_POLL_INTERVAL,
+        session=sessionmanager.session,
+    ):
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.lease_time = lease_time
+        self.poll_interval = poll_interval
+        self.session = session
+        self.name = f"{socket.gethostname()}:{os.getpid()}:{id(self):x}"
+        self._stopped = asyncio.Event()
+
+    async def run_once(self) -> int:
+        """Run one batch of due jobs at the same time, return count of jobs"""
+        jobs = []
+        async with self.session() as session:
+            jobs = await JobRepo(session).lease_jobs(self.name, self.batch_size, self.lease_time)
+        await asyncio.gather(*(self._run_job(job) for job in jobs))
+        return len(jobs)
+
+    async def run(self) -> None:
+        """Run jobs until stop, wait poll_interval when the queue is empty"""
+        logger.info(f"Job worker {self.name} is started")
+        while not self._stopped.is_set():
+            try:
+                count = await self.run_once()
+            except Exception as e:
+                logger.warning(f"Can't take jobs: {e}")
+                count = 0
+            if count < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._stopped.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        logger.info(f"Job worker {self.name} is stopped")
+
+    def stop(self) -> None:
+        """Finish current batch and stop"""
+        self._stopped.set()
+
+    async def _run_job(self, job: JobModel) -> None:
+        handler = self.handlers.get(job.kind)
+        try:
+            if job.attempts > job.max_attempts:
+                # lease of last attempt is over, worker was stopped while running the job
+                raise TimeoutError("Lease of the last attempt is over")
+            if handler is None:
+                raise LookupError(f"Unknown kind of job: {job.kind}")
+            await asyncio.wait_for(handler(job.payload), self.lease_time)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            delay = retry_delay(job.attempts) if job.attempts < job.max_attempts else None
+            if delay is None:
+                logger.error(f"Job {job.id} ({job.kind}) is dead: {error}")
+            else:
+                logger.warning(f"Job {job.id} ({job.kind}) failed, retry in {delay:.0f}s: {error}")
+            async with self.session() as session:
+                await JobRepo(session).fail_job(job.id, self.name, error, delay)
+        else:
+            async with self.session() as session:
+                await JobRepo(session).complete_job(job.id, self.name)
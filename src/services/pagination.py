@@ -0,0 +1,32 @@
+import base64
+import json
+from datetime import datetime
+
+
+class CursorService:
+    """
+    Opaque cursors for keyset pagination of the photo feed.
+
+    A cursor points to the last row of the previous page: (created_at, id).
+    The next page starts right after this row, so the database can seek
+    directly to it by index instead of counting and skipping rows with OFFSET.
+    """
+
+    @staticmethod
+    def encode_cursor(created_at: datetime, photo_id: int) -> str:
+        raw = json.dumps([created_at.isoformat(), photo_id]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[datetime, int]:
+        # raise ValueError if cursor was damaged or made by hand
+        try:
+            padding = "=" * (-len(cursor) % 4)
+            created_at, photo_id = json.loads(base64.urlsafe_b64decode(cursor + padding))
+            created_at = datetime.fromisoformat(created_at)
+            # created_at of photos is naive, aware one can't be compared with it
+            if created_at.tzinfo is not None:
+                raise ValueError("Cursor with timezone")
+            return created_at, int(photo_id)
+        except (TypeError, ValueError) as e:
+            raise ValueError("Invalid cursor") from e
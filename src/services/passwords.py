@@ -0,0 +1,72 @@
+import math
+import time
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from src.conf import messages
+from src.conf.config import config
+from src.services.executor import BlockingExecutor
+
+
+class PasswordHasher:
+    """
+    Hash and verify passwords with bcrypt in a bounded thread pool
+    (bcrypt releases GIL), so logins don't stop the event loop.
+
+    When max_pending hashings already run or wait, new ones are rejected
+    with 503 and Retry-After - waiting longer would only time out clients.
+    """
+
+    def __init__(self, rounds: int, max_workers: int, max_pending: int):
+        self.context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = BlockingExecutor(max_workers=max_workers, name="password")
+        self._pending = 0
+        # moving average of one hashing, seconds
+        self._duration = 0.25
+
+    def hash(self, password: str) -> str:
+        return self.context.hash(password)
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        return self.context.verify(password, password_hash)
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, password_hash: str) -> tuple[bool, str | None]:
+        """
+        Verify password, new hash is returned when old one has other work factor.
+        """
+        return await self._run(self.context.verify_and_update, password, password_hash)
+
+    def get_retry_after(self) -> int:
+        # time to hash everything which waits in queue
+        return max(1, math.ceil(self._pending / self.max_workers * self._duration))
+
+    async def _run(self, func, *args):
+        if self._pending >= self.max_pending:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=messages.SERVER_IS_BUSY,
+                headers={"Retry-After": str(self.get_retry_after())},
+            )
+        self._pending += 1
+        try:
+            return await self._executor.run(self._timed, func, *args)
+        finally:
+            self._pending -= 1
+
+    def _timed(self, func, *args):
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            self._duration = 0.8 * self._duration + 0.2 * (time.perf_counter() - start)
+
+
+password_hasher = PasswordHasher(
+    config.BCRYPT_ROUNDS, config.PASSWORD_HASH_WORKERS, config.PASSWORD_HASH_MAX_PENDING
+)
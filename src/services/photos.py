@@ -1,4 +1,6 @@
-from io import BytesIO
+import asyncio
+import hashlib
+import logging
 from uuid import UUID
 
 from fastapi import HTTPException, UploadFile, status
@@ -12,34 +14,204 @@ from src.models.users import UserModel
 from src.repositories.comments import CommentRepo
 from src.repositories.photos import PhotoRepo
 from src.repositories.users import UserRepo
+from src.services.cache import photo_page_cache
+from src.services.conditional import ConditionalService, Validators
+from src.services.executor import upload_executor
+from src.services.jobs import DESTROY_FILES, JobService
+from src.services.pagination import CursorService
+from src.services.single_flight import photo_reads
+from src.services.storage import StorageBackend
+
+logger = logging.getLogger(__name__)
 
 
 class PhotoService:
     def __init__(self, db: AsyncSession):
         self.repo = PhotoRepo(db=db)
 
-    async def get_photo_exists(self, photo_id: int):
-        result = await self.repo.get_photo_from_db(photo_id)
+    async def get_photo_exists(self, photo_id: int, profile: str = "exists"):
+        # profile - what to load with photo, see PhotoRepo.load_profiles.
+        # Default "exists" loads only id: use it just to check if photo exists
+        result = await self.repo.get_photo_from_db(photo_id, profile)
         return result
 
     async def check_photo_owner(self, photo_id: int, user_id: UUID):
         result = await self.repo.get_photo_owner(photo_id, user_id)
         return result
 
-    async def add_photo(self, user: UserModel, public_id: str, photo_url: str, description: str) -> PhotoModel:
-        new_photo = await self.repo.add_photo(user, public_id, photo_url, description)
+    async def add_photo(
+        self, user: UserModel, public_id: str, photo_url: str, description: str,
+        content_hash: str | None = None, tags: list[str] | None = None
+    ) -> PhotoModel:
+        new_photo = await self.repo.add_photo(
+            user, public_id, photo_url, description, content_hash, tags
+        )
 
         return new_photo
 
+    async def add_photos_batch(
+        self,
+        user: UserModel,
+        files: list[UploadFile],
+        description: str | None,
+        tags: list[str],
+        storage: StorageBackend,
+    ) -> list[dict]:
+        """
+        Validate and upload files concurrently, not more than UPLOAD_BATCH_CONCURRENCY
+        at the same time, then add all photos with tags in one transaction.
+
+        File with the same content as another file of the batch or already uploaded
+        photo of the user is not uploaded again.
+
+        :return: result for every file in the same order:
+            filename, status_code, detail (for errors) and photo (for created)
+        """
+        semaphore = asyncio.Semaphore(config.UPLOAD_BATCH_CONCURRENCY)
+        results = [
+            {
+                "filename": file.filename,
+                "status_code": status.HTTP_201_CREATED,
+                "detail": None,
+                "photo": None,
+            }
+            for file in files
+        ]
+
+        async def validate(file: UploadFile) -> str:
+            async with semaphore:
+                return await self.validate_photo(file)
+
+        async def upload(file: UploadFile) -> tuple[str, str]:
+            async with semaphore:
+                return await storage.upload_photo(file, user)
+
+        content_hashes = await asyncio.gather(*map(validate, files), return_exceptions=True)
+        for result, content_hash in zip(results, content_hashes):
+            if isinstance(content_hash, HTTPException):
+                result.update(status_code=content_hash.status_code, detail=content_hash.detail)
+            elif isinstance(content_hash, BaseException):
+                raise content_hash
+        valid = [
+            (index, content_hash)
+            for index, content_hash in enumerate(content_hashes)
+            if results[index]["detail"] is None
+        ]
+
+        # url and public_id by content hash: already stored files
+        # and the first file of the batch with new content
+        stored = {
+            content_hash: (photo.image_url, photo.public_id)
+            for content_hash, photo in (
+                await self.repo.get_photos_by_content_hashes(user.id, [h for _, h in valid])
+            ).items()
+        }
+        new_files = {}
+        for index, content_hash in valid:
+            if content_hash not in stored:
+                new_files.setdefault(content_hash, files[index])
+        uploads = await asyncio.gather(*map(upload, new_files.values()), return_exceptions=True)
+        for content_hash, uploaded in zip(new_files, uploads):
+            if isinstance(uploaded, Exception):
+                logger.warning(f"File is not uploaded to storage: {uploaded!r}")
+                continue
+            stored[content_hash] = uploaded
+
+        photos, indexes = [], []
+        for index, content_hash in valid:
+            if content_hash not in stored:
+                results[index].update(
+                    status_code=status.HTTP_502_BAD_GATEWAY, detail=messages.UPLOAD_FAILED
+                )
+                continue
+            image_url, public_id = stored[content_hash]
+            photos.append(
+                {
+                    "public_id": public_id,
+                    "image_url": image_url,
+                    "description": description,
+                    "content_hash": content_hash,
+                }
+            )
+            indexes.append(index)
+        if not photos:
+            return results
+
+        try:
+            new_photos = await self.repo.add_photos(user, photos, tags)
+        except Exception:
+            # files uploaded by this request are not used by its photos, but stored
+            # file is content addressed, other photo could have the same one
+            await self.repo.db.rollback()
+            public_ids = [uploaded[1] for uploaded in uploads if not isinstance(uploaded, Exception)]
+            used = await self.repo.get_used_public_ids(public_ids) if public_ids else set()
+            unused = [public_id for public_id in public_ids if public_id not in used]
+            if unused:
+                await storage.destroy_photos(unused)
+            raise
+        for index, photo in zip(indexes, new_photos):
+            results[index]["photo"] = {
+                "id": photo.id,
+                "image_url": photo.image_url,
+                "description": photo.description,
+                "updated_at": photo.updated_at,
+                "public_id": photo.public_id,
+            }
+        return results
+
+    async def get_photo_by_content_hash(self, user_id: UUID, content_hash: str):
+        # already uploaded photo of the user with the same file
+        photo = await self.repo.get_photo_by_content_hash(user_id, content_hash)
+        return photo
+
     async def get_all_photos(self, skip: int, limit: int) -> list[PhotoModel]:
         photos = await self.repo.get_all_photos(skip, limit)
         return photos
 
     async def delete_photo(self, photo: PhotoModel) -> None:
-        await self.repo.delete_photo(photo)
+        await self._delete_photos([photo.id])
+
+    async def delete_photos_batch(self, photo_ids: list[int], user: UserModel, any_owner: bool) -> dict:
+        """
+        Delete many photos with one statement. Stored files are deleted
+        later by job worker in bulk requests, files which are used by other photos are kept.
+
+        :param any_owner: bool: admin or moderator - delete photos of other users too
+        :return: ids of deleted photos, photos which are not found and photos of other users
+        """
+        photo_ids = list(dict.fromkeys(photo_ids))
+        owners = await self.repo.get_photo_owners(photo_ids)
+        deleted_ids = await self._delete_photos(list(owners), None if any_owner else user.id)
+
+        return {
+            "deleted": [photo_id for photo_id in photo_ids if photo_id in deleted_ids],
+            "not_found": [photo_id for photo_id in photo_ids if photo_id not in owners],
+            "forbidden": [
+                photo_id for photo_id in photo_ids
+                if photo_id in owners and photo_id not in deleted_ids
+            ],
+        }
+
+    async def _delete_photos(self, photo_ids: list[int], user_id: UUID | None = None) -> set[int]:
+        # rows and job for deleting files which are not used anymore - in one transaction,
+        # so a file is deleted only when its photos are deleted
+        deleted = await self.repo.delete_photos(photo_ids, user_id, commit=False)
+        public_ids = list({public_id for _, public_id in deleted})
+        used = await self.repo.get_used_public_ids(public_ids)
+        unused = [public_id for public_id in public_ids if public_id not in used]
+        if unused:
+            await JobService(self.repo.db).enqueue(
+                DESTROY_FILES, {"public_ids": unused}, commit=False
+            )
+        await self.repo.db.commit()
+
+        deleted_ids = {photo_id for photo_id, _ in deleted}
+        await photo_page_cache.invalidate_many(list(deleted_ids))
+        return deleted_ids
 
     async def update_photo(self, photo: PhotoModel) -> PhotoModel:
         photo = await self.repo.update_photo(photo)
+        await photo_page_cache.invalidate(photo.id)
         return photo
 
     async def add_transformed_photo_to_db(self, photo_id: int, image_url: str):
@@ -50,50 +222,181 @@ class PhotoService:
         transformed_photos = await self.repo.get_transformed_photo_by_photo_id(photo_id)
         return transformed_photos
 
+    async def get_transformed_photos_validators(self, photo_id: int) -> Validators:
+        version = await self.repo.get_transformed_photos_version(photo_id)
+        return ConditionalService.make_validators(list(version))
+
     async def get_transformed_photo_by_transformed_id(self, photo_id: int, transform_id: int):
         transformed_photo = await self.repo.get_transformed_photo_by_transformed_id(photo_id, transform_id)
         return transformed_photo
 
+    async def get_transformed_photo_by_url(self, photo_id: int, image_url: str):
+        transformed_photo = await self.repo.get_transformed_photo_by_url(photo_id, image_url)
+        return transformed_photo
+
     async def delete_transformed_photo(self, photo_id: int, transform_id: int):
         await self.repo.delete_transformed_photo(photo_id, transform_id)
 
-    async def get_all_photo_per_page(self, skip: int, limit: int):
-        query = await self.repo.get_photo_object_with_params(skip, limit)
+    async def get_all_photo_per_page(
+        self, skip: int, limit: int, cursor: str | None = None,
+        tags: list[str] | None = None, match_all: bool = True
+    ):
+        # return photos for the page, cursor for the next page
+        # (None if it was the last page) and validators made from the same rows.
+        # With tags - only photos with all of them (match_all) or with any of them
+        cursor = self.decode_cursor(cursor)
+        # concurrent requests of the same page share one query
+        key = ("photos", skip, limit, cursor, tuple(tags or ()), match_all)
+        return await photo_reads.do(
+            key, self._get_all_photo_per_page, skip, limit, cursor, tags, match_all
+        )
+
+    @staticmethod
+    def decode_cursor(cursor: str | None) -> tuple | None:
+        if cursor is None:
+            return None
+        try:
+            return CursorService.decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=messages.INVALID_CURSOR,
+            )
+
+    async def _get_all_photo_per_page(
+        self, skip: int, limit: int, cursor: tuple | None, tags: list[str] | None, match_all: bool
+    ):
+        query = await self.repo.get_photo_object_with_params(skip, limit, cursor, tags, match_all)
         result = []
         for photo in query:
             result.append(photo._asdict())
-        return result
 
-    async def get_one_photo_page(self, photo_id: int, skip: int, limit: int):
+        next_cursor = None
+        if len(result) == limit:
+            last_photo = result[-1]
+            next_cursor = CursorService.encode_cursor(last_photo["created_at"], last_photo["id"])
+        # ETag is made from the rows of the response, so it can't be newer than them
+        return result, next_cursor, ConditionalService.make_validators(result)
+
+    async def search_photos(self, query: str, skip: int, limit: int):
+        # photos sorted by rank of match in description and comments
+        result = await self.repo.search_photos(query, skip, limit)
+        return [photo._asdict() for photo in result]
+
+    async def get_one_photo_page(
+        self, photo_id: int, skip: int, limit: int
+    ) -> tuple[dict | None, Validators | None]:
+        # page and its validators, (None, None) if photo doesn't exist.
+        # Read-through cache of both, it is invalidated by every change of photo page
+        # (see photo_page_cache.invalidate calls)
+        entry = await photo_page_cache.get(photo_id, skip, limit)
+        if entry is None:
+            entry = await self._read_one_photo_page(photo_id, skip, limit)
+        if entry is None:
+            return None, None
+        return entry["page"], Validators(entry["etag"])
+
+    async def _read_one_photo_page(self, photo_id: int, skip: int, limit: int) -> dict | None:
+        # generation is taken before the query: if the page is changed
+        # while it is read, the read result is not cached
+        generation = await photo_page_cache.get_generation(photo_id)
+        # on cache miss concurrent requests of the same page share one query
+        return await photo_reads.do(
+            ("photo", photo_id, skip, limit, generation),
+            self._get_one_photo_page, photo_id, skip, limit, generation,
+        )
+
+    async def _get_one_photo_page(self, photo_id: int, skip: int, limit: int, generation: int):
         result = await self.repo.get_photo_page(photo_id)
-        if result is not None:
-            # if we find photo
-            # translate result to dict
-            result = result._asdict()
-            comments = await CommentRepo(self.repo.db).get_all_comments(photo_id, skip, limit)
-            # adding comments to result dict
-            result["comments"] = comments
-        return result
+        if result is None:
+            return None
+        # if we find photo
+        # translate result to dict
+        result = result._asdict()
+        comments = await CommentRepo(self.repo.db).get_all_comments(photo_id, skip, limit)
+        # adding comments to result dict
+        result["comments"] = [comment._asdict() for comment in comments]
+        # ETag is made from the page itself and cached with it
+        entry = {"page": result, "etag": ConditionalService.make_validators(result).etag}
+        await photo_page_cache.set(photo_id, skip, limit, entry, generation)
+        return entry
+
+    # read uploaded file by chunks of this size
+    CHUNK_SIZE_BYTES = 64 * 1024
+    # allowed size of multipart boundaries and part headers in request
+    MULTIPART_OVERHEAD_BYTES = 16 * 1024
+    # first bytes of file (magic bytes) for allowed image types
+    MAGIC_BYTES = {
+        b"\x89PNG\r\n\x1a\n": "image/png",
+        b"\xff\xd8\xff": "image/jpeg",
+    }
 
     async def validate_photo(self, file: UploadFile):
+        """
+        Check uploaded photo without reading whole file to memory:
+            - size by running count of read bytes
+              (request Content-Length is checked by UploadLimitMiddleware)
+            - type by magic bytes in the beginning of file
+            - dimensions by image header (pixels are not decoded)
+
+        :param file: UploadFile: Uploaded photo
+        :return: sha256 of file content, raise HTTPException 400 if photo is not valid
+        """
         if not file.content_type.startswith("image/"):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=messages.INVALID_FILE_NOT_IMAGE,
         )
-        contents = await file.read()
-        if len(contents) > config.MAX_FILE_SIZE_BYTES:
-            print(len(contents))
+        too_big_file = HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=messages.TOO_BIG_FILE,
+        )
+        await file.seek(0)
+        chunk = await file.read(self.CHUNK_SIZE_BYTES)
+        if self.get_image_type(chunk) not in config.TYPES_IMAGES:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=messages.TOO_BIG_FILE,
+                detail=messages.INVALID_FILE_NOT_IMAGE,
             )
+        size = 0
+        digest = hashlib.sha256()
+        while chunk:
+            size += len(chunk)
+            if size > config.MAX_FILE_SIZE_BYTES:
+                raise too_big_file
+            digest.update(chunk)
+            chunk = await file.read(self.CHUNK_SIZE_BYTES)
         await file.seek(0)
+
+        too_big_image = HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=messages.TOO_BIG_IMAGE,
+        )
         try:
-            img = Image.open(BytesIO(contents))
-            img.verify()
+            # Pillow works with file object, it is blocking - do it out of the event loop
+            width, height = await upload_executor.run(self.get_image_size, file.file)
+        except Image.DecompressionBombError:
+            raise too_big_image
         except Exception as e:
             raise HTTPException(status_code=400, detail=messages.INVALID_FILE_NOT_IMAGE)
+        finally:
+            await file.seek(0)
+        if width * height > config.MAX_IMAGE_PIXELS or max(width, height) > config.MAX_IMAGE_SIDE:
+            raise too_big_image
+
+        return digest.hexdigest()
+
+    def get_image_type(self, head: bytes) -> str | None:
+        for magic_bytes, image_type in self.MAGIC_BYTES.items():
+            if head.startswith(magic_bytes):
+                return image_type
+        return None
+
+    @staticmethod
+    def get_image_size(file) -> tuple[int, int]:
+        # Image.open reads only image header, pixels are decoded on first access
+        with Image.open(file, formats=["PNG", "JPEG"]) as img:
+            return img.size
 
     async def get_photo_count(self, user_id: UUID):
         count = await self.repo.get_picture_count(user_id)
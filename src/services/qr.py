@@ -1,20 +1,34 @@
+import hashlib
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
 from io import BytesIO
+from pathlib import Path
 
+import anyio
 import qrcode
 
+from src.conf.config import config
+from src.services.cache_stats import CacheStats
+
 
 class QRCodeService:
+    MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
     @staticmethod
-    def generate_qr_code(url):
+    def generate_qr_code(url, image_format: str = "png", box_size: int = 10, border: int = 4):
         qr = qrcode.QRCode(
             version=1,
             error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
+            box_size=box_size,
+            border=border,
         )
         qr.add_data(url)
         qr.make(fit=True)
 
+        if image_format == "svg":
+            return BytesIO(QRCodeService.render_svg(qr.get_matrix(), box_size))
+
         img = qr.make_image(fill_color="black", back_color="white")
 
         buf = BytesIO()
@@ -23,12 +37,139 @@ class QRCodeService:
 
         return buf
 
+    @staticmethod
+    def render_svg(matrix: list[list[bool]], box_size: int) -> bytes:
+        # one path of horizontal runs of dark modules: no rasterization and no
+        # compression, and less markup than a rect per module
+        runs = []
+        for y, row in enumerate(matrix):
+            x = 0
+            while x < len(row):
+                if row[x]:
+                    start = x
+                    while x < len(row) and row[x]:
+                        x += 1
+                    runs.append(f"M{start} {y}.5h{x - start}")
+                else:
+                    x += 1
+        size = len(matrix)
+        return (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{size * box_size}" '
+            f'height="{size * box_size}" viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+            f'<rect width="{size}" height="{size}" fill="#fff"/>'
+            f'<path stroke="#000" d="{"".join(runs)}"/></svg>'
+        ).encode()
+
+    @classmethod
+    def choose_format(cls, accept: str | None) -> str:
+        """
+        Format by Accept header: svg when client prefers it to png, png by default.
+        """
+        quality = {}
+        for media_range in (accept or "").split(","):
+            media_type, *params = [part.strip() for part in media_range.split(";")]
+            q = 1.0
+            for param in params:
+                name, _, value = param.partition("=")
+                if name.strip() == "q":
+                    try:
+                        q = float(value)
+                    except ValueError:
+                        q = 0.0
+            quality[media_type.lower()] = q
+
+        def get_quality(image_format: str) -> float:
+            media_type = cls.MEDIA_TYPES[image_format]
+            for key in (media_type, media_type.split("/")[0] + "/*", "*/*"):
+                if key in quality:
+                    return quality[key]
+            return 0.0
+
+        return "svg" if get_quality("svg") > get_quality("png") else "png"
+
+
+@dataclass(frozen=True)
+class QRCodeImage:
+    content: bytes
+    media_type: str
+    # sha256 of content, so it is strong ETag
+    etag: str
+
+
+class QRCodeCache(CacheStats):
+    """
+    Generated QR codes in process memory (LRU by count) and optionally on disk.
+
+    Image is fully determined by encoded url and render parameters,
+    so it is never invalidated. Files on disk survive restart and are shared
+    by workers, memory keeps the most used ones.
+    """
+
+    def __init__(self, max_items: int, root: Path | None = None):
+        self.max_items = max_items
+        self.root = Path(root) if root else None
+        self._images: OrderedDict[str, QRCodeImage] = OrderedDict()
+
+    @staticmethod
+    def get_key(url: str, image_format: str, box_size: int, border: int) -> str:
+        return hashlib.sha256(f"{image_format}|{box_size}|{border}|{url}".encode()).hexdigest()
+
+    async def get_or_create(
+        self, url: str, image_format: str = "png", box_size: int = 10, border: int = 4
+    ) -> QRCodeImage:
+        key = self.get_key(url, image_format, box_size, border)
+        image = self._images.get(key)
+        if image is not None:
+            self.hits += 1
+            self._images.move_to_end(key)
+            return image
+
+        self.misses += 1
+        content = await self.read_file(key, image_format)
+        if content is None:
+            buf = await anyio.to_thread.run_sync(
+                QRCodeService.generate_qr_code, url, image_format, box_size, border
+            )
+            content = buf.getvalue()
+            await self.write_file(key, image_format, content)
+
+        image = QRCodeImage(
+            content=content,
+            media_type=QRCodeService.MEDIA_TYPES[image_format],
+            etag=f'"{hashlib.sha256(content).hexdigest()}"',
+        )
+        self._images[key] = image
+        while len(self._images) > self.max_items:
+            self._images.popitem(last=False)
+        return image
+
+    def get_path(self, key: str, image_format: str) -> Path:
+        return self.root / key[:2] / f"{key}.{image_format}"
+
+    async def read_file(self, key: str, image_format: str) -> bytes | None:
+        if self.root is None:
+            return None
+        path = anyio.Path(self.get_path(key, image_format))
+        if not await path.is_file():
+            return None
+        return await path.read_bytes()
+
+    async def write_file(self, key: str, image_format: str, content: bytes) -> None:
+        if self.root is None:
+            return
+        path = self.get_path(key, image_format)
+        # other workers see only complete files
+        tmp_path = anyio.Path(self.root / "tmp" / f"{uuid.uuid4().hex}.{image_format}")
+        await tmp_path.parent.mkdir(parents=True, exist_ok=True)
+        await anyio.Path(path.parent).mkdir(parents=True, exist_ok=True)
+        await tmp_path.write_bytes(content)
+        await tmp_path.rename(path)
+
+    def clear(self) -> None:
+        self._images.clear()
 
-# # Приклад виклику функції з URL
-# url_to_encode = "https://www.example.com"
+    def get_size(self) -> int:
+        return len(self._images)
 
-# # Створення екземпляру класу QRCodeService
-# qr_code_service = QRCodeService()
 
-# # Отримання QR-коду у вигляді картинки
-# qr_image = qr_code_service.generate_qr_code(url_to_encode)
+qr_code_cache = QRCodeCache(config.QR_CACHE_MAX_ITEMS, config.QR_CACHE_DIR)
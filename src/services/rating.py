@@ -5,6 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from src.repositories.photos import PhotoRepo
 from src.repositories.rating import RatingRepo
 from src.repositories.users import UserRepo
+from src.services.cache import photo_page_cache
 
 
 class RatingService:
@@ -24,6 +25,7 @@ class RatingService:
             return None
         else:
             result = await self.repo.set_single_rate(photo_id, rate, user_id)
+            await photo_page_cache.invalidate(photo_id)
             return result
 
     async def delete_rate(self, photo_id: int, username:  str):
@@ -33,6 +35,7 @@ class RatingService:
             return None
         user_id = user.id
         result = await self.repo.delete_single_rate(photo_id, user_id)
+        await photo_page_cache.invalidate(photo_id)
         return result
 
     async def get_rates(self, photo_id: int):
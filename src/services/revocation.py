@@ -0,0 +1,242 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+import asyncpg
+from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import config
+from src.dependencies.database import sessionmanager
+from src.repositories.users import UserRepo
+
+logger = logging.getLogger(__name__)
+
+
+def to_timestamp(value: datetime) -> float:
+    # naive datetimes in db are UTC
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class TokenRevocationList:
+    """
+    Revoked tokens in process memory, so checking a token costs no db query.
+
+    A token is revoked by its "jti" (logout), all tokens of a subject
+    issued up to some moment are revoked at once (ban), or access tokens
+    with "ver" claim lower than current version of user (change by admin). Entries are kept until
+    the tokens expire. Table "blacklist" is the source of truth: it is loaded
+    on startup, and every worker gets new revocations by Postgres LISTEN/NOTIFY.
+    """
+
+    CHANNEL = "token_revoked"
+    # longest lifetime of tokens made by AuthService (refresh token)
+    MAX_TOKEN_LIFETIME = timedelta(days=7)
+    RECONNECT_DELAY = 5
+
+    def __init__(self, dsn: str, purge_interval: int, session=sessionmanager.session):
+        self.dsn = dsn
+        # factory of db sessions for background tasks
+        self.session = session
+        self.purge_interval = purge_interval
+        # jti -> expiration time of token (unix time)
+        self._tokens: dict[str, float] = {}
+        # subject -> (tokens issued up to this time are revoked, expiration time)
+        self._subjects: dict[str, tuple[float, float]] = {}
+        # subject -> (lowest valid token version, expiration time)
+        self._versions: dict[str, tuple[int, float]] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    @staticmethod
+    def get_token_id(token: str, claims: dict) -> str:
+        # tokens issued before "jti" claim was added are identified by hash
+        return claims.get("jti") or hashlib.sha256(token.encode()).hexdigest()
+
+    def is_revoked(self, token: str, claims: dict | None = None) -> bool:
+        """
+        Check decoded token, or decode it without verification when claims are not given.
+        """
+        if claims is None:
+            try:
+                claims = jwt.get_unverified_claims(token)
+            except JWTError:
+                return False
+        now = time.time()
+        expires = self._tokens.get(self.get_token_id(token, claims))
+        if expires is not None and expires > now:
+            return True
+        # tokens without "ver" claim are checked only by time of ban
+        version = self._versions.get(claims.get("sub"))
+        if version is not None and version[1] > now and claims.get("ver", version[0]) < version[0]:
+            return True
+        subject = self._subjects.get(claims.get("sub"))
+        if subject is not None and subject[1] > now:
+            return claims.get("iat", 0) <= subject[0]
+        return False
+
+    def apply(self, entry: dict) -> None:
+        """Add revocation from db row or notification to memory"""
+        if entry.get("jti"):
+            self._tokens[entry["jti"]] = entry["expires_at"]
+        if entry.get("subject") and entry.get("token_version") is not None:
+            version, expires = self._versions.get(entry["subject"], (0, 0))
+            self._versions[entry["subject"]] = (
+                max(version, entry["token_version"]),
+                max(expires, entry["expires_at"]),
+            )
+        elif entry.get("subject"):
+            revoked_before, expires = self._subjects.get(entry["subject"], (0, 0))
+            self._subjects[entry["subject"]] = (
+                max(revoked_before, entry["created_at"]),
+                max(expires, entry["expires_at"]),
+            )
+
+    async def revoke_token(self, token: str, db: AsyncSession) -> None:
+        claims = jwt.get_unverified_claims(token)
+        await self._revoke(
+            db,
+            jti=self.get_token_id(token, claims),
+            subject=None,
+            expires_at=datetime.utcfromtimestamp(claims["exp"]),
+        )
+
+    async def revoke_subject(self, subject: str, db: AsyncSession) -> None:
+        await self._revoke(
+            db,
+            jti=None,
+            subject=subject,
+            expires_at=datetime.utcnow() + self.MAX_TOKEN_LIFETIME,
+        )
+
+    async def revoke_token_version(
+        self, subject: str, token_version: int, db: AsyncSession
+    ) -> None:
+        """Revoke access tokens of subject with version lower than token_version"""
+        await self._revoke(
+            db,
+            jti=None,
+            subject=subject,
+            expires_at=datetime.utcnow() + self.MAX_TOKEN_LIFETIME,
+            token_version=token_version,
+        )
+
+    async def _revoke(
+        self,
+        db: AsyncSession,
+        jti: str | None,
+        subject: str | None,
+        expires_at: datetime,
+        token_version: int | None = None,
+    ) -> None:
+        created_at = datetime.utcnow()
+        entry = {
+            "jti": jti,
+            "subject": subject,
+            "created_at": to_timestamp(created_at),
+            "expires_at": to_timestamp(expires_at),
+            "token_version": token_version,
+        }
+        await UserRepo(db).add_token_to_blacklist(
+            jti,
+            subject,
+            created_at,
+            expires_at,
+            self.CHANNEL,
+            json.dumps(entry),
+            token_version=token_version,
+        )
+        # don't wait for own notification
+        self.apply(entry)
+
+    async def load(self, db: AsyncSession) -> None:
+        now = datetime.utcnow()
+        for row in await UserRepo(db).get_active_blacklist(now):
+            self.apply(
+                {
+                    "jti": row.jti,
+                    "subject": row.subject,
+                    "created_at": to_timestamp(row.created_at or now),
+                    "expires_at": to_timestamp(row.expires_at),
+                    "token_version": row.token_version,
+                }
+            )
+
+    def purge(self) -> None:
+        """Remove expired entries from memory"""
+        now = time.time()
+        self._tokens = {jti: exp for jti, exp in self._tokens.items() if exp > now}
+        self._subjects = {
+            subject: item for subject, item in self._subjects.items() if item[1] > now
+        }
+        self._versions = {
+            subject: item for subject, item in self._versions.items() if item[1] > now
+        }
+
+    def clear(self) -> None:
+        self._tokens.clear()
+        self._subjects.clear()
+        self._versions.clear()
+
+    async def purge_blacklist(self, db: AsyncSession) -> int:
+        """Remove expired rows from db and expired entries from memory"""
+        self.purge()
+        return await UserRepo(db).purge_blacklist(datetime.utcnow(), self.MAX_TOKEN_LIFETIME)
+
+    async def start(self) -> None:
+        async with self.session() as session:
+            await self.load(session)
+        self._tasks = [
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._purge_periodically()),
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _on_notification(self, connection, pid, channel, payload: str) -> None:
+        try:
+            self.apply(json.loads(payload))
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Wrong token revocation notification {payload!r}: {e}")
+
+    async def _listen(self) -> None:
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await connection.add_listener(self.CHANNEL, self._on_notification)
+                # catch up revocations made while there was no connection
+                async with self.session() as session:
+                    await self.load(session)
+                await closed.wait()
+                logger.warning("Connection for token revocations is closed")
+            except asyncio.CancelledError:
+                if connection is not None:
+                    await connection.close()
+                raise
+            except Exception as e:
+                logger.warning(f"Can't listen for token revocations: {e}")
+            await asyncio.sleep(self.RECONNECT_DELAY)
+
+    async def _purge_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.purge_interval)
+            try:
+                async with self.session() as session:
+                    count = await self.purge_blacklist(session)
+                logger.info(f"Expired tokens removed from blacklist: {count}")
+            except Exception as e:
+                logger.warning(f"Can't purge blacklist: {e}")
+
+
+token_revocation = TokenRevocationList(
+    config.DB_URL.replace("+asyncpg", ""), config.BLACKLIST_PURGE_INTERVAL
+)
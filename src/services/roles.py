@@ -5,22 +5,40 @@ from fastapi import Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.conf import messages
+from src.dependencies.database import get_db
 from src.models.users import Roles, UserModel
 from src.repositories.users import UserRepo
 from src.services.auth import auth_service
+from src.services.user_cache import get_request_roles, get_request_users
 
 
 class RoleChecker:
     def __init__(self, allowed_roles: List[Roles]):
         self.allowed_roles = allowed_roles
 
-    async def __call__(self, request: Request, current_user: UserModel = Depends(auth_service.get_current_user)):
-        if current_user.role not in self.allowed_roles:
+    async def __call__(
+        self,
+        request: Request,
+        current_user: UserModel = Depends(auth_service.get_current_user),
+        db: AsyncSession = Depends(get_db),
+    ):
+        if await self.get_user_role(current_user.id, db) not in self.allowed_roles:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=messages.OPERATION_FORBIDDEN)
 
+    async def get_user(self, user_id: UUID, db: AsyncSession) -> UserModel:
+        # current user is already resolved in this request
+        user = get_request_users(db).get(user_id)
+        if user is None:
+            user = await UserRepo(db).get_user_by_id(user_id=user_id)
+        return user
+
     async def get_user_role(self, user_id: UUID, db: AsyncSession):
-        user = await UserRepo(db).get_user_by_id(user_id=user_id)
-        return user.role
+        # role from claims of access token of this request
+        role = get_request_roles(db).get(user_id)
+        if role is None:
+            user = await self.get_user(user_id, db)
+            role = user.role
+        return role
 
     async def check_admin_or_moderator(self, user_id: UUID, db: AsyncSession):
         """
@@ -31,8 +49,8 @@ class RoleChecker:
 
         To check admin or moderator separately -> use only [Roles.admin] or [Roles.moderator]
         """
-        user = await UserRepo(db).get_user_by_id(user_id=user_id)
-        if user.role in self.allowed_roles:
-            return user.role
+        role = await self.get_user_role(user_id, db)
+        if role in self.allowed_roles:
+            return role
         else:
             return None
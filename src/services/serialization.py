@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, get_args, get_origin
+
+import orjson
+from fastapi import Response, status
+from pydantic import BaseModel
+
+
+@dataclass(frozen=True)
+class FieldPlan:
+    name: str
+    default: Any
+    # fields of nested schema (field is schema, list of schemas or None)
+    nested: tuple["FieldPlan", ...] | None = None
+
+
+class ResponseSerializer:
+    """
+    JSON of response schema from trusted rows of our own queries, without validation.
+
+    FastAPI validates returned data against response_model, dumps it to python
+    and then to JSON - three passes, the most expensive part of list responses.
+    Here only fields of the schema are taken from rows (dicts, sqlalchemy rows or
+    ORM objects), recursively and in the same order, and written by orjson in one pass.
+    Fields of schema are read once, see get_serializer.
+
+    Use it only for data which already has types of the schema:
+    values are not checked or converted (except Decimal to float).
+    """
+
+    def __init__(self, schema: type):
+        self.many = get_origin(schema) is list
+        self.plan = self.make_plan(get_args(schema)[0] if self.many else schema)
+
+    @classmethod
+    def make_plan(cls, model: type[BaseModel]) -> tuple[FieldPlan, ...]:
+        plan = []
+        for name, field in model.model_fields.items():
+            nested_model = cls.find_model(field.annotation)
+            plan.append(
+                FieldPlan(
+                    name=name,
+                    default=None if field.is_required() else field.get_default(call_default_factory=True),
+                    nested=cls.make_plan(nested_model) if nested_model else None,
+                )
+            )
+        return tuple(plan)
+
+    @classmethod
+    def find_model(cls, annotation) -> type[BaseModel] | None:
+        # schema in annotation: Schema, Schema | None, List[Schema | None], ...
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            return annotation
+        for arg in get_args(annotation):
+            model = cls.find_model(arg)
+            if model is not None:
+                return model
+        return None
+
+    @classmethod
+    def pick(cls, row, plan: tuple[FieldPlan, ...]) -> dict | None:
+        if row is None:
+            return None
+        if hasattr(row, "_asdict"):
+            row = row._asdict()
+        if isinstance(row, dict):
+            values = {field.name: row.get(field.name, field.default) for field in plan}
+        else:
+            values = {field.name: getattr(row, field.name, field.default) for field in plan}
+        for field in plan:
+            if field.nested is None:
+                continue
+            value = values[field.name]
+            if isinstance(value, (list, tuple)):
+                values[field.name] = [cls.pick(item, field.nested) for item in value]
+            else:
+                values[field.name] = cls.pick(value, field.nested)
+        return values
+
+    def to_python(self, data):
+        if self.many:
+            return [self.pick(row, self.plan) for row in data]
+        return self.pick(data, self.plan)
+
+    def dump_json(self, data) -> bytes:
+        # UTC as "Z" - the same as pydantic
+        return orjson.dumps(self.to_python(data), default=self.to_json, option=orjson.OPT_UTC_Z)
+
+    def response(
+        self, data, status_code: int = status.HTTP_200_OK, headers: dict | None = None
+    ) -> Response:
+        return Response(
+            self.dump_json(data),
+            status_code=status_code,
+            media_type="application/json",
+            headers=headers,
+        )
+
+    @staticmethod
+    def to_json(value):
+        # types which orjson doesn't know
+        if isinstance(value, Decimal):
+            return float(value)
+        raise TypeError
+
+
+@lru_cache(maxsize=None)
+def get_serializer(schema: type) -> ResponseSerializer:
+    # one serializer for every response schema, e.g. get_serializer(list[ImageSchema])
+    return ResponseSerializer(schema)
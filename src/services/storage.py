@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+import logging
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from uuid import UUID
+
+import anyio
+from fastapi import UploadFile
+
+from src.conf.config import config
+from src.dependencies.database import sessionmanager
+from src.models.users import UserModel
+from src.repositories.photos import PhotoRepo
+from src.repositories.users import UserRepo
+from src.services.cloudinary import CloudinaryService
+from src.services.executor import upload_executor
+from src.services.transform import TransformService
+
+logger = logging.getLogger(__name__)
+
+
+class StorageBackend(ABC):
+    """
+    Where photos and avatars are stored.
+
+    public_id - id of stored file in the backend, it is saved in PhotoModel.public_id.
+    """
+
+    @abstractmethod
+    async def upload_photo(self, file: UploadFile, user: UserModel) -> tuple[str, str]:
+        """Save photo, return url and public_id"""
+
+    @abstractmethod
+    async def upload_avatar(self, file: UploadFile, user_id: UUID) -> str:
+        """Save avatar, return url"""
+
+    @abstractmethod
+    async def destroy_photo(self, public_id: str) -> dict:
+        """Delete photo, return {"result": "ok"} or {"result": "not found"}"""
+
+    @abstractmethod
+    async def destroy_photos(self, public_ids: list[str]) -> list[str]:
+        """Delete many photos, return public_ids which were not deleted because of errors"""
+
+    @abstractmethod
+    def build_url(self, public_id: str) -> str:
+        """Url of stored photo"""
+
+    @abstractmethod
+    def get_transformed_photo_url(
+        self, photo_id: int, public_id: str, request_for_transformation: dict
+    ) -> str:
+        """Url of transformed photo. Raise ValueError if transformation is not supported"""
+
+    def get_file_path(self, public_id: str) -> Path | None:
+        # path of file on local disk, if backend serves files itself
+        return None
+
+
+class CloudinaryStorage(StorageBackend):
+    # Cloudinary SDK is blocking, so all requests go through upload_executor
+
+    # max resources in one request of bulk deletion
+    DESTROY_CHUNK_SIZE = 100
+
+    def __init__(self):
+        self.service = CloudinaryService()
+
+    async def upload_photo(self, file: UploadFile, user: UserModel) -> tuple[str, str]:
+        return await upload_executor.run(self.service.upload_photo, file, user)
+
+    async def upload_avatar(self, file: UploadFile, user_id: UUID) -> str:
+        return await upload_executor.run(self.service.upload_avatar, file, user_id)
+
+    async def destroy_photo(self, public_id: str) -> dict:
+        return await upload_executor.run(self.service.destroy_photo, public_id=public_id)
+
+    async def destroy_photos(self, public_ids: list[str]) -> list[str]:
+        chunks = [
+            public_ids[i:i + self.DESTROY_CHUNK_SIZE]
+            for i in range(0, len(public_ids), self.DESTROY_CHUNK_SIZE)
+        ]
+        results = await asyncio.gather(
+            *(upload_executor.run(self.service.destroy_photos, chunk) for chunk in chunks),
+            return_exceptions=True,
+        )
+        failed = []
+        for chunk, result in zip(chunks, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Stored files are not deleted {chunk}: {result!r}")
+                failed.extend(chunk)
+        return failed
+
+    def build_url(self, public_id: str) -> str:
+        return self.service.build_url(public_id)
+
+    def get_transformed_photo_url(
+        self, photo_id: int, public_id: str, request_for_transformation: dict
+    ) -> str:
+        return self.service.get_transformed_photo_url(public_id, request_for_transformation)
+
+
+class LocalStorage(StorageBackend):
+    """
+    Files on local disk, for single node and load tests without external services.
+
+    Files are content-addressed: public_id is "ab/cd/<sha256><ext>" and the same
+    content is saved only once, so one file can be shared by photos of different
+    users and avatars. File is deleted only when nothing uses it.
+    Files are served by /api/media router (except tmp/ with files being written),
+    transformed photos - by GET /api/photos/{photo_id}/transform.
+    """
+
+    CHUNK_SIZE_BYTES = 64 * 1024
+    EXTENSIONS = {
+        b"\x89PNG\r\n\x1a\n": ".png",
+        b"\xff\xd8\xff": ".jpg",
+    }
+
+    def __init__(self, root: Path, media_url: str, session=sessionmanager.session):
+        self.root = Path(root)
+        self.media_url = media_url.rstrip("/")
+        self.session = session
+
+    async def save_file(self, file: UploadFile) -> str:
+        # write to temporary file and count sha256 at the same time,
+        # then move file to its content address
+        tmp_path = anyio.Path(self.root / "tmp" / uuid.uuid4().hex)
+        await tmp_path.parent.mkdir(parents=True, exist_ok=True)
+
+        digest = hashlib.sha256()
+        await file.seek(0)
+        chunk = await file.read(self.CHUNK_SIZE_BYTES)
+        extension = self.get_extension(chunk)
+        async with await anyio.open_file(tmp_path, "wb") as out:
+            while chunk:
+                digest.update(chunk)
+                await out.write(chunk)
+                chunk = await file.read(self.CHUNK_SIZE_BYTES)
+        await file.seek(0)
+
+        content_hash = digest.hexdigest()
+        public_id = f"{content_hash[:2]}/{content_hash[2:4]}/{content_hash}{extension}"
+        path = anyio.Path(self.root / public_id)
+        await path.parent.mkdir(parents=True, exist_ok=True)
+        # same content - same file, so replace is safe
+        await tmp_path.rename(path)
+        return public_id
+
+    def get_extension(self, head: bytes) -> str:
+        for magic_bytes, extension in self.EXTENSIONS.items():
+            if head.startswith(magic_bytes):
+                return extension
+        return ""
+
+    async def upload_photo(self, file: UploadFile, user: UserModel) -> tuple[str, str]:
+        public_id = await self.save_file(file)
+        return self.build_url(public_id), public_id
+
+    async def upload_avatar(self, file: UploadFile, user_id: UUID) -> str:
+        public_id = await self.save_file(file)
+        return self.build_url(public_id)
+
+    async def get_used_public_ids(self, public_ids: list[str]) -> set[str]:
+        # files which are still used by photos or avatars
+        async with self.session() as db:
+            photos = await PhotoRepo(db).get_used_public_ids(public_ids)
+            avatars = await UserRepo(db).get_used_avatars(list(map(self.build_url, public_ids)))
+            return photos | {url.removeprefix(f"{self.media_url}/") for url in avatars}
+
+    async def destroy_photo(self, public_id: str) -> dict:
+        path = self.get_file_path(public_id)
+        if path is None or not await anyio.Path(path).is_file():
+            return {"result": "not found"}
+        # shared file is kept, photo is deleted for its owner anyway
+        if public_id not in await self.get_used_public_ids([public_id]):
+            await anyio.Path(path).unlink(missing_ok=True)
+        return {"result": "ok"}
+
+    async def destroy_photos(self, public_ids: list[str]) -> list[str]:
+        used = await self.get_used_public_ids(public_ids)
+        for public_id in public_ids:
+            path = self.get_file_path(public_id)
+            if path is not None and public_id not in used:
+                await anyio.Path(path).unlink(missing_ok=True)
+        return []
+
+    def build_url(self, public_id: str) -> str:
+        return f"{self.media_url}/{public_id}"
+
+    def get_transformed_photo_url(
+        self, photo_id: int, public_id: str, request_for_transformation: dict
+    ) -> str:
+        # transformations are rendered by local engine on first request
+        canonical = TransformService.canonical_transform(request_for_transformation)
+        return TransformService.build_url(photo_id, canonical)
+
+    def get_file_path(self, public_id: str) -> Path | None:
+        # don't let public_id like "../../etc/passwd" go out of storage dir
+        # or into tmp/ with files which are not fully written
+        root = self.root.resolve()
+        path = (root / public_id).resolve()
+        if root not in path.parents or root / "tmp" in path.parents:
+            return None
+        return path
+
+
+def get_storage_backend(name: str) -> StorageBackend:
+    if name == "cloudinary":
+        return CloudinaryStorage()
+    if name == "local":
+        return LocalStorage(config.LOCAL_STORAGE_DIR, config.LOCAL_MEDIA_URL)
+    raise ValueError(f"Unknown storage backend: {name}")
@@ -1,6 +1,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.repositories.tags import TagRepo
+from src.services.cache import photo_page_cache
 
 
 class TagService:
@@ -10,6 +11,7 @@ class TagService:
 
     async def add_tags_to_photo(self, photo_id, tags: list[str]) -> None:
         await self.repo.add_tags_to_photo(photo_id, tags)
+        await photo_page_cache.invalidate(photo_id)
 
     async def normalize_list_of_tag(self, body_tags: str) -> list[str]:
         # split the string with a comma and replace the spaces with "_"
@@ -0,0 +1,54 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+from src.conf.config import config
+from src.services.cache_stats import CacheStats
+
+
+class VerifiedTokenCache(CacheStats):
+    """
+    Payloads of JWT which were already verified (signature and claims),
+    so the same token is decoded once and not on every request.
+
+    Key is sha256 of token, raw tokens are not kept. Payload is kept until
+    "exp" of token. Revocation is not cached - it is checked on every request.
+    """
+
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        # digest -> payload, least recently used first
+        self._payloads: OrderedDict[bytes, dict] = OrderedDict()
+
+    @staticmethod
+    def get_key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> dict | None:
+        key = self.get_key(token)
+        payload = self._payloads.get(key)
+        if payload is None or payload["exp"] <= time.time():
+            if payload is not None:
+                del self._payloads[key]
+            self.misses += 1
+            return None
+        self._payloads.move_to_end(key)
+        self.hits += 1
+        return payload
+
+    def set(self, token: str, payload: dict) -> None:
+        if "exp" not in payload:
+            # token without expiration is not cached
+            return
+        self._payloads[self.get_key(token)] = payload
+        while len(self._payloads) > self.max_items:
+            self._payloads.popitem(last=False)
+
+    def clear(self) -> None:
+        self._payloads.clear()
+
+    def get_size(self) -> int:
+        return len(self._payloads)
+
+
+verified_tokens = VerifiedTokenCache(config.TOKEN_CACHE_MAX_ITEMS)
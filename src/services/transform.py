@@ -0,0 +1,257 @@
+import asyncio
+import functools
+import hashlib
+import os
+import re
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from urllib.parse import quote
+
+import anyio
+from PIL import Image, ImageChops, ImageDraw, ImageOps
+
+from src.conf.config import config
+from src.services.cache_stats import CacheStats
+from src.services.executor import transform_executor
+
+
+class TransformService:
+    """
+    Local transformation engine, does the same transformations as
+    CloudinaryService.get_transformed_photo_url with Pillow.
+
+    Transformation is written as canonical string in Cloudinary style,
+    steps are separated by "/" and applied in the same order as in Cloudinary:
+    "g_face/a_45/c_crop,h_200,w_200/r_max/r_50/e_grayscale"
+    """
+
+    STEPS = {
+        "gravity": re.compile(r"^g_face$"),
+        "rotate": re.compile(r"^a_(\d+)$"),
+        "crop": re.compile(r"^c_crop,h_(\d+),w_(\d+)$"),
+        "max_radius": re.compile(r"^r_max$"),
+        "radius": re.compile(r"^r_(\d+)$"),
+        "grayscale": re.compile(r"^e_grayscale$"),
+    }
+
+    @staticmethod
+    def canonical_transform(request_for_transformation: dict) -> str:
+        steps = []
+        height = request_for_transformation["height"]
+        width = request_for_transformation["width"]
+        radius = request_for_transformation["radius"]
+        angle = request_for_transformation["angle"]
+
+        if request_for_transformation["zoom_on_face"]:
+            steps.append("g_face")
+        if request_for_transformation["rotate_photo"]:
+            steps.append(f"a_{angle % 360}")
+        if request_for_transformation["crop_photo"]:
+            steps.append(f"c_crop,h_{height},w_{width}")
+        if request_for_transformation["apply_max_radius"]:
+            steps.append("r_max")
+        if request_for_transformation["apply_radius"]:
+            steps.append(f"r_{radius}")
+        if request_for_transformation["apply_grayscale"]:
+            steps.append("e_grayscale")
+
+        canonical = "/".join(steps)
+        # check values, raise ValueError if they are wrong
+        TransformService.parse_transform(canonical)
+        return canonical
+
+    @staticmethod
+    def parse_transform(canonical: str) -> list[tuple[str, tuple[int, ...]]]:
+        """
+        Parse canonical transformation to list of (step name, arguments).
+        Raise ValueError for unknown steps and wrong values.
+        """
+        steps = []
+        for part in canonical.split("/") if canonical else []:
+            for name, pattern in TransformService.STEPS.items():
+                match = pattern.match(part)
+                if match:
+                    args = tuple(int(arg) for arg in match.groups())
+                    break
+            else:
+                raise ValueError(f"Unknown transformation: {part}")
+            if name == "crop" and not all(0 < side <= config.MAX_IMAGE_SIDE for side in args):
+                raise ValueError(f"Wrong crop size: {part}")
+            if name == "rotate" and args[0] >= 360:
+                raise ValueError(f"Wrong angle: {part}")
+            steps.append((name, args))
+        return steps
+
+    @staticmethod
+    def build_url(photo_id: int, canonical: str) -> str:
+        return f"/api/photos/{photo_id}/transform?select=image&t={quote(canonical, safe='/,_')}"
+
+    @staticmethod
+    def get_suffix(public_id: str, canonical: str) -> str:
+        # rotation and rounded corners need transparency - PNG,
+        # other transformations keep format of original photo
+        if re.search(r"(^|/)(a|r)_", canonical):
+            return ".png"
+        return ".png" if public_id.lower().endswith(".png") else ".jpg"
+
+
+def render_transformation(source_path: str, canonical: str, destination_path: str) -> int:
+    """
+    Apply transformation to the photo and save result, return size of result file.
+
+    Runs in process pool, so it gets only picklable arguments.
+    """
+    steps = TransformService.parse_transform(canonical)
+    to_png = destination_path.endswith(".png")
+
+    with Image.open(source_path) as img:
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("RGBA" if to_png else "RGB")
+
+        for name, args in steps:
+            if name == "gravity":
+                # there is no face detection in Pillow, crop stays centered
+                # as in Cloudinary when face is not found
+                continue
+            elif name == "rotate":
+                # Cloudinary rotates clockwise
+                img = img.rotate(-args[0], expand=True, resample=Image.Resampling.BICUBIC)
+            elif name == "crop":
+                height, width = args
+                width, height = min(width, img.width), min(height, img.height)
+                left = (img.width - width) // 2
+                top = (img.height - height) // 2
+                img = img.crop((left, top, left + width, top + height))
+            elif name in ("radius", "max_radius"):
+                mask = Image.new("L", img.size, 0)
+                box = (0, 0, img.width - 1, img.height - 1)
+                if name == "max_radius":
+                    ImageDraw.Draw(mask).ellipse(box, fill=255)
+                else:
+                    ImageDraw.Draw(mask).rounded_rectangle(box, radius=args[0], fill=255)
+                if img.mode == "RGBA":
+                    mask = ImageChops.multiply(img.getchannel("A"), mask)
+                    img.putalpha(mask)
+            elif name == "grayscale":
+                alpha = img.getchannel("A") if img.mode == "RGBA" else None
+                img = ImageOps.grayscale(img)
+                if alpha is not None:
+                    img = img.convert("LA")
+                    img.putalpha(alpha)
+
+        img.save(destination_path, format="PNG" if to_png else "JPEG")
+
+    return os.path.getsize(destination_path)
+
+
+class DerivativeCache(CacheStats):
+    """
+    On-disk cache of transformed photos with size based LRU eviction.
+
+    Key is (public_id, canonical transformation). Last access time is kept
+    in file mtime, so order of eviction survives restart.
+    Same derivative requested by several requests is rendered only once.
+    Index is kept by every worker process: file rendered by other worker
+    is taken from disk and added to the index, so it isn't rendered again,
+    but max_bytes is the bound of files indexed by one process.
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        # path -> size, least recently used first
+        self._index: OrderedDict[Path, int] | None = None
+        self._size = 0
+        self._rendering: dict[Path, asyncio.Task] = {}
+
+    def get_path(self, public_id: str, canonical: str) -> Path:
+        key = hashlib.sha256(f"{public_id}|{canonical}".encode()).hexdigest()
+        return self.root / key[:2] / f"{key}{TransformService.get_suffix(public_id, canonical)}"
+
+    async def get_or_create(self, public_id: str, canonical: str, source_path: Path) -> Path:
+        await self.load_index()
+        path = self.get_path(public_id, canonical)
+
+        if await anyio.Path(path).is_file():
+            self.hits += 1
+            if path in self._index:
+                self._index.move_to_end(path)
+            else:
+                # rendered by other worker process
+                await self.add(path, (await anyio.Path(path).stat()).st_size)
+            await anyio.to_thread.run_sync(os.utime, path)
+            return path
+
+        task = self._rendering.get(path)
+        if task is not None:
+            # somebody renders it right now - wait for the result
+            self.hits += 1
+        else:
+            self.misses += 1
+            # shared task: rendering goes on for other requests
+            # when the request which started it is cancelled
+            task = asyncio.ensure_future(self.render(path, canonical, source_path))
+            self._rendering[path] = task
+            task.add_done_callback(functools.partial(self.rendering_done, path))
+        await asyncio.shield(task)
+        return path
+
+    def rendering_done(self, path: Path, task: asyncio.Task):
+        del self._rendering[path]
+        if not task.cancelled():
+            # retrieve exception, it is not logged when all requests were cancelled
+            task.exception()
+
+    async def render(self, path: Path, canonical: str, source_path: Path):
+        tmp_path = self.root / "tmp" / f"{uuid.uuid4().hex}{path.suffix}"
+        await anyio.Path(tmp_path.parent).mkdir(parents=True, exist_ok=True)
+        await anyio.Path(path.parent).mkdir(parents=True, exist_ok=True)
+        try:
+            size = await transform_executor.run(
+                render_transformation, str(source_path), canonical, str(tmp_path)
+            )
+            await anyio.Path(tmp_path).rename(path)
+        finally:
+            await anyio.Path(tmp_path).unlink(missing_ok=True)
+        await self.add(path, size)
+
+    async def add(self, path: Path, size: int):
+        self._size -= self._index.pop(path, 0)
+        self._index[path] = size
+        self._size += size
+        await self.evict()
+
+    async def evict(self):
+        # remove least recently used files, but never the last added one
+        removed = []
+        while self._size > self.max_bytes and len(self._index) > 1:
+            path, size = self._index.popitem(last=False)
+            self._size -= size
+            removed.append(path)
+        for path in removed:
+            await anyio.Path(path).unlink(missing_ok=True)
+
+    def get_size(self) -> int:
+        # files in cache, index is loaded on first request
+        return len(self._index or ())
+
+    async def load_index(self):
+        if self._index is None:
+            self._index = await anyio.to_thread.run_sync(self.scan)
+            self._size = sum(self._index.values())
+
+    def scan(self) -> OrderedDict[Path, int]:
+        files = []
+        if self.root.is_dir():
+            for directory in self.root.iterdir():
+                if not directory.is_dir() or directory.name == "tmp":
+                    continue
+                for path in directory.iterdir():
+                    stat = path.stat()
+                    files.append((stat.st_mtime, path, stat.st_size))
+        files.sort()
+        return OrderedDict((path, size) for _, path, size in files)
+
+
+derivative_cache = DerivativeCache(config.TRANSFORM_CACHE_DIR, config.TRANSFORM_CACHE_MAX_BYTES)
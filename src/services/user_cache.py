@@ -0,0 +1,81 @@
+import time
+from collections import OrderedDict
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import config
+from src.models.users import Roles, UserModel
+from src.services.cache_stats import CacheStats
+
+
+class UserCache(CacheStats):
+    """
+    Snapshots of users for authentication, so a request with warm cache
+    resolves current user without db queries.
+
+    Snapshot has only public fields of user, password hash is never cached.
+    Key is email (subject of token). Every worker has its own cache, changes made
+    in other workers are seen after TTL, bans are applied at once by token revocation.
+    """
+
+    FIELDS = ("id", "username", "email", "avatar", "role", "confirmed", "is_active", "created_at")
+
+    def __init__(self, max_items: int, ttl: int):
+        self.max_items = max_items
+        self.ttl = ttl
+        # email -> (expire time, snapshot), least recently used first
+        self._users: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._emails: dict[UUID, str] = {}
+
+    def get(self, email: str) -> UserModel | None:
+        """New detached user made from snapshot, or None"""
+        item = self._users.get(email)
+        if item is None or item[0] < time.monotonic():
+            if item is not None:
+                self._remove(email)
+            self.misses += 1
+            return None
+        self._users.move_to_end(email)
+        self.hits += 1
+        return UserModel(**item[1])
+
+    def set(self, user: UserModel) -> None:
+        self.invalidate(user.id)
+        snapshot = {field: getattr(user, field) for field in self.FIELDS}
+        self._users[user.email] = (time.monotonic() + self.ttl, snapshot)
+        self._emails[user.id] = user.email
+        while len(self._users) > self.max_items:
+            self._remove(next(iter(self._users)))
+
+    def invalidate(self, user_id: UUID) -> None:
+        email = self._emails.pop(user_id, None)
+        if email is not None:
+            self._users.pop(email, None)
+
+    def clear(self) -> None:
+        self._users.clear()
+        self._emails.clear()
+
+    def _remove(self, email: str) -> None:
+        _, snapshot = self._users.pop(email)
+        self._emails.pop(snapshot["id"], None)
+
+    def get_size(self) -> int:
+        return len(self._users)
+
+
+def get_request_users(db: AsyncSession) -> dict[UUID, UserModel]:
+    """
+    Identity map of users resolved in current request (db session lives one request),
+    so checks of role don't load the same user again.
+    """
+    return db.info.setdefault("users", {})
+
+
+def get_request_roles(db: AsyncSession) -> dict[UUID, Roles]:
+    """Roles of users from verified claims of access token of current request"""
+    return db.info.setdefault("roles", {})
+
+
+user_cache = UserCache(config.USER_CACHE_MAX_ITEMS, config.USER_CACHE_TTL)
@@ -13,9 +13,15 @@ from sqlalchemy.pool import NullPool
 from main import app
 from src.models.photos import PhotoModel, TransformedImageLinkModel, CommentModel, TagModel
 from src.dependencies.database import get_db
+from src.dependencies.storage import storage_backend
 from src.models.base import Base
 from src.models.users import Roles, UserModel
 from src.services.auth import auth_service
+from src.services.cache import photo_page_cache
+from src.services.job_handlers import job_handlers
+from src.services.jobs import JobWorker
+from src.services.revocation import token_revocation
+from src.services.user_cache import user_cache
 
 # ------------------------------------------------------------------------------------
 # TODO : use docker
@@ -66,6 +72,10 @@ def init_moduls_wrap():
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.drop_all)
             await conn.run_sync(Base.metadata.create_all)
+        # ids of photos start from 1 again - drop pages of old ones
+        await photo_page_cache.clear()
+        token_revocation.clear()
+        user_cache.clear()
 
         async with TestingSessionLocal() as session:
             hash_password = auth_service.get_password_hash(test_user["password"])
@@ -297,3 +307,12 @@ async def create_transform_photo(photo_id: int):
         await session.refresh(transform_photo)
 
     return transform_photo
+
+
+async def run_jobs(storage=storage_backend) -> int:
+    # jobs are done by worker process, in tests - by this call. Returns count of jobs
+    worker = JobWorker(job_handlers(storage, TestingSessionLocal), session=TestingSessionLocal)
+    count = 0
+    while done := await worker.run_once():
+        count += done
+    return count
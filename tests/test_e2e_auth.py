@@ -1,8 +1,11 @@
+import asyncio
 from unittest.mock import AsyncMock, Mock
 
 import pytest
 from sqlalchemy import select
 
+from conftest import run_jobs
+
 
 user_data = {
     "username": "string",
@@ -12,7 +15,7 @@ user_data = {
 
 
 def test_signup(client, monkeypatch):
-    mock_send_varification_email = Mock()
+    mock_send_varification_email = AsyncMock()
     monkeypatch.setattr(
         "src.services.email.EmailService.send_varification_mail",
         mock_send_varification_email,
@@ -20,6 +23,9 @@ def test_signup(client, monkeypatch):
     response = client.post("api/auth/register", json=user_data)
 
     assert response.status_code == 201, response.text
+    # mail is sent by job worker
+    assert not mock_send_varification_email.called
+    asyncio.run(run_jobs())
     assert mock_send_varification_email.called
     data = response.json()
 
@@ -0,0 +1,230 @@
+import asyncio
+from email import message_from_bytes
+from email.message import EmailMessage
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from src.models.jobs import JobModel
+from src.models.users import UserModel
+from src.services.auth import auth_service
+from src.services.email import EmailService, MailTemplates, SmtpPool, mail_templates
+from src.services.jobs import SEND_NEW_PASSWORD_MAIL, SEND_VERIFICATION_MAIL, JobService
+
+from conftest import TestingSessionLocal, create_user_test, run_jobs
+
+
+class LocalSmtpServer:
+    """SMTP stand-in: accepts any mail, keeps messages and counts connections"""
+
+    def __init__(self):
+        self.messages = []
+        self.connections = 0
+        self._writers = []
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.drop_connections()
+        self.server.close()
+        await self.server.wait_closed()
+
+    def drop_connections(self):
+        for writer in self._writers:
+            writer.close()
+        self._writers = []
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        self._writers.append(writer)
+        writer.write(b"220 localhost ESMTP\r\n")
+        while line := await reader.readline():
+            command = line.decode().strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                writer.write(b"250 localhost\r\n")
+            elif command == "DATA":
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                data = []
+                while (data_line := await reader.readline()) != b".\r\n":
+                    data.append(data_line)
+                self.messages.append(message_from_bytes(b"".join(data)))
+                writer.write(b"250 OK\r\n")
+            elif command == "QUIT":
+                writer.write(b"221 Bye\r\n")
+                await writer.drain()
+                break
+            else:
+                # MAIL FROM, RCPT TO, RSET, NOOP
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+        writer.close()
+
+
+@pytest_asyncio.fixture()
+async def smtp_server():
+    server = LocalSmtpServer()
+    await server.start()
+    yield server
+    await server.stop()
+
+
+@pytest_asyncio.fixture()
+async def pool(smtp_server, monkeypatch):
+    pool = SmtpPool(
+        hostname="127.0.0.1",
+        port=smtp_server.port,
+        username=None,
+        password=None,
+        use_tls=False,
+        start_tls=False,
+        size=2,
+        max_idle=60,
+    )
+    monkeypatch.setattr("src.services.email.smtp_pool", pool)
+    yield pool
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_mails_reuse_pooled_connections(smtp_server, pool):
+    service = EmailService()
+
+    await asyncio.gather(
+        *(service.send_new_password_mail(f"user{i}@example.com", f"user{i}", "secret") for i in range(6))
+    )
+    await service.send_new_password_mail("last@example.com", "last", "secret")
+
+    assert len(smtp_server.messages) == 7
+    assert smtp_server.connections == pool.opened == 2
+    message = smtp_server.messages[-1]
+    assert message["To"] == "last@example.com"
+    assert "secret" in message.get_payload(decode=True).decode()
+
+
+@pytest.mark.asyncio
+async def test_closed_connection_is_opened_again(smtp_server, pool):
+    service = EmailService()
+    await service.send_new_password_mail("first@example.com", "first", "secret")
+
+    # server closes idle connection
+    smtp_server.drop_connections()
+    await asyncio.sleep(0.01)
+    await service.send_new_password_mail("second@example.com", "second", "secret")
+
+    assert [message["To"] for message in smtp_server.messages] == [
+        "first@example.com", "second@example.com"
+    ]
+    assert smtp_server.connections == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_send_closes_connection(smtp_server, pool, monkeypatch):
+    async with pool.connection() as client:
+        pass
+    started = asyncio.Event()
+
+    async def hanging_send(message):
+        started.set()
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(client, "send_message", hanging_send)
+    # the only idle connection is taken by send which is cancelled
+    send = asyncio.create_task(pool.send(EmailMessage()))
+    await started.wait()
+    send.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await send
+
+    assert not client.is_connected
+    assert pool._idle == []
+    assert pool._semaphore._value == 2
+
+
+def test_templates_are_compiled_once(monkeypatch):
+    templates = MailTemplates(mail_templates.env.loader.searchpath[0])
+    templates.compile_all()
+    compile_template = Mock(side_effect=AssertionError("template is compiled again"))
+    monkeypatch.setattr(templates.env, "compile", compile_template)
+
+    html = templates.render("new_password.html", {"username": "<b>user</b>", "new_psw": "psw"})
+
+    assert "&lt;b&gt;user&lt;/b&gt;" in html
+
+
+@pytest.mark.asyncio
+async def test_registration_mail_is_sent_from_outbox(client, smtp_server, pool):
+    response = client.post(
+        "/api/auth/register",
+        json={"username": "outbox_user", "email": "outbox_user@example.com", "password": "password"},
+    )
+    assert response.status_code == 201, response.text
+
+    async with TestingSessionLocal() as session:
+        result = await session.execute(select(JobModel).filter_by(kind=SEND_VERIFICATION_MAIL))
+        assert [job.payload["email"] for job in result.scalars()] == ["outbox_user@example.com"]
+
+    assert await run_jobs() == 1
+    assert [message["To"] for message in smtp_server.messages] == ["outbox_user@example.com"]
+    assert "api/auth/confirmed_email/" in smtp_server.messages[0].get_payload(decode=True).decode()
+
+
+@pytest.mark.asyncio
+async def test_user_is_not_saved_without_mail(client, monkeypatch):
+    monkeypatch.setattr(JobService, "enqueue", AsyncMock(side_effect=ConnectionError("db is lost")))
+
+    with pytest.raises(ConnectionError):
+        client.post(
+            "/api/auth/register",
+            json={"username": "no_mail", "email": "no_mail@example.com", "password": "password"},
+        )
+
+    async with TestingSessionLocal() as session:
+        result = await session.execute(select(UserModel).filter_by(username="no_mail"))
+        assert result.scalar_one_or_none() is None
+
+
+@pytest.mark.asyncio
+async def test_mail_is_retried_when_server_is_down(client, smtp_server, pool):
+    user = await create_user_test("retry", "retry@example.com", "password")
+    await smtp_server.stop()
+    async with TestingSessionLocal() as session:
+        job = await JobService(session).enqueue(
+            "email.new_password", {"user_id": str(user.id)}
+        )
+
+    assert await run_jobs() == 1
+
+    async with TestingSessionLocal() as session:
+        job = await session.get(JobModel, job.id)
+    assert job.attempts == 1
+    assert job.last_error.startswith("SMTPConnectError")
+    # password which was not mailed is not set
+    async with TestingSessionLocal() as session:
+        assert (await session.get(UserModel, user.id)).password == user.password
+    await smtp_server.start()
+
+
+@pytest.mark.asyncio
+async def test_new_password_is_not_saved_in_job(client, smtp_server, pool):
+    user = await create_user_test("new_psw", "new_psw@example.com", "password")
+    token = auth_service.create_email_token({"sub": user.email})
+
+    response = client.get(f"/api/auth/password-reset/{token}")
+    assert response.status_code == 200, response.text
+
+    async with TestingSessionLocal() as session:
+        result = await session.execute(select(JobModel).filter_by(kind=SEND_NEW_PASSWORD_MAIL))
+        payloads = [job.payload for job in result.scalars()]
+        assert {"user_id": str(user.id)} in payloads
+        assert all("new_password" not in payload for payload in payloads)
+        # password is changed by the job
+        assert (await session.get(UserModel, user.id)).password == user.password
+
+    await run_jobs()
+    assert [message["To"] for message in smtp_server.messages] == [user.email]
+    async with TestingSessionLocal() as session:
+        assert (await session.get(UserModel, user.id)).password != user.password
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+from fastapi import status
+from passlib.context import CryptContext
+from sqlalchemy import select
+
+from src.conf import messages
+from src.conf.config import config
+from src.models.users import UserModel
+from src.services.passwords import PasswordHasher, password_hasher
+
+from conftest import TestingSessionLocal
+
+
+async def create_user_with_hash(email: str, password_hash: str):
+    async with TestingSessionLocal() as session:
+        session.add(
+            UserModel(
+                username=email.split("@")[0],
+                email=email,
+                password=password_hash,
+                confirmed=True,
+                is_active=True,
+            )
+        )
+        await session.commit()
+
+
+async def get_password_hash(email: str) -> str:
+    async with TestingSessionLocal() as session:
+        stmt = select(UserModel.password).filter_by(email=email)
+        return (await session.execute(stmt)).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_login_rehashes_password_with_new_work_factor(client):
+    old_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4)
+    await create_user_with_hash("old_cost@example.com", old_context.hash("old_password"))
+
+    response = client.post(
+        "/api/auth/login", data={"username": "old_cost@example.com", "password": "old_password"}
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+
+    new_hash = await get_password_hash("old_cost@example.com")
+    assert new_hash.startswith(f"$2b${config.BCRYPT_ROUNDS:02d}$")
+    assert password_hasher.verify("old_password", new_hash)
+
+    # hash with current work factor is not changed
+    response = client.post(
+        "/api/auth/login", data={"username": "old_cost@example.com", "password": "old_password"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert await get_password_hash("old_cost@example.com") == new_hash
+
+
+def test_login_is_rejected_when_hashing_is_overloaded(client, monkeypatch):
+    monkeypatch.setattr(password_hasher, "_pending", password_hasher.max_pending)
+
+    response = client.post(
+        "/api/auth/login", data={"username": "old_cost@example.com", "password": "old_password"}
+    )
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["detail"] == messages.SERVER_IS_BUSY
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+@pytest.mark.asyncio
+async def test_hashing_does_not_block_event_loop():
+    hasher = PasswordHasher(rounds=12, max_workers=2, max_pending=4)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    task = asyncio.create_task(ticker())
+    try:
+        password_hash = await hasher.hash_async("password")
+        is_valid, new_hash = await hasher.verify_and_update("password", password_hash)
+    finally:
+        task.cancel()
+
+    assert is_valid and new_hash is None
+    # loop was running while bcrypt worked
+    assert ticks > 5
@@ -8,7 +8,7 @@ from sqlalchemy import select
 
 import src.services.email
 from src.models.users import UserModel
-from tests.conftest import TestingSessionLocal, test_user, TestClient
+from tests.conftest import TestingSessionLocal, test_user, TestClient, run_jobs
 from src.conf import messages
 from fastapi.security import OAuth2PasswordRequestForm
 from src.services.auth import auth_service
@@ -34,7 +34,7 @@ async def test_request_password_reset(client: TestClient, monkeypatch):
     mock_get_user_by_email.return_value = UserModel(confirmed=True, **user_data)
 
     # Mocking the send_request_password_mail method
-    mock_send_request_password_mail = MagicMock()
+    mock_send_request_password_mail = AsyncMock()
 
     monkeypatch.setattr(auth_service, "get_user_by_email", mock_get_user_by_email)
     monkeypatch.setattr(
@@ -51,6 +51,8 @@ async def test_request_password_reset(client: TestClient, monkeypatch):
 
     # Check if the necessary functions were called
     mock_get_user_by_email.assert_called_once_with(user_data["email"], mock.ANY)
+    # mail is sent by job worker
+    await run_jobs()
     mock_send_request_password_mail.assert_called_once_with(
         user_data["email"], user_data["username"], mock.ANY
     )
@@ -0,0 +1,135 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import status
+from jose import jwt
+from sqlalchemy import event, select
+
+from src.models.users import BlackListModel
+from src.services.auth import auth_service
+from src.services.revocation import TokenRevocationList, token_revocation
+
+from conftest import TestingSessionLocal, confirmed_user_data, engine, test_user
+
+
+def login(client, email: str, password: str) -> str:
+    response = client.post("/api/auth/login", data={"username": email, "password": password})
+    assert response.status_code == status.HTTP_200_OK, response.text
+    return response.json()["access_token"]
+
+
+def test_logout_revokes_token_in_memory(client):
+    access_token = login(client, test_user["email"], test_user["password"])
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        response = client.get("/api/users/my_profile", headers=headers)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", listener)
+    assert response.status_code == status.HTTP_200_OK
+    # only the user is selected, blacklist is not queried
+    assert len(statements) == 1
+    assert not any("blacklist" in statement for statement in statements)
+
+    response = client.get("/api/auth/logout", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+
+    assert token_revocation.is_revoked(access_token)
+    response = client.get("/api/users/my_profile", headers=headers)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    # other tokens of the user are still valid
+    other_token = login(client, test_user["email"], test_user["password"])
+    response = client.get(
+        "/api/users/my_profile", headers={"Authorization": f"Bearer {other_token}"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.asyncio
+async def test_logout_saves_jti_with_expiration(client):
+    access_token = login(client, test_user["email"], test_user["password"])
+    client.get("/api/auth/logout", headers={"Authorization": f"Bearer {access_token}"})
+
+    claims = jwt.get_unverified_claims(access_token)
+    async with TestingSessionLocal() as session:
+        stmt = select(BlackListModel).filter_by(jti=claims["jti"])
+        row = (await session.execute(stmt)).scalar_one()
+    assert row.expires_at == datetime.utcfromtimestamp(claims["exp"])
+    assert row.subject is None
+
+
+def test_ban_revokes_issued_tokens(client, create_confirmed_user, get_token):
+    user_token = login(client, confirmed_user_data["email"], confirmed_user_data["password"])
+    headers = {"Authorization": f"Bearer {user_token}"}
+    assert client.get("/api/users/my_profile", headers=headers).status_code == 200
+
+    response = client.put(
+        f'/api/users/{confirmed_user_data["username"]}',
+        headers={"Authorization": f"Bearer {get_token}"},
+        params={"is_active": False, "role": "users"},
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+
+    response = client.get("/api/users/my_profile", headers=headers)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    # tokens of other users are not affected
+    response = client.get(
+        "/api/users/my_profile", headers={"Authorization": f"Bearer {get_token}"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.asyncio
+async def test_load_and_purge_blacklist():
+    now = datetime.utcnow()
+    async with TestingSessionLocal() as session:
+        session.add_all(
+            [
+                BlackListModel(jti="expired", expires_at=now - timedelta(minutes=1)),
+                BlackListModel(jti="active", expires_at=now + timedelta(minutes=15)),
+                # row added before expiration was saved
+                BlackListModel(token="legacy", created_at=now - timedelta(days=8)),
+            ]
+        )
+        await session.commit()
+
+    revocation = TokenRevocationList("", purge_interval=3600)
+    async with TestingSessionLocal() as session:
+        await revocation.load(session)
+    assert revocation.is_revoked("", {"jti": "active"})
+    assert not revocation.is_revoked("", {"jti": "expired"})
+
+    async with TestingSessionLocal() as session:
+        assert await revocation.purge_blacklist(session) == 2
+        jtis = (await session.execute(select(BlackListModel.jti))).scalars().all()
+    assert "active" in jtis
+    assert "expired" not in jtis
+
+
+@pytest.mark.asyncio
+async def test_revocation_is_sent_to_other_workers():
+    dsn = os.getenv("TEST_DB_URL").replace("+asyncpg", "")
+    worker = TokenRevocationList(dsn, purge_interval=3600, session=TestingSessionLocal)
+    other_worker = TokenRevocationList(dsn, purge_interval=3600)
+    listener = asyncio.create_task(worker._listen())
+    try:
+        token = await auth_service.create_access_token(test_user["email"])
+        # wait until listener is connected
+        await asyncio.sleep(0.5)
+        async with TestingSessionLocal() as session:
+            await other_worker.revoke_token(token, session)
+
+        for _ in range(50):
+            if worker.is_revoked(token):
+                break
+            await asyncio.sleep(0.1)
+        assert worker.is_revoked(token)
+    finally:
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
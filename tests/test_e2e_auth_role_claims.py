@@ -0,0 +1,84 @@
+import pytest
+from fastapi import status
+from jose import jwt
+from sqlalchemy import event
+
+from src.models.users import Roles
+from src.services.auth import auth_service
+from src.services.revocation import TokenRevocationList
+from src.services.roles import RoleChecker
+
+from conftest import TestingSessionLocal, confirmed_user_data, engine, test_user
+
+
+def login(client, email: str, password: str) -> str:
+    response = client.post("/api/auth/login", data={"username": email, "password": password})
+    assert response.status_code == status.HTTP_200_OK, response.text
+    return response.json()["access_token"]
+
+
+def test_access_token_has_role_and_version(client):
+    access_token = login(client, test_user["email"], test_user["password"])
+
+    claims = jwt.get_unverified_claims(access_token)
+    assert claims["role"] == Roles.admin.value
+    assert claims["ver"] == 0
+
+
+@pytest.mark.asyncio
+async def test_role_is_checked_by_claims():
+    # role in claims differs from db only to show where it is taken from
+    token = await auth_service.create_access_token(
+        test_user["email"], role=Roles.moderator, token_version=0
+    )
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    async with TestingSessionLocal() as session:
+        user = await auth_service.extract_token_data(token, session)
+        event.listen(engine.sync_engine, "before_cursor_execute", listener)
+        try:
+            role = await RoleChecker([Roles.admin, Roles.moderator]).check_admin_or_moderator(
+                user.id, session
+            )
+            admin_role = await RoleChecker([Roles.admin]).check_admin_or_moderator(user.id, session)
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", listener)
+
+    assert role == Roles.moderator
+    assert admin_role is None
+    assert statements == []
+
+
+@pytest.mark.asyncio
+async def test_change_by_admin_revokes_tokens_with_old_version(client, create_confirmed_user):
+    user_token = login(client, confirmed_user_data["email"], confirmed_user_data["password"])
+    # token without role claims is checked only by time of ban
+    legacy_token = await auth_service.create_access_token(confirmed_user_data["email"])
+    admin_token = login(client, test_user["email"], test_user["password"])
+
+    response = client.put(
+        f'/api/users/{confirmed_user_data["username"]}',
+        headers={"Authorization": f"Bearer {admin_token}"},
+        params={"is_active": True, "role": "moderator"},
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+
+    response = client.get(
+        "/api/users/my_profile", headers={"Authorization": f"Bearer {user_token}"}
+    )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    response = client.get(
+        "/api/users/my_profile", headers={"Authorization": f"Bearer {legacy_token}"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    new_token = login(client, confirmed_user_data["email"], confirmed_user_data["password"])
+    assert jwt.get_unverified_claims(new_token)["ver"] == 1
+    assert jwt.get_unverified_claims(new_token)["role"] == Roles.moderator.value
+
+    # another worker gets the same revocation from db
+    other_worker = TokenRevocationList("", purge_interval=3600)
+    async with TestingSessionLocal() as session:
+        await other_worker.load(session)
+    assert other_worker.is_revoked(user_token)
+    assert not other_worker.is_revoked(new_token)
@@ -0,0 +1,67 @@
+import time
+from unittest.mock import Mock
+
+from fastapi import status
+from jose import jwt
+
+from src.services.token_cache import VerifiedTokenCache, verified_tokens
+
+from conftest import test_user
+
+
+def test_token_is_decoded_once(client, monkeypatch):
+    response = client.post(
+        "/api/auth/login", data={"username": test_user["email"], "password": test_user["password"]}
+    )
+    headers = {"Authorization": f'Bearer {response.json()["access_token"]}'}
+    decode = Mock(wraps=jwt.decode)
+    monkeypatch.setattr("src.services.auth.jwt.decode", decode)
+    hits = verified_tokens.hits
+
+    for _ in range(3):
+        response = client.get("/api/users/my_profile", headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+
+    assert decode.call_count == 1
+    assert verified_tokens.hits == hits + 2
+
+    response = client.get("/api/cache/stats", headers=headers)
+    assert response.json()["tokens"]["hits"] >= 2
+
+
+def test_cached_token_is_checked_for_revocation(client):
+    response = client.post(
+        "/api/auth/login", data={"username": test_user["email"], "password": test_user["password"]}
+    )
+    headers = {"Authorization": f'Bearer {response.json()["access_token"]}'}
+    assert client.get("/api/users/my_profile", headers=headers).status_code == 200
+
+    client.get("/api/auth/logout", headers=headers)
+
+    response = client.get("/api/users/my_profile", headers=headers)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_payload_is_kept_until_expiration():
+    cache = VerifiedTokenCache(max_items=10)
+    cache.set("expired", {"sub": "user", "exp": time.time() - 1})
+    cache.set("valid", {"sub": "user", "exp": time.time() + 60})
+    cache.set("no_exp", {"sub": "user"})
+
+    assert cache.get("expired") is None
+    assert cache.get("valid")["sub"] == "user"
+    assert cache.get("no_exp") is None
+    assert cache.stats()["size"] == 1
+
+
+def test_least_recently_used_token_is_evicted():
+    cache = VerifiedTokenCache(max_items=2)
+    exp = time.time() + 60
+    cache.set("first", {"exp": exp})
+    cache.set("second", {"exp": exp})
+    cache.get("first")
+    cache.set("third", {"exp": exp})
+
+    assert cache.get("second") is None
+    assert cache.get("first") is not None
+    assert cache.get("third") is not None
@@ -0,0 +1,110 @@
+import pytest
+from fastapi import status
+from sqlalchemy import event
+
+from src.models.users import Roles
+from src.services.auth import auth_service
+from src.services.roles import RoleChecker
+from src.services.user_cache import user_cache
+
+from conftest import TestingSessionLocal, confirmed_user_data, engine, test_user
+
+
+class CountStatements:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(engine.sync_engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *args):
+        event.remove(engine.sync_engine, "before_cursor_execute", self)
+
+
+def test_warm_cache_resolves_user_without_queries(client, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    user_cache.clear()
+
+    with CountStatements() as statements:
+        response = client.get("/api/users/my_profile", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert statements.count == 1
+
+    with CountStatements() as statements:
+        response = client.get("/api/users/my_profile", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert statements.count == 0
+    assert response.json()["email"] == test_user["email"]
+    assert user_cache.stats()["hits"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_role_check_uses_user_of_request():
+    token = await auth_service.create_access_token(test_user["email"])
+    async with TestingSessionLocal() as session:
+        user = await auth_service.extract_token_data(token, session)
+        with CountStatements() as statements:
+            role = await RoleChecker([Roles.admin, Roles.moderator]).check_admin_or_moderator(
+                user.id, session
+            )
+    assert role == Roles.admin
+    assert statements.count == 0
+
+
+def test_update_by_admin_invalidates_cache(client, create_confirmed_user, get_token):
+    response = client.post(
+        "/api/auth/login",
+        data={"username": confirmed_user_data["email"], "password": confirmed_user_data["password"]},
+    )
+    headers = {"Authorization": f'Bearer {response.json()["access_token"]}'}
+    response = client.get("/api/users/my_profile", headers=headers)
+    assert response.json()["role"] == Roles.users.value
+
+    response = client.put(
+        f'/api/users/{confirmed_user_data["username"]}',
+        headers={"Authorization": f"Bearer {get_token}"},
+        params={"is_active": True, "role": "moderator"},
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+
+    # token with old role is revoked, new one has the new role
+    response = client.get("/api/users/my_profile", headers=headers)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    response = client.post(
+        "/api/auth/login",
+        data={"username": confirmed_user_data["email"], "password": confirmed_user_data["password"]},
+    )
+    headers = {"Authorization": f'Bearer {response.json()["access_token"]}'}
+    response = client.get("/api/users/my_profile", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["role"] == Roles.moderator.value
+
+
+def test_change_email_invalidates_cache(client):
+    response = client.post(
+        "/api/auth/login",
+        data={"username": confirmed_user_data["email"], "password": confirmed_user_data["password"]},
+    )
+    headers = {"Authorization": f'Bearer {response.json()["access_token"]}'}
+    assert client.get("/api/users/my_profile", headers=headers).status_code == 200
+
+    response = client.put(
+        "/api/users/my_profile/email",
+        headers=headers,
+        params={"email": "new_email@example.com", "confirm_password": confirmed_user_data["password"]},
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+
+    # token has old email, there is no user with it anymore
+    response = client.get("/api/users/my_profile", headers=headers)
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_cache_stats_include_users(client, get_token):
+    response = client.get("/api/cache/stats", headers={"Authorization": f"Bearer {get_token}"})
+    assert response.status_code == status.HTTP_200_OK
+    assert set(response.json()["users"]) == {"hits", "misses", "hit_rate", "size"}
@@ -0,0 +1,144 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, select
+
+from src.conf.config import config
+from src.models.jobs import JobModel, JobStatus
+from src.repositories.jobs import JobRepo
+from src.services.job_handlers import job_handlers
+from src.services.jobs import DESTROY_FILES, JobService, JobWorker
+
+from conftest import TestingSessionLocal, create_test_photo, test_user
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def empty_queue():
+    async with TestingSessionLocal() as session:
+        await session.execute(delete(JobModel))
+        await session.commit()
+
+
+async def enqueue(kind: str, payload: dict) -> int:
+    async with TestingSessionLocal() as session:
+        job = await JobService(session).enqueue(kind, payload)
+        return job.id
+
+
+async def get_job(job_id: int) -> JobModel | None:
+    async with TestingSessionLocal() as session:
+        result = await session.execute(select(JobModel).filter_by(id=job_id))
+        return result.scalar_one_or_none()
+
+
+def make_worker(handlers: dict, **kwargs) -> JobWorker:
+    return JobWorker(handlers, session=TestingSessionLocal, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_done_job_is_deleted():
+    done = []
+
+    async def handler(payload):
+        done.append(payload["value"])
+
+    job_id = await enqueue("test.done", {"value": 1})
+
+    assert await make_worker({"test.done": handler}).run_once() == 1
+    assert done == [1]
+    assert await get_job(job_id) is None
+
+
+@pytest.mark.asyncio
+async def test_failed_job_is_retried_later_then_dead(monkeypatch):
+    monkeypatch.setattr(config, "JOB_MAX_ATTEMPTS", 2)
+
+    async def handler(payload):
+        raise ConnectionError("smtp is not available")
+
+    job_id = await enqueue("test.failed", {})
+    worker = make_worker({"test.failed": handler})
+
+    assert await worker.run_once() == 1
+    job = await get_job(job_id)
+    assert job.status == JobStatus.pending
+    assert job.attempts == 1
+    assert job.last_error == "ConnectionError: smtp is not available"
+    assert job.run_at > job.created_at
+    # backoff - the job is not due yet
+    assert await worker.run_once() == 0
+
+    async with TestingSessionLocal() as session:
+        job = await session.get(JobModel, job_id)
+        job.run_at = job.created_at
+        await session.commit()
+
+    assert await worker.run_once() == 1
+    job = await get_job(job_id)
+    assert job.status == JobStatus.dead
+    assert job.attempts == 2
+
+    async with TestingSessionLocal() as session:
+        assert await JobRepo(session).retry_dead_jobs(kind="test.failed") == 1
+    job = await get_job(job_id)
+    assert job.status == JobStatus.pending
+    assert job.attempts == 0
+
+
+@pytest.mark.asyncio
+async def test_workers_dont_take_the_same_jobs():
+    done = []
+
+    async def handler(payload):
+        await asyncio.sleep(0.05)
+        done.append(payload["value"])
+
+    for value in range(6):
+        await enqueue("test.shared", {"value": value})
+    workers = [make_worker({"test.shared": handler}, batch_size=2) for _ in range(3)]
+
+    counts = await asyncio.gather(*(worker.run_once() for worker in workers))
+
+    assert counts == [2, 2, 2]
+    assert sorted(done) == list(range(6))
+
+
+@pytest.mark.asyncio
+async def test_job_of_crashed_worker_is_taken_again():
+    done = []
+
+    async def handler(payload):
+        done.append(payload["value"])
+
+    job_id = await enqueue("test.crashed", {"value": 1})
+    async with TestingSessionLocal() as session:
+        # worker took the job and stopped, lease is over at once
+        await JobRepo(session).lease_jobs("crashed", limit=10, lease_time=0)
+
+    assert await make_worker({"test.crashed": handler}).run_once() == 1
+    assert done == [1]
+    assert await get_job(job_id) is None
+
+
+@pytest.mark.asyncio
+async def test_unknown_kind_is_failed():
+    job_id = await enqueue("test.unknown", {})
+
+    assert await make_worker({}).run_once() == 1
+
+    job = await get_job(job_id)
+    assert job.status == JobStatus.pending
+    assert job.last_error == "LookupError: Unknown kind of job: test.unknown"
+
+
+@pytest.mark.asyncio
+async def test_file_used_by_new_photo_is_not_destroyed():
+    photo = await create_test_photo(test_user["username"])
+    storage = Mock(destroy_photos=AsyncMock(return_value=[]))
+    await enqueue(DESTROY_FILES, {"public_ids": [photo.public_id, "unused_public_id"]})
+
+    worker = JobWorker(job_handlers(storage, TestingSessionLocal), session=TestingSessionLocal)
+    assert await worker.run_once() == 1
+    storage.destroy_photos.assert_awaited_once_with(["unused_public_id"])
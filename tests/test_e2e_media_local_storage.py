@@ -0,0 +1,147 @@
+import asyncio
+import io
+
+import pytest
+from fastapi import status
+from PIL import Image
+
+from main import app
+from src.conf import messages
+from src.dependencies.storage import get_storage
+from src.services.storage import LocalStorage
+
+from tests.conftest import create_test_photo
+
+from conftest import TestingSessionLocal, run_jobs, test_user
+
+
+def make_image(size=(64, 64)):
+    img = Image.effect_noise(size, 100).convert("RGB")
+    img_io = io.BytesIO()
+    img.save(img_io, format="PNG")
+    img_io.seek(0)
+    return img_io
+
+
+@pytest.fixture()
+def local_storage(tmp_path):
+    storage = LocalStorage(tmp_path, "/api/media", TestingSessionLocal)
+    app.dependency_overrides[get_storage] = lambda: storage
+    yield storage
+    app.dependency_overrides.pop(get_storage)
+
+
+@pytest.fixture()
+def uploaded_photo(client, get_token, local_storage):
+    image = make_image().getvalue()
+    response = client.post(
+        "api/photos",
+        headers={"Authorization": f"Bearer {get_token}"},
+        params={"description": "local storage photo"},
+        files={"file": ("test_image.png", io.BytesIO(image), "image/png")},
+    )
+    assert response.status_code == status.HTTP_201_CREATED, response.text
+    return response.json(), image
+
+
+def test_upload_to_local_storage(client, uploaded_photo, local_storage):
+    photo, image = uploaded_photo
+
+    assert photo["image_url"].startswith("/api/media/")
+    public_id = photo["image_url"].removeprefix("/api/media/")
+    assert public_id.endswith(".png")
+    assert local_storage.get_file_path(public_id).read_bytes() == image
+
+    response = client.get(photo["image_url"])
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == image
+    assert response.headers["content-type"] == "image/png"
+    assert response.headers["accept-ranges"] == "bytes"
+    assert "immutable" in response.headers["cache-control"]
+    assert response.headers["etag"]
+
+
+def test_media_not_modified(client, uploaded_photo):
+    photo, _ = uploaded_photo
+    etag = client.get(photo["image_url"]).headers["etag"]
+
+    response = client.get(photo["image_url"], headers={"If-None-Match": etag})
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+
+
+@pytest.mark.parametrize(
+    "range_header, start, end",
+    [("bytes=0-9", 0, 9), ("bytes=10-", 10, None), ("bytes=-5", -5, None)],
+)
+def test_media_range(client, uploaded_photo, range_header, start, end):
+    photo, image = uploaded_photo
+    expected = image[start:] if end is None else image[start : end + 1]
+
+    response = client.get(photo["image_url"], headers={"Range": range_header})
+
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.content == expected
+    assert response.headers["content-range"].endswith(f"/{len(image)}")
+
+
+@pytest.mark.parametrize("range_header", ["bytes=100000000-", "bytes=5-1", "items=0-1"])
+def test_media_invalid_range(client, uploaded_photo, range_header):
+    photo, image = uploaded_photo
+
+    response = client.get(photo["image_url"], headers={"Range": range_header})
+
+    assert response.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+    assert response.headers["content-range"] == f"bytes */{len(image)}"
+    assert response.json()["detail"] == messages.INVALID_RANGE
+
+
+def test_media_not_found(client, local_storage):
+    for url in ["/api/media/ab/cd/missing.png", "/api/media/../../etc/passwd"]:
+        response = client.get(url)
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_media_doesnt_serve_tmp(client, local_storage):
+    # file which is being written is not served
+    (local_storage.root / "tmp").mkdir()
+    (local_storage.root / "tmp" / "upload").write_bytes(b"half of file")
+
+    response = client.get("/api/media/tmp/upload")
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_shared_file_is_kept(client, local_storage):
+    # photo of other user with the same content
+    photo = asyncio.run(create_test_photo(test_user["username"]))
+    shared = local_storage.root / photo.public_id
+    shared.write_bytes(b"shared photo")
+    unused = local_storage.root / "unused.png"
+    unused.write_bytes(b"unused photo")
+
+    assert asyncio.run(local_storage.destroy_photos([photo.public_id, "unused.png"])) == []
+    assert asyncio.run(local_storage.destroy_photo(photo.public_id)) == {"result": "ok"}
+
+    assert shared.exists()
+    assert not unused.exists()
+
+
+def test_delete_photo_from_local_storage(client, get_token, uploaded_photo, local_storage):
+    photo, _ = uploaded_photo
+    path = local_storage.get_file_path(photo["image_url"].removeprefix("/api/media/"))
+
+    response = client.delete(
+        f"api/photos/{photo['id']}",
+        headers={"Authorization": f"Bearer {get_token}"},
+    )
+
+    assert response.status_code == status.HTTP_204_NO_CONTENT, response.text
+    # file is deleted by job worker
+    assert path.exists()
+    assert asyncio.run(run_jobs(local_storage)) == 1
+    assert not path.exists()
+    assert client.get(photo["image_url"]).status_code == status.HTTP_404_NOT_FOUND
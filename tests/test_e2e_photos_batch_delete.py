@@ -0,0 +1,169 @@
+import asyncio
+from unittest.mock import Mock
+
+import pytest
+from fastapi import status
+from sqlalchemy import func, select
+
+from src.models.photos import (CommentModel, PhotoModel, RatingModel, TagModel,
+                               TransformedImageLinkModel, photos_tags)
+from src.models.users import Roles
+from src.services.auth import auth_service
+from src.services.storage import CloudinaryStorage
+
+from conftest import TestingSessionLocal, create_user_test, run_jobs
+
+
+@pytest.fixture(scope="module")
+def users():
+    async def create_users():
+        owner = await create_user_test("batch_owner", "batch_owner@example.com", "password")
+        other = await create_user_test("batch_other", "batch_other@example.com", "password")
+        moderator = await create_user_test(
+            "batch_moderator", "batch_moderator@example.com", "password", role=Roles.moderator
+        )
+        return owner, other, moderator
+
+    return asyncio.run(create_users())
+
+
+@pytest.fixture()
+def mock_destroy(monkeypatch):
+    mock_destroy = Mock(return_value={"deleted": {}})
+    monkeypatch.setattr("src.services.cloudinary.CloudinaryService.destroy_photos", mock_destroy)
+    return mock_destroy
+
+
+async def create_photo(user, public_id: str, with_relations: bool = False) -> int:
+    async with TestingSessionLocal() as session:
+        photo = PhotoModel(user_id=user.id, description="batch", image_url="url", public_id=public_id)
+        if with_relations:
+            photo.tags = [TagModel(name=f"tag_{public_id}")]
+            photo.comments = [CommentModel(content="comment", user_id=user.id)]
+            photo.ratings = [RatingModel(value=5, user_id=user.id)]
+            photo.transformed_images = [TransformedImageLinkModel(image_url="url")]
+        session.add(photo)
+        await session.commit()
+        return photo.id
+
+
+async def count_rows(table_or_model, **filters):
+    async with TestingSessionLocal() as session:
+        stmt = select(func.count()).select_from(table_or_model).filter_by(**filters)
+        return (await session.execute(stmt)).scalar()
+
+
+async def delete_batch(client, user, photo_ids):
+    token = await auth_service.create_access_token(user.email)
+    return client.request(
+        "DELETE",
+        "api/photos/batch",
+        headers={"Authorization": f"Bearer {token}"},
+        json={"photo_ids": photo_ids},
+    )
+
+
+def destroyed_ids(mock_destroy) -> list[str]:
+    return sorted(public_id for call in mock_destroy.call_args_list for public_id in call.args[0])
+
+
+@pytest.mark.asyncio
+async def test_owner_deletes_photos_with_related_rows(client, users, mock_destroy):
+    owner, other, _ = users
+    photo_ids = [await create_photo(owner, f"owner_{i}", with_relations=True) for i in range(3)]
+    other_photo_id = await create_photo(other, "other_0")
+
+    response = await delete_batch(client, owner, photo_ids + [other_photo_id, 999999, photo_ids[0]])
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json() == {
+        "deleted": photo_ids,
+        "not_found": [999999],
+        "forbidden": [other_photo_id],
+    }
+    assert await run_jobs() == 1
+    assert destroyed_ids(mock_destroy) == ["owner_0", "owner_1", "owner_2"]
+    for photo_id in photo_ids:
+        assert await count_rows(PhotoModel, id=photo_id) == 0
+        assert await count_rows(photos_tags, photo_id=photo_id) == 0
+        assert await count_rows(CommentModel, photo_id=photo_id) == 0
+        assert await count_rows(RatingModel, photo_id=photo_id) == 0
+        assert await count_rows(TransformedImageLinkModel, photo_id=photo_id) == 0
+    assert await count_rows(PhotoModel, id=other_photo_id) == 1
+
+
+@pytest.mark.asyncio
+async def test_files_are_destroyed_by_job(client, users, mock_destroy):
+    owner, _, _ = users
+    photo_ids = [await create_photo(owner, f"job_{i}") for i in range(3)]
+
+    response = await delete_batch(client, owner, photo_ids)
+
+    assert response.json()["deleted"] == photo_ids
+    # one job for all files of the request
+    mock_destroy.assert_not_called()
+    assert await run_jobs() == 1
+    assert destroyed_ids(mock_destroy) == ["job_0", "job_1", "job_2"]
+
+
+@pytest.mark.asyncio
+async def test_moderator_deletes_photos_of_any_user(client, users, mock_destroy):
+    owner, other, moderator = users
+    photo_ids = [await create_photo(owner, "moderated_0"), await create_photo(other, "moderated_1")]
+
+    response = await delete_batch(client, moderator, photo_ids)
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json() == {"deleted": photo_ids, "not_found": [], "forbidden": []}
+    assert await run_jobs() == 1
+    assert destroyed_ids(mock_destroy) == ["moderated_0", "moderated_1"]
+
+
+@pytest.mark.asyncio
+async def test_shared_file_is_kept_while_it_is_used(client, users, mock_destroy):
+    owner, other, _ = users
+    deleted_id = await create_photo(owner, "shared")
+    kept_id = await create_photo(other, "shared")
+
+    response = await delete_batch(client, owner, [deleted_id])
+
+    assert response.json()["deleted"] == [deleted_id]
+    assert await run_jobs() == 0
+    mock_destroy.assert_not_called()
+    assert await count_rows(PhotoModel, id=kept_id) == 1
+
+
+@pytest.mark.asyncio
+async def test_files_are_destroyed_in_chunks(mock_destroy):
+    public_ids = [f"chunked_{i}" for i in range(CloudinaryStorage.DESTROY_CHUNK_SIZE * 2 + 1)]
+
+    failed = await CloudinaryStorage().destroy_photos(public_ids)
+
+    assert failed == []
+    assert [len(call.args[0]) for call in mock_destroy.call_args_list] == [100, 100, 1]
+    assert destroyed_ids(mock_destroy) == sorted(public_ids)
+
+
+@pytest.mark.asyncio
+async def test_failed_chunk_is_reported(monkeypatch):
+    monkeypatch.setattr(
+        "src.services.cloudinary.CloudinaryService.destroy_photos",
+        Mock(side_effect=ConnectionError("storage is not available")),
+    )
+
+    assert await CloudinaryStorage().destroy_photos(["a", "b"]) == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_batch_delete_validation(client, users, mock_destroy):
+    owner, _, _ = users
+
+    response = await delete_batch(client, owner, [])
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    mock_destroy.assert_not_called()
+
+
+def test_batch_delete_not_authenticated(client):
+    response = client.request("DELETE", "api/photos/batch", json={"photo_ids": [1]})
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
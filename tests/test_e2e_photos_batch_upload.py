@@ -0,0 +1,159 @@
+import asyncio
+import io
+from itertools import count
+from unittest.mock import Mock
+
+import pytest
+from fastapi import status
+from PIL import Image
+from sqlalchemy import func, select
+
+from src.conf import messages
+from src.models.photos import PhotoModel, photos_tags
+
+from tests.conftest import create_test_photo
+
+from conftest import TestingSessionLocal, test_user
+
+# unique public_id for every upload in the module
+uploaded = count()
+
+
+def make_image(seed=0):
+    img = Image.new("RGB", (50, 50), (seed, seed, seed))
+    img_io = io.BytesIO()
+    img.save(img_io, format="PNG")
+    return img_io.getvalue()
+
+
+def upload_batch(client, token, files, **params):
+    return client.post(
+        "api/photos/batch",
+        headers={"Authorization": f"Bearer {token}"},
+        params=params,
+        files=[
+            ("files", (name, io.BytesIO(content), content_type))
+            for name, content, content_type in files
+        ],
+    )
+
+
+@pytest.fixture()
+def mock_upload(monkeypatch):
+    def upload_photo(file, user):
+        if file.filename.startswith("broken"):
+            raise ConnectionError("storage is not available")
+        return f"url_{file.filename}", f"public_id_{next(uploaded)}"
+
+    mock_upload = Mock(side_effect=upload_photo)
+    monkeypatch.setattr("src.services.cloudinary.CloudinaryService.upload_photo", mock_upload)
+    return mock_upload
+
+
+async def count_rows(table_or_model, **filters):
+    async with TestingSessionLocal() as session:
+        stmt = select(func.count()).select_from(table_or_model).filter_by(**filters)
+        return (await session.execute(stmt)).scalar()
+
+
+@pytest.mark.asyncio
+async def test_batch_upload_with_partial_failures(client, get_token, mock_upload):
+    response = upload_batch(
+        client,
+        get_token,
+        [
+            ("first.png", make_image(seed=1), "image/png"),
+            ("not_image.txt", b"just text", "text/plain"),
+            ("second.png", make_image(seed=2), "image/png"),
+            ("broken.png", make_image(seed=3), "image/png"),
+        ],
+        description="batch photo",
+        tags="batch,import",
+    )
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    results = response.json()
+    assert [result["filename"] for result in results] == [
+        "first.png", "not_image.txt", "second.png", "broken.png"
+    ]
+    assert [result["status_code"] for result in results] == [201, 400, 201, 502]
+    assert results[1]["detail"] == messages.INVALID_FILE_NOT_IMAGE
+    assert results[3]["detail"] == messages.UPLOAD_FAILED
+    assert results[1]["photo"] is None
+    assert results[0]["photo"]["image_url"] == "url_first.png"
+    assert results[2]["photo"]["description"] == "batch photo"
+    assert mock_upload.call_count == 3
+
+    for result in (results[0], results[2]):
+        assert await count_rows(PhotoModel, id=result["photo"]["id"]) == 1
+        assert await count_rows(photos_tags, photo_id=result["photo"]["id"]) == 2
+
+
+def test_batch_upload_doesnt_upload_same_content_twice(client, get_token, mock_upload):
+    image = make_image(seed=10)
+    response = upload_batch(
+        client,
+        get_token,
+        [("a.png", image, "image/png"), ("b.png", image, "image/png")],
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+    first, second = response.json()
+    assert mock_upload.call_count == 1
+    assert first["photo"]["public_id"] == second["photo"]["public_id"]
+    assert first["photo"]["id"] != second["photo"]["id"]
+
+    # file which was uploaded before
+    response = upload_batch(client, get_token, [("c.png", image, "image/png")])
+    assert mock_upload.call_count == 1
+    assert response.json()[0]["photo"]["public_id"] == first["photo"]["public_id"]
+
+
+def test_batch_upload_too_many_files(client, get_token, mock_upload):
+    image = make_image(seed=20)
+    response = upload_batch(
+        client, get_token, [(f"{i}.png", image, "image/png") for i in range(51)]
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Too many files. Maximum 50 files allowed"
+    mock_upload.assert_not_called()
+
+
+def test_batch_upload_rollback_keeps_shared_files(client, get_token, monkeypatch):
+    # the same content is already stored for a photo of other user
+    asyncio.run(create_test_photo(test_user["username"]))
+    public_ids = {"shared.png": "test_public_id", "new.png": f"public_id_{next(uploaded)}"}
+    monkeypatch.setattr(
+        "src.services.cloudinary.CloudinaryService.upload_photo",
+        lambda self, file, user: (f"url_{file.filename}", public_ids[file.filename]),
+    )
+    mock_destroy = Mock(return_value={"deleted": {}})
+    monkeypatch.setattr("src.services.cloudinary.CloudinaryService.destroy_photos", mock_destroy)
+
+    async def add_photos(self, user, photos, tags=None):
+        raise RuntimeError("database is not available")
+
+    monkeypatch.setattr("src.repositories.photos.PhotoRepo.add_photos", add_photos)
+
+    with pytest.raises(RuntimeError):
+        upload_batch(
+            client,
+            get_token,
+            [("shared.png", make_image(seed=40), "image/png"), ("new.png", make_image(seed=41), "image/png")],
+        )
+    mock_destroy.assert_called_once_with([public_ids["new.png"]])
+
+
+def test_batch_upload_wrong_tags(client, get_token, mock_upload):
+    response = upload_batch(
+        client, get_token, [("a.png", make_image(seed=30), "image/png")], tags="a,b,c,d,e,f"
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == messages.TOO_MANY_TAGS
+    mock_upload.assert_not_called()
+
+
+def test_batch_upload_not_authenticated(client):
+    response = client.post(
+        "api/photos/batch", files=[("files", ("a.png", io.BytesIO(make_image()), "image/png"))]
+    )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+from fastapi import status
+from sqlalchemy import delete
+
+from src.models.photos import PhotoModel
+from tests.conftest import create_test_photo, create_transform_photo
+
+from conftest import TestingSessionLocal, test_user
+
+
+@pytest.fixture()
+def photo_id():
+    return asyncio.run(create_test_photo(test_user["username"])).id
+
+
+async def delete_photo(photo_id):
+    async with TestingSessionLocal() as session:
+        await session.execute(delete(PhotoModel).filter_by(id=photo_id))
+        await session.commit()
+
+
+def test_photo_page_not_modified(client, get_token, photo_id):
+    response = client.get(f"api/photos/{photo_id}")
+    assert response.status_code == status.HTTP_200_OK, response.text
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+    assert response.headers["cache-control"] == "no-cache"
+
+    response = client.get(f"api/photos/{photo_id}", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    # new comment is a new version of photo page
+    headers = {"Authorization": f"Bearer {get_token}"}
+    response = client.post(f"api/photos/{photo_id}", headers=headers, json={"content": "comment"})
+    assert response.status_code == status.HTTP_201_CREATED, response.text
+    comment_id = response.json()["id"]
+    response = client.get(f"api/photos/{photo_id}", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["comments"][0]["content"] == "comment"
+    with_comment = response.headers["etag"]
+    assert with_comment != etag
+
+    # deleted comment doesn't change timestamps, but changes count
+    response = client.delete(
+        f"api/photos/{photo_id}", headers=headers, params={"select": "comment", "object_id": comment_id}
+    )
+    assert response.status_code == status.HTTP_204_NO_CONTENT, response.text
+    response = client.get(f"api/photos/{photo_id}", headers={"If-None-Match": with_comment})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["comments"] == []
+
+
+def test_photo_page_without_last_modified(client, photo_id):
+    # deletions don't move timestamps, so only ETag is a validator
+    response = client.get(f"api/photos/{photo_id}")
+    assert "last-modified" not in response.headers
+
+    response = client.get(
+        f"api/photos/{photo_id}", headers={"If-Modified-Since": "Mon, 01 Jan 2035 00:00:00 GMT"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_photo_page_not_found(client):
+    response = client.get("api/photos/999999", headers={"If-None-Match": "*"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_feed_not_modified(client, photo_id):
+    response = client.get("api/photos/", params={"limit": 4})
+    assert response.status_code == status.HTTP_200_OK, response.text
+    etag = response.headers["etag"]
+    next_cursor = response.headers.get("x-next-cursor")
+
+    response = client.get("api/photos/", params={"limit": 4}, headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers.get("x-next-cursor") == next_cursor
+
+    # new photo is on the first page
+    new_photo_id = asyncio.run(create_test_photo(test_user["username"])).id
+    response = client.get("api/photos/", params={"limit": 4}, headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()[0]["id"] == new_photo_id
+    assert response.headers["etag"] != etag
+
+    # deleted photo: the older one moves into the page
+    asyncio.run(delete_photo(new_photo_id))
+    response = client.get(
+        "api/photos/", params={"limit": 4}, headers={"If-None-Match": response.headers["etag"]}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["etag"] == etag
+
+
+def test_feed_invalid_cursor_is_checked_first(client):
+    response = client.get("api/photos/", params={"cursor": "broken"}, headers={"If-None-Match": "*"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_transformed_photos_not_modified(client, photo_id):
+    response = client.get(f"api/photos/{photo_id}/transform")
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json() == []
+    etag = response.headers["etag"]
+
+    response = client.get(f"api/photos/{photo_id}/transform", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    asyncio.run(create_transform_photo(photo_id))
+    response = client.get(f"api/photos/{photo_id}/transform", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 1
@@ -0,0 +1,91 @@
+import asyncio
+import io
+from itertools import count
+from unittest.mock import Mock
+
+import pytest
+from fastapi import status
+from PIL import Image
+
+from src.services.auth import auth_service
+from tests.conftest import confirmed_user_data
+
+from conftest import run_jobs
+
+# unique public_id for every upload in the module
+uploaded = count()
+
+
+def make_image(seed=0):
+    img = Image.new("RGB", (50, 50), (seed, seed, seed))
+    img_io = io.BytesIO()
+    img.save(img_io, format="PNG")
+    return img_io.getvalue()
+
+
+def upload(client, token, image):
+    response = client.post(
+        "api/photos",
+        headers={"Authorization": f"Bearer {token}"},
+        params={"description": "dedup photo"},
+        files={"file": ("test_image.png", io.BytesIO(image), "image/png")},
+    )
+    assert response.status_code == status.HTTP_201_CREATED, response.text
+    return response.json()
+
+
+@pytest.fixture()
+def mock_upload(monkeypatch):
+    mock_upload = Mock(side_effect=lambda file, user: ("url", f"public_id_{next(uploaded)}"))
+    monkeypatch.setattr("src.services.cloudinary.CloudinaryService.upload_photo", mock_upload)
+    return mock_upload
+
+
+@pytest.fixture()
+def mock_destroy(monkeypatch):
+    mock_destroy = Mock(return_value={"deleted": {}})
+    monkeypatch.setattr("src.services.cloudinary.CloudinaryService.destroy_photos", mock_destroy)
+    return mock_destroy
+
+
+def test_upload_same_photo_twice(client, get_token, mock_upload):
+    image = make_image(seed=1)
+
+    first = upload(client, get_token, image)
+    second = upload(client, get_token, image)
+
+    assert mock_upload.call_count == 1
+    assert first["id"] != second["id"]
+    assert first["public_id"] == second["public_id"]
+
+    upload(client, get_token, make_image(seed=2))
+    assert mock_upload.call_count == 2
+
+
+def test_same_photo_of_other_user_is_uploaded(client, get_token, mock_upload, create_confirmed_user):
+    image = make_image(seed=3)
+    other_token = asyncio.run(auth_service.create_access_token(confirmed_user_data["email"]))
+
+    upload(client, get_token, image)
+    upload(client, other_token, image)
+
+    assert mock_upload.call_count == 2
+
+
+def test_delete_shared_photo(client, get_token, mock_upload, mock_destroy):
+    image = make_image(seed=4)
+    first = upload(client, get_token, image)
+    second = upload(client, get_token, image)
+    headers = {"Authorization": f"Bearer {get_token}"}
+
+    response = client.delete(f"api/photos/{first['id']}", headers=headers)
+
+    assert response.status_code == status.HTTP_204_NO_CONTENT, response.text
+    assert asyncio.run(run_jobs()) == 0
+    mock_destroy.assert_not_called()
+
+    response = client.delete(f"api/photos/{second['id']}", headers=headers)
+
+    assert response.status_code == status.HTTP_204_NO_CONTENT, response.text
+    asyncio.run(run_jobs())
+    mock_destroy.assert_called_once()
@@ -0,0 +1,88 @@
+from unittest.mock import Mock
+
+import pytest
+from fastapi import status
+from sqlalchemy import inspect, select
+
+from src.models.photos import PhotoModel, TagModel, photos_tags
+from src.repositories.tags import TagRepo
+from src.services.photos import PhotoService
+from tests.conftest import (
+    TestingSessionLocal,
+    create_test_comment,
+    create_test_photo,
+    create_transform_test_photo,
+)
+
+from conftest import test_user
+
+
+@pytest.mark.asyncio
+async def test_photo_exists_profile_loads_only_id():
+    photo = await create_test_photo(test_user["username"])
+    await create_test_comment(photo.id, test_user["username"])
+
+    async with TestingSessionLocal() as session:
+        exists_photo = await PhotoService(session).get_photo_exists(photo.id)
+        unloaded = inspect(exists_photo).unloaded
+
+    assert exists_photo.id == photo.id
+    assert "description" in unloaded
+    assert "comments" in unloaded
+
+
+@pytest.mark.asyncio
+async def test_photo_owner_check_profile_loads_no_collections():
+    photo = await create_test_photo(test_user["username"])
+
+    async with TestingSessionLocal() as session:
+        owner_photo = await PhotoService(session).get_photo_exists(photo.id, profile="owner_check")
+        unloaded = inspect(owner_photo).unloaded
+
+    assert owner_photo.user_id == photo.user_id
+    assert owner_photo.public_id == photo.public_id
+    assert {"transformed_images", "comments", "ratings", "tags"} <= unloaded
+
+
+@pytest.mark.asyncio
+async def test_photo_full_profile_loads_collections():
+    photo = await create_test_photo(test_user["username"])
+    await create_test_comment(photo.id, test_user["username"])
+    await create_transform_test_photo(photo.id)
+
+    async with TestingSessionLocal() as session:
+        full_photo = await PhotoService(session).get_photo_exists(photo.id, profile="full")
+
+    assert len(full_photo.comments) == 1
+    assert len(full_photo.transformed_images) == 1
+    assert full_photo.ratings == []
+    assert full_photo.tags == []
+
+
+@pytest.mark.asyncio
+async def test_delete_photo_with_children(client, get_token, monkeypatch):
+    monkeypatch.setattr(
+        "src.services.cloudinary.CloudinaryService.destroy_photo",
+        Mock(return_value={"result": "ok"}),
+    )
+    photo = await create_test_photo(test_user["username"])
+    await create_test_comment(photo.id, test_user["username"])
+    await create_transform_test_photo(photo.id)
+    async with TestingSessionLocal() as session:
+        await TagRepo(session).add_tags_to_photo(photo.id, ["profile_tag"])
+
+    response = client.delete(
+        f"api/photos/{photo.id}", headers={"Authorization": f"Bearer {get_token}"}
+    )
+
+    assert response.status_code == status.HTTP_204_NO_CONTENT, response.text
+    async with TestingSessionLocal() as session:
+        result = await session.execute(select(PhotoModel).filter_by(id=photo.id))
+        assert result.scalar_one_or_none() is None
+        result = await session.execute(
+            select(photos_tags).filter(photos_tags.c.photo_id == photo.id)
+        )
+        assert result.first() is None
+        # tag itself is not deleted with photo
+        result = await session.execute(select(TagModel).filter_by(name="profile_tag"))
+        assert result.scalar_one_or_none() is not None
@@ -0,0 +1,186 @@
+import asyncio
+import io
+
+import pytest
+from fastapi import status
+from PIL import Image
+
+from main import app
+from src.dependencies.storage import get_storage
+from src.services.storage import LocalStorage
+from src.services.transform import DerivativeCache, TransformService
+
+from conftest import TestingSessionLocal
+
+
+def make_image(size=(300, 200)):
+    img = Image.effect_noise(size, 100).convert("RGB")
+    img_io = io.BytesIO()
+    img.save(img_io, format="JPEG")
+    img_io.seek(0)
+    return img_io
+
+
+@pytest.fixture()
+def local_storage(tmp_path):
+    storage = LocalStorage(tmp_path / "media", "/api/media", TestingSessionLocal)
+    app.dependency_overrides[get_storage] = lambda: storage
+    yield storage
+    app.dependency_overrides.pop(get_storage)
+
+
+@pytest.fixture()
+def cache(tmp_path, monkeypatch):
+    cache = DerivativeCache(tmp_path / "cache", max_bytes=10 * 1024 * 1024)
+    monkeypatch.setattr("src.routers.photos.derivative_cache", cache)
+    return cache
+
+
+@pytest.fixture()
+def photo_id(client, get_token, local_storage):
+    response = client.post(
+        "api/photos",
+        headers={"Authorization": f"Bearer {get_token}"},
+        params={"description": "local transform photo"},
+        files={"file": ("test_image.jpg", make_image(), "image/jpeg")},
+    )
+    assert response.status_code == status.HTTP_201_CREATED, response.text
+    return response.json()["id"]
+
+
+def create_transformation(client, token, photo_id, **params):
+    response = client.post(
+        f"api/photos/{photo_id}/transform",
+        headers={"Authorization": f"Bearer {token}"},
+        json=params,
+    )
+    assert response.status_code == status.HTTP_201_CREATED, response.text
+    return response.json()["transformed_photo_url"]
+
+
+def test_canonical_transform():
+    request = {
+        "width": 100, "height": 50, "radius": 10, "angle": -90,
+        "zoom_on_face": True, "rotate_photo": True, "crop_photo": True,
+        "apply_max_radius": False, "apply_radius": True, "apply_grayscale": True,
+    }
+
+    assert (
+        TransformService.canonical_transform(request)
+        == "g_face/a_270/c_crop,h_50,w_100/r_10/e_grayscale"
+    )
+    with pytest.raises(ValueError):
+        TransformService.canonical_transform({**request, "width": 0})
+    with pytest.raises(ValueError):
+        TransformService.parse_transform("e_sepia")
+
+
+def test_get_local_transformation(client, get_token, photo_id, cache):
+    url = create_transformation(
+        client, get_token, photo_id,
+        crop_photo=True, width=100, height=50, apply_grayscale=True,
+    )
+    assert url == f"/api/photos/{photo_id}/transform?select=image&t=c_crop,h_50,w_100/e_grayscale"
+
+    response = client.get(url)
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.headers["content-type"] == "image/jpeg"
+    img = Image.open(io.BytesIO(response.content))
+    assert img.size == (100, 50)
+    assert img.mode == "L"
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    # second request is served from disk cache
+    assert client.get(url).content == response.content
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_get_local_transformation_with_radius(client, get_token, photo_id, cache):
+    url = create_transformation(
+        client, get_token, photo_id, rotate_photo=True, angle=90, apply_max_radius=True
+    )
+
+    response = client.get(url)
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    img = Image.open(io.BytesIO(response.content))
+    assert img.format == "PNG"
+    assert img.size == (200, 300)
+    # corner is transparent
+    assert img.getpixel((0, 0))[3] == 0
+
+
+def test_derivative_cache_eviction(client, get_token, photo_id, cache):
+    first = create_transformation(client, get_token, photo_id, apply_grayscale=True)
+    second = create_transformation(client, get_token, photo_id, crop_photo=True)
+    client.get(first)
+    cache.max_bytes = 1
+
+    client.get(second)
+
+    assert len(cache._index) == 1
+    assert len(list(cache.root.glob("*/*"))) == 1
+    client.get(first)
+    assert (cache.hits, cache.misses) == (0, 3)
+
+
+def test_get_unknown_local_transformation(client, photo_id, cache):
+    response = client.get(
+        f"/api/photos/{photo_id}/transform",
+        params={"select": "image", "t": "c_crop,h_10,w_10"},
+    )
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND, response.text
+    assert cache.misses == 0
+
+
+@pytest.mark.asyncio
+async def test_waiting_request_gets_result_when_first_is_cancelled(tmp_path, monkeypatch):
+    cache = DerivativeCache(tmp_path / "cache", max_bytes=10 * 1024 * 1024)
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def render(path, canonical, source_path):
+        started.set()
+        await release.wait()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"image")
+        cache._index[path] = 5
+
+    monkeypatch.setattr(cache, "render", render)
+    first = asyncio.create_task(cache.get_or_create("photo.jpg", "e_grayscale", tmp_path))
+    await started.wait()
+    second = asyncio.create_task(cache.get_or_create("photo.jpg", "e_grayscale", tmp_path))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    release.set()
+    path = await asyncio.wait_for(second, timeout=5)
+
+    assert first.cancelled()
+    assert path.read_bytes() == b"image"
+    assert cache._rendering == {}
+
+
+@pytest.mark.asyncio
+async def test_file_rendered_by_other_worker_is_reused(tmp_path, monkeypatch):
+    # two worker processes share cache directory
+    first = DerivativeCache(tmp_path / "cache", max_bytes=10 * 1024 * 1024)
+    second = DerivativeCache(tmp_path / "cache", max_bytes=10 * 1024 * 1024)
+    await second.load_index()
+
+    async def render(path, canonical, source_path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"image")
+
+    async def render_again(path, canonical, source_path):
+        raise AssertionError("rendered again")
+
+    monkeypatch.setattr(first, "render", render)
+    monkeypatch.setattr(second, "render", render_again)
+    path = await first.get_or_create("photo.jpg", "e_grayscale", tmp_path)
+
+    assert await second.get_or_create("photo.jpg", "e_grayscale", tmp_path) == path
+    assert (second.hits, second.misses) == (1, 0)
+    assert second._index == {path: 5}
+    assert second._size == 5
@@ -0,0 +1,163 @@
+import asyncio
+
+import pytest
+from fastapi import status
+
+from src.services.auth import auth_service
+from src.services.cache import MemoryPageCache, photo_page_cache
+from tests.conftest import confirmed_user_data, create_test_photo
+
+from conftest import test_user
+
+
+@pytest.fixture()
+def photo_id():
+    return asyncio.run(create_test_photo(test_user["username"])).id
+
+
+def get_page(client, photo_id, **params):
+    response = client.get(f"api/photos/{photo_id}", params=params)
+    assert response.status_code == status.HTTP_200_OK, response.text
+    return response.json()
+
+
+def test_photo_page_is_cached(client, photo_id):
+    hits, misses = photo_page_cache.hits, photo_page_cache.misses
+
+    first = get_page(client, photo_id)
+    second = get_page(client, photo_id)
+    get_page(client, photo_id, skip=1)
+
+    assert first == second
+    assert photo_page_cache.hits - hits == 1
+    assert photo_page_cache.misses - misses == 2
+
+
+def test_cache_invalidated_by_comments(client, get_token, photo_id):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    get_page(client, photo_id)
+    get_page(client, photo_id, limit=1)
+
+    response = client.post(f"api/photos/{photo_id}", headers=headers, json={"content": "first comment"})
+    assert response.status_code == status.HTTP_201_CREATED, response.text
+    comment_id = response.json()["id"]
+    assert [c["content"] for c in get_page(client, photo_id)["comments"]] == ["first comment"]
+    assert len(get_page(client, photo_id, limit=1)["comments"]) == 1
+
+    response = client.put(
+        f"api/photos/{photo_id}",
+        headers=headers,
+        params={"content": "edited comment", "select": "comment", "object_id": comment_id},
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert [c["content"] for c in get_page(client, photo_id)["comments"]] == ["edited comment"]
+
+    response = client.delete(
+        f"api/photos/{photo_id}",
+        headers=headers,
+        params={"select": "comment", "object_id": comment_id},
+    )
+    assert response.status_code == status.HTTP_204_NO_CONTENT, response.text
+    assert get_page(client, photo_id)["comments"] == []
+
+
+def test_cache_invalidated_by_description_and_delete(client, get_token, photo_id, monkeypatch):
+    monkeypatch.setattr(
+        "src.services.cloudinary.CloudinaryService.destroy_photo",
+        lambda self, public_id: {"result": "ok"},
+    )
+    headers = {"Authorization": f"Bearer {get_token}"}
+    get_page(client, photo_id)
+
+    response = client.put(f"api/photos/{photo_id}", headers=headers, params={"content": "new description"})
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert get_page(client, photo_id)["description"] == "new description"
+
+    response = client.delete(f"api/photos/{photo_id}", headers=headers)
+    assert response.status_code == status.HTTP_204_NO_CONTENT, response.text
+    assert client.get(f"api/photos/{photo_id}").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_cache_invalidated_by_rates(client, get_token, photo_id, create_confirmed_user):
+    other_token = asyncio.run(auth_service.create_access_token(confirmed_user_data["email"]))
+    get_page(client, photo_id)
+
+    response = client.post(
+        f"api/photos/{photo_id}/set-rate",
+        headers={"Authorization": f"Bearer {other_token}"},
+        json={"value": 4},
+    )
+    assert response.status_code == status.HTTP_201_CREATED, response.text
+    assert get_page(client, photo_id)["avg_rating"] == 4
+
+    response = client.delete(
+        f"api/photos/{photo_id}/rating/{confirmed_user_data['username']}",
+        headers={"Authorization": f"Bearer {get_token}"},
+    )
+    assert response.status_code == status.HTTP_204_NO_CONTENT, response.text
+    assert get_page(client, photo_id)["avg_rating"] is None
+
+
+def test_cache_stats(client, get_token):
+    response = client.get("api/cache/stats", headers={"Authorization": f"Bearer {get_token}"})
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert set(response.json()["photo_page"]) == {"hits", "misses", "hit_rate", "size"}
+    assert set(response.json()["photo_reads"]) == {"executed", "shared"}
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_lru_and_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("src.services.cache.time.monotonic", lambda: now[0])
+    cache = MemoryPageCache(max_items=2, ttl=10)
+
+    await cache.set(1, 0, 20, {"id": 1})
+    await cache.set(2, 0, 20, {"id": 2})
+    assert await cache.get(1, 0, 20) == {"id": 1}
+    # photo 2 is least recently used
+    await cache.set(3, 0, 20, {"id": 3})
+    assert await cache.get(2, 0, 20) is None
+    assert await cache.get(3, 0, 20) == {"id": 3}
+
+    now[0] += 11
+    assert await cache.get(1, 0, 20) is None
+    assert cache.stats() == {"hits": 2, "misses": 2, "hit_rate": 0.5, "size": 1}
+
+    await cache.set(3, 5, 20, {"id": 3})
+    await cache.invalidate(3)
+    assert cache.stats()["size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_skips_page_of_old_generation():
+    cache = MemoryPageCache(max_items=2, ttl=10)
+    # reader takes generation, then writer changes photo before the page is saved
+    generation = await cache.get_generation(1)
+    await cache.invalidate(1)
+    await cache.set(1, 0, 20, {"id": 1, "description": "old"}, generation)
+    assert await cache.get(1, 0, 20) is None
+
+    await cache.set(1, 0, 20, {"id": 1, "description": "new"}, await cache.get_generation(1))
+    assert await cache.get(1, 0, 20) == {"id": 1, "description": "new"}
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_generations_are_bounded():
+    cache = MemoryPageCache(max_items=2, ttl=10)
+    generation = await cache.get_generation(1)
+    for photo_id in range(1, 6):
+        await cache.invalidate(photo_id)
+    assert len(cache._invalidated) == 2
+
+    # invalidation of photo 1 is forgotten, but old reader is still rejected
+    await cache.set(1, 0, 20, {"id": 1}, generation)
+    assert await cache.get(1, 0, 20) is None
+    await cache.set(1, 0, 20, {"id": 1}, await cache.get_generation(1))
+    assert await cache.get(1, 0, 20) == {"id": 1}
+
+    # pages which were read before clear are not saved
+    generation = await cache.get_generation(1)
+    await cache.clear()
+    await cache.set(1, 0, 20, {"id": 1}, generation)
+    assert await cache.get(1, 0, 20) is None
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+from fastapi import status
+
+from src.services.qr import QRCodeCache, QRCodeService, qr_code_cache
+
+from conftest import create_test_photo, create_transform_photo, test_user
+
+
+@pytest.fixture(scope="module")
+def transform_photo(client):
+    async def create():
+        photo = await create_test_photo(test_user["username"])
+        return await create_transform_photo(photo.id)
+
+    return asyncio.run(create())
+
+
+def get_qr_code(client, transform_photo, headers=None, **params):
+    return client.get(
+        f"api/photos/{transform_photo.photo_id}/transform/qrcode",
+        params={"object_id": transform_photo.id, **params},
+        headers=headers or {},
+    )
+
+
+def test_qr_code_is_cached_with_etag(client, transform_photo):
+    hits = qr_code_cache.hits
+
+    response = get_qr_code(client, transform_photo)
+
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.headers["content-type"] == "image/png"
+    assert response.content.startswith(b"\x89PNG")
+    etag = response.headers["etag"]
+    assert etag.startswith('"') and not etag.startswith("W/")
+
+    response = get_qr_code(client, transform_photo, headers={"If-None-Match": etag})
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert qr_code_cache.hits == hits + 1
+
+
+def test_qr_code_svg_by_accept_header(client, transform_photo):
+    png = get_qr_code(client, transform_photo)
+
+    response = get_qr_code(
+        client, transform_photo, headers={"Accept": "image/png;q=0.5, image/svg+xml"}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "image/svg+xml"
+    assert b"<svg" in response.content
+    assert response.headers["vary"] == "Accept"
+    assert response.headers["etag"] != png.headers["etag"]
+    assert get_qr_code(client, transform_photo, format="svg").content == response.content
+
+
+def test_qr_code_doesnt_depend_on_host_header(client, transform_photo):
+    response = get_qr_code(client, transform_photo)
+    misses = qr_code_cache.misses
+
+    other_host = get_qr_code(client, transform_photo, headers={"Host": "attacker.example"})
+
+    assert other_host.status_code == status.HTTP_200_OK
+    assert other_host.content == response.content
+    assert qr_code_cache.misses == misses
+
+
+def test_qr_code_of_unknown_transformation(client, transform_photo):
+    response = client.get(
+        f"api/photos/{transform_photo.photo_id}/transform/qrcode", params={"object_id": 999}
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.parametrize(
+    "accept, image_format",
+    [
+        (None, "png"),
+        ("*/*", "png"),
+        ("image/svg+xml", "svg"),
+        ("image/*;q=0.8, image/svg+xml;q=0.9", "svg"),
+        ("image/svg+xml;q=0.1, image/png", "png"),
+    ],
+)
+def test_choose_format(accept, image_format):
+    assert QRCodeService.choose_format(accept) == image_format
+
+
+@pytest.mark.asyncio
+async def test_qr_codes_are_kept_on_disk(tmp_path, monkeypatch):
+    image = await QRCodeCache(max_items=10, root=tmp_path).get_or_create("http://test/1", "svg")
+
+    monkeypatch.setattr(
+        QRCodeService, "generate_qr_code", staticmethod(lambda *args: pytest.fail("generated again"))
+    )
+    # other worker or after restart
+    other_cache = QRCodeCache(max_items=10, root=tmp_path)
+
+    assert await other_cache.get_or_create("http://test/1", "svg") == image
+    assert other_cache.stats()["size"] == 1
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_qr_code_is_evicted():
+    cache = QRCodeCache(max_items=2)
+    for url in ("http://test/1", "http://test/2", "http://test/1", "http://test/3"):
+        await cache.get_or_create(url)
+
+    await cache.get_or_create("http://test/1")
+
+    assert cache.stats() == {"hits": 2, "misses": 3, "hit_rate": 0.4, "size": 2}
@@ -0,0 +1,83 @@
+import pytest
+from fastapi import status
+from sqlalchemy import update
+
+from src.models.photos import PhotoModel
+from src.models.users import Roles
+from src.repositories.rating import RatingRepo
+from src.services.auth import auth_service
+from tests.conftest import TestingSessionLocal, create_test_photo, create_user_test
+
+from conftest import test_user
+
+
+async def rate_photo(client, photo_id: int, username: str, value: int):
+    user = await create_user_test(
+        username=username,
+        email=f"{username}@example.com",
+        password="password",
+        role=Roles.users,
+    )
+    token = await auth_service.create_access_token(user.email)
+    response = client.post(
+        f"api/photos/{photo_id}/set-rate",
+        headers={"Authorization": f"Bearer {token}"},
+        json={"value": value},
+    )
+    assert response.status_code == status.HTTP_201_CREATED, response.text
+
+
+@pytest.mark.asyncio
+async def test_rating_aggregates_on_set_and_delete_rate(client, get_token):
+    photo = await create_test_photo(test_user["username"])
+
+    response = client.get(f"api/photos/{photo.id}")
+    assert response.json()["avg_rating"] is None
+    assert response.json()["rating_histogram"] == [0, 0, 0, 0, 0]
+
+    await rate_photo(client, photo.id, "rater_one", 5)
+    await rate_photo(client, photo.id, "rater_two", 2)
+
+    response = client.get(f"api/photos/{photo.id}")
+    data = response.json()
+    assert data["avg_rating"] == 3.5
+    assert data["rating_histogram"] == [0, 1, 0, 0, 1]
+
+    response = client.delete(
+        f"api/photos/{photo.id}/rating/rater_two",
+        headers={"Authorization": f"Bearer {get_token}"},
+    )
+    assert response.status_code == status.HTTP_204_NO_CONTENT, response.text
+
+    response = client.get(f"api/photos/{photo.id}")
+    data = response.json()
+    assert data["avg_rating"] == 5
+    assert data["rating_histogram"] == [0, 0, 0, 0, 1]
+
+    response = client.get("api/photos", params={"limit": 4})
+    feed_photo = next(item for item in response.json() if item["id"] == photo.id)
+    assert feed_photo["avg_rating"] == 5
+
+
+@pytest.mark.asyncio
+async def test_rebuild_rating_aggregates(client):
+    photo = await create_test_photo(test_user["username"])
+    await rate_photo(client, photo.id, "rater_three", 4)
+
+    # break aggregates
+    async with TestingSessionLocal() as session:
+        await session.execute(
+            update(PhotoModel)
+            .filter_by(id=photo.id)
+            .values(rating_count=10, rating_sum=1, rating_histogram=[1, 2, 3, 4, 5])
+        )
+        await session.commit()
+
+    async with TestingSessionLocal() as session:
+        count = await RatingRepo(session).rebuild_rating_aggregates()
+        assert count >= 1
+
+    response = client.get(f"api/photos/{photo.id}")
+    data = response.json()
+    assert data["avg_rating"] == 4
+    assert data["rating_histogram"] == [0, 0, 0, 1, 0]
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from fastapi import status
+
+from src.conf import messages
+from src.repositories.tags import TagRepo
+from tests.conftest import TestingSessionLocal, create_test_photo
+
+from conftest import test_user
+
+
+async def create_photo_with_tags(tags: list[str]) -> int:
+    photo = await create_test_photo(test_user["username"])
+    async with TestingSessionLocal() as session:
+        await TagRepo(session).add_tags_to_photo(photo.id, tags)
+    return photo.id
+
+
+@pytest.fixture(scope="module")
+def tagged_photos():
+    async def _create():
+        return {
+            "cat": await create_photo_with_tags(["search_cat"]),
+            "dog": await create_photo_with_tags(["search_dog"]),
+            "cat_dog": await create_photo_with_tags(["search_cat", "search_dog"]),
+            "cat_dog_sun": await create_photo_with_tags(["search_cat", "search_dog", "search_sun"]),
+            "none": (await create_test_photo(test_user["username"])).id,
+        }
+
+    return asyncio.run(_create())
+
+
+def get_ids(client, **params):
+    response = client.get("api/photos", params={"limit": 20, **params})
+    assert response.status_code == status.HTTP_200_OK, response.text
+    return [photo["id"] for photo in response.json()]
+
+
+def test_search_by_one_tag(client, tagged_photos):
+    ids = get_ids(client, tags="search_sun")
+
+    assert ids == [tagged_photos["cat_dog_sun"]]
+
+
+def test_search_by_all_tags(client, tagged_photos):
+    ids = get_ids(client, tags="Search Cat, search_dog", mode="all")
+
+    assert ids == [tagged_photos["cat_dog_sun"], tagged_photos["cat_dog"]]
+
+
+def test_search_by_any_tag(client, tagged_photos):
+    ids = get_ids(client, tags="search_cat,search_sun", mode="any")
+
+    assert ids == [
+        tagged_photos["cat_dog_sun"], tagged_photos["cat_dog"], tagged_photos["cat"]
+    ]
+
+
+def test_search_by_unknown_tag(client, tagged_photos):
+    assert get_ids(client, tags="search_cat,no_such_tag") == []
+    assert get_ids(client, tags="search_cat,no_such_tag", mode="any") == get_ids(
+        client, tags="search_cat"
+    )
+
+
+def test_search_by_tags_cursor_pages(client, tagged_photos):
+    response = client.get("api/photos", params={"limit": 4, "tags": "search_cat,search_dog", "mode": "any"})
+    first_page = [photo["id"] for photo in response.json()]
+    next_cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get(
+        "api/photos",
+        params={"limit": 4, "tags": "search_cat,search_dog", "mode": "any", "cursor": next_cursor},
+    )
+
+    assert first_page == [
+        tagged_photos["cat_dog_sun"], tagged_photos["cat_dog"],
+        tagged_photos["dog"], tagged_photos["cat"],
+    ]
+    assert response.json() == []
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_search_by_tags_errors(client):
+    response = client.get("api/photos", params={"tags": "a,b,c,d,e,f"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST, response.text
+    assert response.json()["detail"] == messages.TOO_MANY_TAGS
+
+    response = client.get("api/photos", params={"tags": "a", "mode": "some"})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY, response.text
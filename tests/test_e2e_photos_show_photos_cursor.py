@@ -0,0 +1,69 @@
+import pytest
+from fastapi import status
+
+from src.conf import messages
+from tests.conftest import create_test_photo
+
+from conftest import test_user
+
+
+@pytest.mark.asyncio
+async def test_show_photos_cursor_pages(client):
+    photos = [await create_test_photo(test_user["username"]) for _ in range(6)]
+
+    response = client.get("api/photos", params={"limit": 4})
+    assert response.status_code == status.HTTP_200_OK, response.text
+    first_page = response.json()
+    assert len(first_page) == 4
+    next_cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get("api/photos", params={"limit": 4, "cursor": next_cursor})
+    assert response.status_code == status.HTTP_200_OK, response.text
+    second_page = response.json()
+    assert len(second_page) == 2
+    # last page - no cursor for next one
+    assert "X-Next-Cursor" not in response.headers
+
+    ids = [photo["id"] for photo in first_page + second_page]
+    # newest first, each photo only once
+    assert ids == sorted((photo.id for photo in photos), reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_show_photos_cursor_same_as_skip(client):
+    response = client.get("api/photos", params={"limit": 4})
+    next_cursor = response.headers["X-Next-Cursor"]
+
+    by_cursor = client.get("api/photos", params={"limit": 4, "cursor": next_cursor})
+    by_skip = client.get("api/photos", params={"limit": 4, "skip": 4})
+
+    assert by_cursor.json() == by_skip.json()
+
+
+@pytest.mark.asyncio
+async def test_show_photos_cursor_new_photo_does_not_shift_page(client):
+    response = client.get("api/photos", params={"limit": 4})
+    next_cursor = response.headers["X-Next-Cursor"]
+    expected = client.get("api/photos", params={"limit": 4, "cursor": next_cursor}).json()
+
+    await create_test_photo(test_user["username"])
+
+    response = client.get("api/photos", params={"limit": 4, "cursor": next_cursor})
+    assert response.json() == expected
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "abc",
+        "W10",
+        "WyJub3QgYSBkYXRlIiwgMV0",
+        # created_at with timezone
+        "WyIyMDI0LTA1LTAxVDEyOjAwOjAwKzAwOjAwIiwgMV0",
+    ],
+)
+def test_show_photos_invalid_cursor(client, cursor):
+    response = client.get("api/photos", params={"cursor": cursor})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST, response.text
+    assert response.json()["detail"] == messages.INVALID_CURSOR
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event
+
+from src.services.cache import photo_page_cache
+from src.services.photos import PhotoService
+from src.services.single_flight import SingleFlight
+from tests.conftest import TestingSessionLocal, create_test_comment, create_test_photo, engine
+
+from conftest import test_user
+
+
+class CountStatements:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(engine.sync_engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *args):
+        event.remove(engine.sync_engine, "before_cursor_execute", self)
+
+
+async def read_in_new_session(method: str, *args, **kwargs):
+    async with TestingSessionLocal() as session:
+        return await getattr(PhotoService(session), method)(*args, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_photo_page_reads_share_query():
+    photo = await create_test_photo(test_user["username"])
+    await create_test_comment(photo.id, test_user["username"])
+    other = await create_test_photo(test_user["username"])
+    await photo_page_cache.clear()
+
+    with CountStatements() as statements:
+        pages = await asyncio.gather(
+            *(read_in_new_session("get_one_photo_page", photo.id, 0, 20) for _ in range(20)),
+            *(read_in_new_session("get_one_photo_page", other.id, 0, 20) for _ in range(20)),
+        )
+
+    # photo and comments query for each of two photos
+    assert statements.count == 4
+    assert all(page == pages[0] for page in pages[:20])
+    assert len(pages[0][0]["comments"]) == 1
+    assert all(page["id"] == other.id for page, _ in pages[20:])
+
+    # cached page has its validators, no queries at all
+    with CountStatements() as statements:
+        page, validators = await read_in_new_session("get_one_photo_page", photo.id, 0, 20)
+    assert statements.count == 0
+    assert (page, validators) == pages[0]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_feed_reads_share_query():
+    for _ in range(5):
+        await create_test_photo(test_user["username"])
+
+    with CountStatements() as statements:
+        pages = await asyncio.gather(
+            *(read_in_new_session("get_all_photo_per_page", 0, 4) for _ in range(20)),
+            *(read_in_new_session("get_all_photo_per_page", 4, 4) for _ in range(20)),
+        )
+
+    assert statements.count == 2
+    assert all(page == pages[0] for page in pages[:20])
+    assert pages[0] != pages[20]
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_exception_and_survives_cancel():
+    single_flight = SingleFlight()
+    started = asyncio.Event()
+    calls = []
+
+    async def fail():
+        calls.append("fail")
+        await asyncio.sleep(0.01)
+        raise ValueError("error")
+
+    results = await asyncio.gather(
+        *(single_flight.do("key", fail) for _ in range(3)), return_exceptions=True
+    )
+    assert calls == ["fail"]
+    assert all(isinstance(result, ValueError) for result in results)
+
+    async def slow():
+        calls.append("slow")
+        started.set()
+        await asyncio.sleep(0.05)
+        return "result"
+
+    first = asyncio.create_task(single_flight.do("key", slow))
+    await started.wait()
+    second = asyncio.create_task(single_flight.do("key", slow))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    # second call runs again when the first one is cancelled
+    assert await second == "result"
+    assert calls == ["fail", "slow", "slow"]
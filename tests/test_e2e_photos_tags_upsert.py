@@ -0,0 +1,111 @@
+import asyncio
+from unittest.mock import Mock
+
+import pytest
+from fastapi import status
+from sqlalchemy import event, func, select
+
+from src.models.photos import TagModel, photos_tags
+from src.repositories.tags import TagRepo
+from tests.conftest import TestingSessionLocal, create_test_photo, engine
+
+from conftest import test_user
+
+
+async def get_photo_tags(photo_id: int) -> list[str]:
+    async with TestingSessionLocal() as session:
+        stmt = (select(TagModel.name)
+                .join(photos_tags, photos_tags.c.tag_id == TagModel.id)
+                .filter(photos_tags.c.photo_id == photo_id)
+                .order_by(TagModel.name))
+        return list((await session.execute(stmt)).scalars())
+
+
+@pytest.mark.asyncio
+async def test_add_new_and_existing_tags():
+    first = await create_test_photo(test_user["username"])
+    second = await create_test_photo(test_user["username"])
+    async with TestingSessionLocal() as session:
+        await TagRepo(session).add_tags_to_photo(first.id, ["upsert_a", "upsert_b", "upsert_a"])
+        await TagRepo(session).add_tags_to_photo(second.id, ["upsert_b", "upsert_c"])
+
+    assert await get_photo_tags(first.id) == ["upsert_a", "upsert_b"]
+    assert await get_photo_tags(second.id) == ["upsert_b", "upsert_c"]
+    async with TestingSessionLocal() as session:
+        count = await session.scalar(
+            select(func.count()).select_from(TagModel).filter(TagModel.name.like("upsert_%"))
+        )
+    assert count == 3
+
+
+@pytest.mark.asyncio
+async def test_add_tags_statements():
+    photo = await create_test_photo(test_user["username"])
+    statements = []
+
+    def count_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count_statement)
+    try:
+        async with TestingSessionLocal() as session:
+            await TagRepo(session).add_tags_to_photo(photo.id, [f"bulk_{i}" for i in range(5)])
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count_statement)
+
+    # tags upsert + links insert (+ BEGIN/COMMIT are not cursor executions)
+    assert len(statements) == 2
+
+
+@pytest.mark.asyncio
+async def test_tags_are_upserted_in_sorted_order():
+    # concurrent uploads lock new tags in the same order, so they can't deadlock
+    photo = await create_test_photo(test_user["username"])
+    parameters = []
+
+    def save_parameters(conn, cursor, statement, params, *args):
+        if statement.startswith("INSERT INTO tags"):
+            parameters.append(params)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", save_parameters)
+    try:
+        async with TestingSessionLocal() as session:
+            await TagRepo(session).add_tags_to_photo(photo.id, ["order_c", "order_a", "order_b"])
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", save_parameters)
+
+    assert list(parameters[0]) == ["order_a", "order_b", "order_c"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_uploads_with_same_new_tag():
+    photos = [await create_test_photo(test_user["username"]) for _ in range(5)]
+
+    async def add_tag(photo_id):
+        async with TestingSessionLocal() as session:
+            await TagRepo(session).add_tags_to_photo(photo_id, ["race_tag"])
+
+    await asyncio.gather(*(add_tag(photo.id) for photo in photos))
+
+    for photo in photos:
+        assert await get_photo_tags(photo.id) == ["race_tag"]
+
+
+def test_upload_photo_with_tags_in_one_transaction(client, get_token, monkeypatch):
+    monkeypatch.setattr(
+        "src.services.cloudinary.CloudinaryService.upload_photo",
+        Mock(return_value=("url", "tags_public_id")),
+    )
+    with open("tests/test_image.jpg", "rb") as file:
+        # other file content than in other tests, so it is not deduplicated
+        content = file.read() + b"tags"
+
+    response = client.post(
+        "api/photos",
+        headers={"Authorization": f"Bearer {get_token}"},
+        params={"description": "photo with tags", "tags": "tx_one, tx two"},
+        files={"file": ("test_image.jpg", content, "image/jpeg")},
+    )
+
+    assert response.status_code == status.HTTP_201_CREATED, response.text
+    assert asyncio.run(get_photo_tags(response.json()["id"])) == ["tx_one", "tx_two"]
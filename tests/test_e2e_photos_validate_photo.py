@@ -0,0 +1,178 @@
+import io
+from unittest.mock import Mock
+
+import pytest
+from fastapi import HTTPException, status
+from PIL import Image
+
+from src.conf import messages
+from src.conf.config import config
+from src.middleware.upload_limit import UploadLimitMiddleware
+
+
+def make_image(size=(100, 100), image_format="PNG", mode="RGB"):
+    img = Image.new(mode, size)
+    img_io = io.BytesIO()
+    img.save(img_io, format=image_format)
+    img_io.seek(0)
+    return img_io
+
+
+def upload(client, token, file, content_type="image/png"):
+    return client.post(
+        "api/photos",
+        headers={"Authorization": f"Bearer {token}"},
+        params={"description": "test_description_photo1"},
+        files={"file": ("test_image.png", file, content_type)},
+    )
+
+
+@pytest.fixture()
+def mock_upload(monkeypatch):
+    mock_cloudinary_uploader_upload = Mock(return_value=("public_id", "test_public_id"))
+    monkeypatch.setattr(
+        "src.services.cloudinary.CloudinaryService.upload_photo",
+        mock_cloudinary_uploader_upload,
+    )
+    return mock_cloudinary_uploader_upload
+
+
+@pytest.mark.parametrize("image_format", ["PNG", "JPEG"])
+def test_upload_photo_valid_image(client, get_token, mock_upload, image_format):
+    response = upload(client, get_token, make_image(image_format=image_format), "image/jpeg")
+
+    assert response.status_code == status.HTTP_201_CREATED, response.text
+    assert mock_upload.called
+
+
+@pytest.mark.parametrize(
+    "contents",
+    [b"not an image at all", b"GIF89a" + b"\x00" * 100, b"\x89PNG\r\n\x1a\n" + b"broken"],
+)
+def test_upload_photo_not_image(client, get_token, mock_upload, contents):
+    response = upload(client, get_token, io.BytesIO(contents))
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST, response.text
+    assert response.json()["detail"] == messages.INVALID_FILE_NOT_IMAGE
+    mock_upload.assert_not_called()
+
+
+def test_upload_photo_too_big_file(client, get_token, mock_upload, monkeypatch):
+    monkeypatch.setattr(config, "MAX_FILE_SIZE_BYTES", 1024)
+    monkeypatch.setattr("src.services.photos.PhotoService.CHUNK_SIZE_BYTES", 256)
+    img = Image.effect_noise((100, 100), 100).convert("RGB")
+    img_io = io.BytesIO()
+    img.save(img_io, format="PNG")
+    img_io.seek(0)
+
+    response = upload(client, get_token, img_io)
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, response.text
+    assert response.json()["detail"] == messages.TOO_BIG_FILE
+    mock_upload.assert_not_called()
+
+
+def test_upload_photo_too_big_content_length(client, get_token, mock_upload):
+    response = client.post(
+        "api/photos",
+        headers={
+            "Authorization": f"Bearer {get_token}",
+            "Content-Length": str(config.MAX_FILE_SIZE_BYTES * 2),
+        },
+        params={"description": "test_description_photo1"},
+        files={"file": ("test_image.png", make_image(), "image/png")},
+    )
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, response.text
+    assert response.json()["detail"] == messages.TOO_BIG_FILE
+
+
+def test_upload_photo_too_big_chunked_body(client, get_token, mock_upload, monkeypatch):
+    monkeypatch.setattr(config, "MAX_FILE_SIZE_BYTES", 1024)
+    body = (
+        b"--boundary\r\n"
+        b'Content-Disposition: form-data; name="file"; filename="test_image.png"\r\n'
+        b"Content-Type: image/png\r\n\r\n"
+        + make_image().read()
+        + b"\x00" * 100_000
+        + b"\r\n--boundary--\r\n"
+    )
+
+    def chunks():
+        for start in range(0, len(body), 1024):
+            yield body[start : start + 1024]
+
+    # body of generator is sent chunked, without Content-Length
+    response = client.post(
+        "api/photos",
+        headers={
+            "Authorization": f"Bearer {get_token}",
+            "Content-Type": "multipart/form-data; boundary=boundary",
+        },
+        params={"description": "test_description_photo1"},
+        content=chunks(),
+    )
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, response.text
+    assert response.json()["detail"] == messages.TOO_BIG_FILE
+    mock_upload.assert_not_called()
+
+
+@pytest.mark.parametrize("size", [(config.MAX_IMAGE_SIDE + 1, 1), (2000, 2000)])
+def test_upload_photo_too_big_dimensions(client, get_token, mock_upload, monkeypatch, size):
+    monkeypatch.setattr(config, "MAX_IMAGE_PIXELS", 1_000_000)
+
+    response = upload(client, get_token, make_image(size, mode="1"))
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST, response.text
+    assert response.json()["detail"] == messages.TOO_BIG_IMAGE
+    mock_upload.assert_not_called()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ["/api/photos/", "/api/photos", "/api/photos/batch"])
+async def test_too_big_upload_is_rejected_before_body_is_read(path):
+    app = Mock()
+    sent = []
+
+    async def receive():
+        raise AssertionError("body is read")
+
+    async def send(message):
+        sent.append(message)
+
+    content_length = str(config.MAX_BATCH_FILES * config.MAX_FILE_SIZE_BYTES * 2)
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": path,
+        "headers": [(b"content-length", content_length.encode())],
+    }
+    await UploadLimitMiddleware(app)(scope, receive, send)
+
+    app.assert_not_called()
+    assert sent[0]["status"] == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert messages.TOO_BIG_FILE.encode() in sent[1]["body"]
+
+
+@pytest.mark.asyncio
+async def test_body_reading_stops_when_limit_is_passed(monkeypatch):
+    monkeypatch.setattr(config, "MAX_FILE_SIZE_BYTES", 1024)
+    chunk = b"\x00" * 1024
+    received = []
+
+    async def receive():
+        received.append(chunk)
+        return {"type": "http.request", "body": chunk, "more_body": True}
+
+    async def app(scope, receive, send):
+        while True:
+            await receive()
+
+    scope = {"type": "http", "method": "POST", "path": "/api/photos", "headers": []}
+    with pytest.raises(HTTPException) as error:
+        await UploadLimitMiddleware(app)(scope, receive, Mock())
+
+    assert error.value.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    limit = UploadLimitMiddleware(app).get_limit("/api/photos")
+    assert len(received) == limit // len(chunk) + 1
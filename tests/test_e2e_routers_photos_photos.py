@@ -111,7 +111,8 @@ async def test_upload_photo_with_one_tag(client, get_token, monkeypatch):
     assert response.status_code == status.HTTP_201_CREATED, response.text
     data = response.json()
     assert data["public_id"] == "test_public_id"
-    assert mock_cloudinary_uploader_upload.called
+    # the same file was uploaded by test_upload_photo_with_five_tags - stored file is reused
+    mock_cloudinary_uploader_upload.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -146,7 +147,8 @@ async def test_upload_photo_without_tags(client, get_token, monkeypatch):
     # assert ['rating'] is None
     # assert data["tags"] == ['test_tag1']
     # assert data["comments"] == []
-    assert mock_cloudinary_uploader_upload.called
+    # the same file was uploaded by test_upload_photo_with_five_tags - stored file is reused
+    mock_cloudinary_uploader_upload.assert_not_called()
 
 
 @pytest.mark.asyncio
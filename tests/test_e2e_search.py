@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+from fastapi import status
+from sqlalchemy import func, select
+
+from src.models.photos import PhotoModel
+from src.models.users import UserModel
+from src.repositories.comments import CommentRepo
+from src.repositories.photos import PhotoRepo
+from src.services.comments import CommentService
+from tests.conftest import TestingSessionLocal
+
+from conftest import run_jobs, test_user
+
+
+async def create_photo(description: str, comments: list[str] = ()) -> int:
+    async with TestingSessionLocal() as session:
+        user = (await session.execute(
+            select(UserModel).filter_by(username=test_user["username"])
+        )).scalar_one()
+        photo = PhotoModel(
+            user_id=user.id, description=description, image_url="url", public_id="search_public_id"
+        )
+        session.add(photo)
+        await session.commit()
+        for content in comments:
+            await CommentService(session).add_comment(photo.id, content, user.id)
+        return photo.id
+
+
+@pytest.fixture(scope="module")
+def photos():
+    async def _create():
+        return {
+            "description": await create_photo("Sunset over the mountains"),
+            "comment": await create_photo("Lake", ["what a sunset!"]),
+            "both": await create_photo("Sunset in the city", ["best sunset", "sunset again"]),
+            "other": await create_photo("Cat on the sofa", ["cute"]),
+        }
+
+    photos = asyncio.run(_create())
+    asyncio.run(run_jobs())
+    return photos
+
+
+def search(client, **params):
+    response = client.get("api/search", params=params)
+    assert response.status_code == status.HTTP_200_OK, response.text
+    return response.json()
+
+
+def test_search_ranks_description_and_comments(client, photos):
+    result = search(client, q="sunset", limit=20)
+
+    assert [photo["id"] for photo in result] == [
+        photos["both"], photos["description"], photos["comment"]
+    ]
+    assert result[0]["rank"] > result[1]["rank"] > result[2]["rank"] > 0
+    assert result[1]["description"] == "Sunset over the mountains"
+
+
+def test_search_query_syntax(client, photos):
+    assert {photo["id"] for photo in search(client, q="sunset -city", limit=20)} == {
+        photos["description"], photos["comment"]
+    }
+    assert [photo["id"] for photo in search(client, q='"on the sofa"')] == [photos["other"]]
+    assert search(client, q="nothing_like_this") == []
+
+
+def test_search_pagination(client, photos):
+    first_page = search(client, q="sunset", limit=4)
+    second_page = search(client, q="sunset or cute", limit=4, skip=2)
+
+    assert len(first_page) == 3
+    # same rank - newer photo first
+    assert [photo["id"] for photo in second_page] == [photos["other"], photos["comment"]]
+
+
+def test_search_vector_updated_on_write(client, photos, get_token):
+    response = client.put(
+        f"api/photos/{photos['other']}",
+        headers={"Authorization": f"Bearer {get_token}"},
+        params={"content": "Dog on the sofa"},
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+
+    assert search(client, q="cat") == []
+    assert [photo["id"] for photo in search(client, q="dog")] == [photos["other"]]
+
+
+def test_search_vector_updated_on_comment_changes(client, photos, get_token):
+    headers = {"Authorization": f"Bearer {get_token}"}
+    response = client.post(
+        f"api/photos/{photos['other']}", headers=headers, json={"content": "rainbow"}
+    )
+    assert response.status_code == status.HTTP_201_CREATED, response.text
+    comment_id = response.json()["id"]
+    # found when search document is rebuilt by job worker
+    assert search(client, q="rainbow") == []
+    asyncio.run(run_jobs())
+    assert [photo["id"] for photo in search(client, q="rainbow")] == [photos["other"]]
+
+    response = client.delete(
+        f"api/photos/{photos['other']}",
+        headers=headers,
+        params={"select": "comment", "object_id": comment_id},
+    )
+    assert response.status_code == status.HTTP_204_NO_CONTENT, response.text
+    asyncio.run(run_jobs())
+    assert search(client, q="rainbow") == []
+
+
+def test_search_without_query(client):
+    response = client.get("api/search")
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_search_route_without_redirect(client, photos):
+    response = client.get("api/search", params={"q": "sunset"}, follow_redirects=False)
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.asyncio
+async def test_concurrent_rebuilds_see_all_comments():
+    photo_id = await create_photo("Concurrent comments", ["zebra"])
+    async with TestingSessionLocal() as first, TestingSessionLocal() as second:
+        user_id = (await first.execute(
+            select(UserModel.id).filter_by(username=test_user["username"])
+        )).scalar_one()
+        # rebuild of the first job doesn't see the new comment
+        await CommentRepo(first).update_comments_vector(photo_id)
+        # comment is not blocked by the rebuild
+        await CommentRepo(second).add_comment(photo_id, "giraffe", user_id)
+
+        # rebuild of the second job waits for the first one
+        second_rebuild = asyncio.create_task(CommentRepo(second).update_comments_vector(photo_id))
+        await asyncio.sleep(0.3)
+        assert not second_rebuild.done()
+        await first.commit()
+        await second_rebuild
+        await second.commit()
+
+    async with TestingSessionLocal() as session:
+        for word in ("zebra", "giraffe"):
+            stmt = select(PhotoModel.id).filter(
+                PhotoRepo.search_document().bool_op("@@")(func.plainto_tsquery("simple", word))
+            )
+            assert photo_id in (await session.execute(stmt)).scalars().all()
@@ -0,0 +1,91 @@
+import asyncio
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import orjson
+import pytest
+from fastapi import status
+from pydantic import TypeAdapter
+
+from src.models.photos import PhotoModel
+from src.schemas.photos import ImageResponseAfterCreateSchema
+from src.schemas.unified import (ImagePageResponseFullSchema,
+                                 ImagePageResponseShortSchema)
+from src.services.serialization import get_serializer
+from tests.conftest import create_test_comment, create_test_photo
+
+from conftest import test_user
+
+now = datetime(2024, 5, 1, 12, 30, 15, 123456)
+
+
+def pydantic_json(schema, data) -> bytes:
+    adapter = TypeAdapter(schema)
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+
+
+@pytest.mark.parametrize(
+    "schema, data",
+    [
+        (
+            list[ImagePageResponseShortSchema],
+            [
+                {
+                    "id": 1, "image_url": "url", "description": None, "username": "user",
+                    "tags": [None], "avg_rating": Decimal("4.25"), "created_at": now,
+                },
+                {
+                    "id": 2, "image_url": None, "description": "photo", "username": None,
+                    "tags": ["sea"], "avg_rating": None, "created_at": now,
+                },
+            ],
+        ),
+        (
+            ImagePageResponseFullSchema,
+            {
+                "id": 1, "image_url": "url", "description": "photo", "username": "user",
+                "tags": ["sea", "sun"], "avg_rating": Decimal("3.5"),
+                "rating_histogram": [0, 0, 1, 1, 0],
+                "comments": [
+                    {"id": 1, "content": "comment", "updated_at": now, "username": "user"},
+                    {"id": 2, "content": "utc", "username": "user",
+                     "updated_at": now.replace(tzinfo=timezone.utc, microsecond=0)},
+                ],
+            },
+        ),
+        (
+            # optional fields which are not in row have defaults of schema
+            ImagePageResponseFullSchema,
+            {"id": 1, "image_url": "url", "description": "photo", "username": "user",
+             "tags": [None], "avg_rating": None},
+        ),
+        (
+            ImageResponseAfterCreateSchema,
+            PhotoModel(id=1, image_url="url", description=None, updated_at=now, public_id="public"),
+        ),
+    ],
+)
+def test_same_json_as_pydantic(schema, data):
+    assert get_serializer(schema).dump_json(data) == pydantic_json(schema, data)
+
+
+def test_serializer_is_cached():
+    assert get_serializer(list[ImagePageResponseShortSchema]) is get_serializer(
+        list[ImagePageResponseShortSchema]
+    )
+
+
+def test_photo_page_response(client):
+    photo_id = asyncio.run(create_test_photo(test_user["username"])).id
+    asyncio.run(create_test_comment(photo_id, test_user["username"]))
+
+    response = client.get(f"api/photos/{photo_id}")
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.headers["content-type"] == "application/json"
+    page = response.json()
+    assert response.content == pydantic_json(ImagePageResponseFullSchema, page)
+    assert page["comments"][0]["username"] == test_user["username"]
+
+    response = client.get("api/photos/", params={"limit": 4})
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert orjson.loads(response.content)[0]["id"] == photo_id